@@ -0,0 +1,198 @@
+# ##### BEGIN GPL LICENSE BLOCK #####
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 2
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software Foundation,
+#  Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA.
+#
+# ##### END GPL LICENSE BLOCK #####
+
+"""Exporter throughput benchmark on synthetic scenes.
+
+    python benchmark.py [--suite quick|full] [--scenario name] [--scene k=v,...] [options]
+
+Runs outside Blender with the stand-ins for bpy and mathutils in fake/,
+NumPy is needed to build the scenes (see scenes.py). Every scenario is
+built and exported --repeat times in its own process, so the peak memory
+is that of the scenario alone. The result of the fastest run, with the
+time of every export phase, is written as JSON to --output or stdout.
+Every option of XML3DExporterHelper is available as a flag, like in
+batch.py, e.g. --binary-payload or --parallel-meshes.
+"""
+
+import argparse
+import contextlib
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path[:0] = [os.path.join(BENCHMARK_DIR, "fake"), os.path.join(os.path.dirname(BENCHMARK_DIR), "src", "2.71")]
+
+import numpy
+
+import scenes
+from io_scene_xml3d import batch, export_xml3d
+
+# Prefix of the line a worker prints its result on
+RESULT_PREFIX = "XML3D_BENCHMARK_RESULT "
+
+# Modules of the add-on that have a code path without NumPy
+NUMPY_MODULES = ("animation", "encoding", "lod", "mesh_extract", "mesh_weld", "payload", "quantize", "triangulate", "vertex_cache")
+
+
+def createParser() :
+    parser = argparse.ArgumentParser(description = "Benchmark the XML3D exporter on synthetic scenes.")
+    parser.add_argument("--suite", choices = sorted(scenes.SUITES), default = None,
+                        help = "run all scenarios of a suite, default is quick without --scenario or --scene")
+    parser.add_argument("--scenario", action = "append", default = [], help = "named scenario of any suite")
+    parser.add_argument("--scene", action = "append", default = [],
+                        help = "custom scene, e.g. triangles=5000,objects=100,materials=4,depth=10")
+    parser.add_argument("--repeat", type = int, default = 3, help = "exports per scenario, the fastest is reported")
+    parser.add_argument("--output", default = None, help = "write the JSON results to this file instead of stdout")
+    parser.add_argument("--keep-output", default = None, help = "directory to keep the exported files in")
+    parser.add_argument("--pure-python", action = "store_true",
+                        help = "export without NumPy (on the main process, workers of --parallel-meshes still use it)")
+    parser.add_argument("--in-process", action = "store_true",
+                        help = "run all scenarios in this process, e.g. for a profiler")
+    parser.add_argument("--worker", default = None, help = argparse.SUPPRESS)
+    batch.addExporterArguments(parser)
+    return parser
+
+
+def exporterOptions(args) :
+    return dict((name, getattr(args, name)) for name, default in batch.exporterOptions())
+
+
+def scenarioList(args) :
+    "(name, parameters) of every scenario to run"
+    scenarios = [(name, scenes.scenario(name)) for name in args.scenario]
+    for text in args.scene :
+        scenarios.append(("scene-" + text, scenes.parseParameters(text)))
+    if args.suite or not scenarios :
+        scenarios = scenes.SUITES[args.suite or "quick"] + scenarios
+    return scenarios
+
+
+def disableNumpy() :
+    import importlib
+    for name in NUMPY_MODULES :
+        importlib.import_module("io_scene_xml3d." + name).numpy = None
+
+
+def runScenario(name, parameters, options, repeat, keepOutput = None) :
+    "Builds the scene and exports it repeat times, returns the result of the fastest export"
+    start = time.perf_counter()
+    parameters = scenes.buildScene(**parameters)
+    buildTime = time.perf_counter() - start
+
+    outputDir = keepOutput or tempfile.mkdtemp(prefix = "xml3d-benchmark-")
+    reports = []
+    try :
+        for run in range(max(repeat, 1)) :
+            exporter = export_xml3d.XML3DExporterHelper(os.path.join(outputDir, name + ".xhtml"), **options)
+            # The exporter prints a few lines per mesh
+            with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull) :
+                exporter.write()
+            reports.append(exporter.profile.report())
+    finally :
+        if not keepOutput :
+            shutil.rmtree(outputDir, ignore_errors = True)
+
+    fastest = min(reports, key = lambda report : report["duration"])
+    return {
+        "scenario" : name,
+        "status" : "ok",
+        "parameters" : parameters,
+        "buildTime" : buildTime,
+        "durations" : [report["duration"] for report in reports],
+        "duration" : fastest["duration"],
+        "phases" : fastest["phases"],
+        "totals" : fastest["totals"],
+        "peakMemory" : reports[-1]["peakMemory"],
+    }
+
+
+def runWorker(name, parameters, args) :
+    "Runs a scenario in a new process, returns its result"
+    job = {"name" : name, "parameters" : parameters, "options" : exporterOptions(args),
+           "repeat" : args.repeat, "keepOutput" : args.keep_output, "purePython" : args.pure_python}
+    process = subprocess.Popen([sys.executable, os.path.abspath(__file__), "--worker", json.dumps(job)],
+                               stdout = subprocess.PIPE, stderr = subprocess.PIPE, universal_newlines = True)
+    stdout, stderr = process.communicate()
+    for line in stdout.splitlines() :
+        if line.startswith(RESULT_PREFIX) :
+            return json.loads(line[len(RESULT_PREFIX):])
+    return {"scenario" : name, "status" : "failed", "parameters" : parameters,
+            "error" : "\n".join(stderr.splitlines()[-20:])}
+
+
+def environment() :
+    return {
+        "date" : time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python" : platform.python_version(),
+        "numpy" : numpy.__version__,
+        "platform" : platform.platform(),
+        "processor" : platform.processor() or platform.machine(),
+        "cpus" : os.cpu_count(),
+        "exporter" : export_xml3d.__version__,
+    }
+
+
+def main(argv) :
+    args = createParser().parse_args(argv)
+    if args.worker :
+        job = json.loads(args.worker)
+        if job["purePython"] :
+            disableNumpy()
+        result = runScenario(job["name"], job["parameters"], job["options"], job["repeat"], job["keepOutput"])
+        print(RESULT_PREFIX + json.dumps(result))
+        return 0
+
+    if args.pure_python and args.in_process :
+        disableNumpy()
+    if args.keep_output and not os.path.isdir(args.keep_output) :
+        os.makedirs(args.keep_output)
+
+    results = []
+    for name, parameters in scenarioList(args) :
+        if args.in_process :
+            result = runScenario(name, parameters, exporterOptions(args), args.repeat, args.keep_output)
+        else :
+            result = runWorker(name, parameters, args)
+        if result["status"] == "ok" :
+            sys.stderr.write("%-20s %10.3f s %10.1f MB\n" % (name, result["duration"], (result["peakMemory"] or 0) / 1048576.0))
+        else :
+            sys.stderr.write("%-20s FAILED\n%s\n" % (name, result["error"]))
+        results.append(result)
+
+    summary = {
+        "environment" : environment(),
+        "options" : dict(exporterOptions(args), purePython = args.pure_python, repeat = args.repeat),
+        "results" : results,
+    }
+    if args.output :
+        with open(args.output, 'w') as out :
+            json.dump(summary, out, indent = 1)
+    else :
+        json.dump(summary, sys.stdout, indent = 1)
+        sys.stdout.write("\n")
+    return 0 if all(result["status"] == "ok" for result in results) else 1
+
+
+if __name__ == "__main__" :
+    sys.exit(main(sys.argv[1:]))
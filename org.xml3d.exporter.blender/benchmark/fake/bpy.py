@@ -0,0 +1,318 @@
+# ##### BEGIN GPL LICENSE BLOCK #####
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 2
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software Foundation,
+#  Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA.
+#
+# ##### END GPL LICENSE BLOCK #####
+
+"""Stand-in for the parts of Blender's bpy module the exporter uses.
+
+Mesh attributes are flat NumPy arrays that foreach_get copies into the
+buffers of mesh_extract, so scenes with millions of triangles can be built
+and exported without Blender. Meshes have loop normals precomputed and no
+loop_triangles, like Blender 2.71. reset() starts an empty scene.
+"""
+
+import array
+import sys
+import types as pytypes
+
+import numpy
+
+from mathutils import Color, Matrix
+
+# array typecode -> dtype, for foreach_get into array.array buffers
+TYPECODE_DTYPES = {
+    'f' : numpy.float32,
+    'i' : numpy.int32,
+}
+
+
+class AttributeCollection :
+    "Items of a mesh, only their attribute arrays exist"
+
+    def __init__(self, length, **attributes) :
+        self.length = length
+        self.attributes = attributes
+
+    def __len__(self) :
+        return self.length
+
+    def foreach_get(self, attribute, seq) :
+        values = self.attributes[attribute]
+        if isinstance(seq, numpy.ndarray) :
+            seq[:] = values.ravel()
+        else :
+            seq[:] = array.array(seq.typecode, numpy.ascontiguousarray(values, TYPECODE_DTYPES[seq.typecode]).tobytes())
+
+
+class UVLayer :
+
+    def __init__(self, name, uvs) :
+        self.name = name
+        self.data = AttributeCollection(len(uvs), uv = uvs)
+
+
+class UVLayers(list) :
+    active = None
+
+
+class Mesh :
+
+    def __init__(self, name, co, loopStart, loopTotal, loopVertices, loopNormals,
+                 materialIndex = None, uvs = None, materials = (), smooth = None) :
+        self.name = name
+        self.users = 1
+        self.materials = list(materials)
+        self.co = co
+        if materialIndex is None :
+            materialIndex = numpy.zeros(len(loopStart), numpy.int32)
+        if smooth is None :
+            smooth = numpy.zeros(len(loopStart), numpy.bool_)
+        self.vertices = AttributeCollection(len(co), co = co)
+        # loopNormals are the split normals Blender would compute from use_smooth
+        self.polygons = AttributeCollection(len(loopStart), loop_start = loopStart, loop_total = loopTotal,
+                                            material_index = materialIndex, use_smooth = smooth)
+        self.loops = AttributeCollection(len(loopVertices), vertex_index = loopVertices, normal = loopNormals)
+        self.uv_layers = UVLayers()
+        if uvs is not None :
+            self.uv_layers.append(UVLayer("UVMap", uvs))
+            self.uv_layers.active = self.uv_layers[0]
+
+    def calc_normals_split(self) :
+        pass
+
+    def free_normals_split(self) :
+        pass
+
+    def copy(self) :
+        "Shares the arrays, the exporter only reads them"
+        mesh = Mesh.__new__(Mesh)
+        mesh.__dict__.update(self.__dict__)
+        mesh.users = 0
+        return mesh
+
+
+class Material :
+
+    def __init__(self, name, diffuse = (0.8, 0.8, 0.8)) :
+        self.name = name
+        self.users = 1
+        self.specular_shader = 'PHONG'
+        self.texture_slots = []
+        self.use_textures = []
+        self.diffuse_color = Color(diffuse)
+        self.ambient = 1.0
+        self.emit = 0.0
+        self.specular_color = Color((1.0, 1.0, 1.0))
+        self.specular_intensity = 0.5
+        self.specular_hardness = 50
+        self.alpha = 1.0
+        self.use_transparency = False
+        self.raytrace_mirror = pytypes.SimpleNamespace(use = False)
+        self.mirror_color = Color((1.0, 1.0, 1.0))
+        self.rbFriction = 0.5
+        self.rbRestitution = 0.0
+
+
+class Lamp :
+
+    def __init__(self, name, type = 'POINT') :
+        self.name = name
+        self.users = 1
+        self.type = type
+        self.use_square = False
+        self.use_halo = False
+        self.spot_size = 0.785398
+        self.spot_blend = 0.15
+        self.shadow_method = 'RAY_SHADOW'
+        self.falloff_type = 'INVERSE_SQUARE'
+        self.distance = 25.0
+        self.linear_attenuation = 0.0
+        self.quadratic_attenuation = 1.0
+        self.color = Color((1.0, 1.0, 1.0))
+        self.energy = 1.0
+
+
+class Camera :
+
+    def __init__(self, name) :
+        self.name = name
+        self.type = 'PERSP'
+        self.angle = 0.857556
+
+
+class Modifier :
+
+    def __init__(self, name, type, show_render = True) :
+        self.name = name
+        self.type = type
+        self.show_render = show_render
+
+
+class Object :
+
+    def __init__(self, name, data = None, matrix = None, parent = None) :
+        self.name = name
+        self.data = data
+        self.type = {Mesh : 'MESH', Lamp : 'LAMP', Camera : 'CAMERA'}.get(type(data), 'EMPTY')
+        self.users = 1
+        self.mode = 'OBJECT'
+        self.parent = parent
+        self.hide_render = False
+        self.select = True
+        self.modifiers = []
+        self.constraints = []
+        self.animation_data = None
+        self.matrix_basis = matrix or Matrix()
+
+    @property
+    def matrix_world(self) :
+        matrix, parent = self.matrix_basis, self.parent
+        while parent is not None :
+            matrix = parent.matrix_basis * matrix
+            parent = parent.parent
+        return matrix
+
+    @property
+    def bound_box(self) :
+        if self.type != 'MESH' or len(self.data.co) == 0 :
+            return [(0.0, 0.0, 0.0)] * 8
+        low, high = self.data.co.min(axis = 0).tolist(), self.data.co.max(axis = 0).tolist()
+        return [(x, y, z) for x in (low[0], high[0]) for y in (low[1], high[1]) for z in (low[2], high[2])]
+
+    def to_mesh(self, scene, apply_modifiers, settings) :
+        mesh = self.data.copy()
+        data.meshes.append(mesh)
+        return mesh
+
+
+class AnimData :
+    "Animation of an object, matrixAt(frame) is its matrix_basis at a frame"
+
+    def __init__(self, matrixAt) :
+        self.matrixAt = matrixAt
+
+
+class Scene :
+
+    def __init__(self) :
+        self.objects = []
+        self.camera = None
+        self.world = pytypes.SimpleNamespace(name = "World", ambient_color = Color((0.1, 0.1, 0.1)),
+                                             horizon_color = Color((0.05, 0.05, 0.05)))
+        self.render = pytypes.SimpleNamespace(resolution_x = 1920, resolution_y = 1080, resolution_percentage = 50,
+                                             fps = 24, fps_base = 1.0)
+        self.frame_start, self.frame_end, self.frame_step = 1, 250, 1
+        self.frame_current = 1
+
+    def frame_set(self, frame, subframe = 0.0) :
+        self.frame_current = frame
+        for obj in self.objects :
+            if obj.animation_data is not None :
+                obj.matrix_basis = obj.animation_data.matrixAt(frame + subframe)
+
+
+class Collection(list) :
+    "bpy_prop_collection of data blocks"
+
+    def get(self, name, default = None) :
+        for datablock in self :
+            if datablock.name == name :
+                return datablock
+        return default
+
+
+class MeshCollection(Collection) :
+
+    def remove(self, mesh) :
+        list.remove(self, mesh)
+
+
+class BlendData :
+
+    def __init__(self) :
+        self.filepath = "/tmp/benchmark.blend"
+        self.objects = Collection()
+        self.meshes = MeshCollection()
+        self.materials = Collection()
+        self.lamps = Collection()
+        self.cameras = Collection()
+
+
+data = BlendData()
+context = pytypes.SimpleNamespace(scene = Scene(), selected_objects = [])
+
+
+def reset() :
+    global data
+    data = BlendData()
+    context.scene = Scene()
+    context.selected_objects = []
+
+
+def link(obj) :
+    "Adds obj and its data to the scene"
+    context.scene.objects.append(obj)
+    data.objects.append(obj)
+    if obj.select :
+        context.selected_objects.append(obj)
+    if obj.type == 'CAMERA' :
+        data.cameras.append(obj.data)
+    elif obj.type == 'LAMP' :
+        data.lamps.append(obj.data)
+    elif obj.type == 'MESH' :
+        for material in obj.data.materials :
+            if material is not None and material not in data.materials :
+                data.materials.append(material)
+
+
+class ObjectOperators :
+
+    @staticmethod
+    def mode_set(mode = 'OBJECT', toggle = False) :
+        for obj in context.scene.objects :
+            obj.mode = mode
+
+
+class Operator :
+    pass
+
+
+class Menu :
+
+    def append(self, function) :
+        pass
+
+    def remove(self, function) :
+        pass
+
+
+def newProperty(**options) :
+    return options.get("default")
+
+
+ops = pytypes.SimpleNamespace(object = ObjectOperators())
+types = pytypes.SimpleNamespace(Operator = Operator, INFO_MT_file_export = Menu())
+props = pytypes.SimpleNamespace(StringProperty = newProperty, BoolProperty = newProperty, FloatProperty = newProperty,
+                                IntProperty = newProperty, EnumProperty = newProperty)
+utils = pytypes.SimpleNamespace(register_module = lambda name : None, unregister_module = lambda name : None)
+handlers = pytypes.SimpleNamespace(persistent = lambda function : function, scene_update_post = [], load_post = [],
+                                   undo_post = [], redo_post = [])
+app = pytypes.SimpleNamespace(version = (2, 71, 0), binary_path = "", binary_path_python = sys.executable,
+                              background = True, handlers = handlers)
+
+sys.modules["bpy.types"] = types
+sys.modules["bpy.props"] = props
+sys.modules["bpy.utils"] = utils
@@ -0,0 +1,36 @@
+# ##### BEGIN GPL LICENSE BLOCK #####
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 2
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software Foundation,
+#  Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA.
+#
+# ##### END GPL LICENSE BLOCK #####
+
+"""Stand-in for bpy_extras.io_utils, paths are used as they are."""
+
+import os
+
+
+class ExportHelper :
+    filepath = ""
+
+
+path_reference_mode = 'AUTO'
+
+
+def path_reference(filepath, base_src, base_dst, mode = 'AUTO', copy_subdir = "", copy_set = None, library = None) :
+    return os.path.basename(filepath)
+
+
+def path_reference_copy(copy_set, report = print) :
+    pass
@@ -0,0 +1,139 @@
+# ##### BEGIN GPL LICENSE BLOCK #####
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 2
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software Foundation,
+#  Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA.
+#
+# ##### END GPL LICENSE BLOCK #####
+
+"""Stand-in for the parts of Blender's mathutils the exporter uses."""
+
+import math
+
+
+class Vector :
+
+    def __init__(self, values = (0.0, 0.0, 0.0)) :
+        self.values = [float(v) for v in values]
+
+    def __len__(self) :
+        return len(self.values)
+
+    def __iter__(self) :
+        return iter(self.values)
+
+    def __getitem__(self, i) :
+        return self.values[i]
+
+    def __mul__(self, s) :
+        return self.__class__([v * s for v in self.values])
+
+    __rmul__ = __mul__
+
+    def __eq__(self, other) :
+        return isinstance(other, Vector) and self.values == other.values
+
+    def __ne__(self, other) :
+        return not self == other
+
+    __hash__ = None
+
+    def __repr__(self) :
+        return "%s(%r)" % (self.__class__.__name__, tuple(self.values))
+
+    x = property(lambda self : self.values[0])
+    y = property(lambda self : self.values[1])
+    z = property(lambda self : self.values[2])
+
+
+class Color(Vector) :
+
+    @property
+    def v(self) :
+        "Value in HSV"
+        return max(self.values)
+
+
+class Quaternion :
+
+    def __init__(self, wxyz = (1.0, 0.0, 0.0, 0.0)) :
+        self.w, self.x, self.y, self.z = [float(c) for c in wxyz]
+
+    def to_axis_angle(self) :
+        w = max(-1.0, min(1.0, self.w))
+        s = math.sqrt(max(0.0, 1.0 - w * w))
+        if s < 1e-8 :
+            return Vector((1.0, 0.0, 0.0)), 2.0 * math.acos(w)
+        return Vector((self.x / s, self.y / s, self.z / s)), 2.0 * math.acos(w)
+
+
+class Matrix :
+    "4x4 matrix, rows of lists"
+
+    def __init__(self, rows = None) :
+        if rows is None :
+            rows = [[1.0 if i == j else 0.0 for j in range(4)] for i in range(4)]
+        self.rows = [[float(v) for v in row] for row in rows]
+
+    def __getitem__(self, i) :
+        return self.rows[i]
+
+    @classmethod
+    def Translation(cls, vector) :
+        m = cls()
+        for i in range(3) :
+            m.rows[i][3] = vector[i]
+        return m
+
+    @classmethod
+    def Rotation(cls, angle, size, axis) :
+        m = cls()
+        c, s = math.cos(angle), math.sin(angle)
+        i, j = {'X' : (1, 2), 'Y' : (2, 0), 'Z' : (0, 1)}[axis]
+        m.rows[i][i], m.rows[i][j], m.rows[j][i], m.rows[j][j] = c, -s, s, c
+        return m
+
+    @classmethod
+    def Scale(cls, factor, size) :
+        m = cls()
+        for i in range(3) :
+            m.rows[i][i] = factor
+        return m
+
+    def __mul__(self, other) :
+        a, b = self.rows, other.rows
+        return Matrix([[sum(a[i][k] * b[k][j] for k in range(4)) for j in range(4)] for i in range(4)])
+
+    __matmul__ = __mul__
+
+    def to_translation(self) :
+        return Vector([self.rows[i][3] for i in range(3)])
+
+    def to_scale(self) :
+        return Vector([math.sqrt(sum(self.rows[i][j] ** 2 for i in range(3))) for j in range(3)])
+
+    def to_quaternion(self) :
+        scale = self.to_scale()
+        m = [[self.rows[i][j] / (scale[j] or 1.0) for j in range(3)] for i in range(3)]
+        trace = m[0][0] + m[1][1] + m[2][2]
+        if trace > 0 :
+            s = math.sqrt(trace + 1.0) * 2
+            return Quaternion((0.25 * s, (m[2][1] - m[1][2]) / s, (m[0][2] - m[2][0]) / s, (m[1][0] - m[0][1]) / s))
+        if m[0][0] > m[1][1] and m[0][0] > m[2][2] :
+            s = math.sqrt(1.0 + m[0][0] - m[1][1] - m[2][2]) * 2
+            return Quaternion(((m[2][1] - m[1][2]) / s, 0.25 * s, (m[0][1] + m[1][0]) / s, (m[0][2] + m[2][0]) / s))
+        if m[1][1] > m[2][2] :
+            s = math.sqrt(1.0 + m[1][1] - m[0][0] - m[2][2]) * 2
+            return Quaternion(((m[0][2] - m[2][0]) / s, (m[0][1] + m[1][0]) / s, 0.25 * s, (m[1][2] + m[2][1]) / s))
+        s = math.sqrt(1.0 + m[2][2] - m[0][0] - m[1][1]) * 2
+        return Quaternion(((m[1][0] - m[0][1]) / s, (m[0][2] + m[2][0]) / s, (m[1][2] + m[2][1]) / s, 0.25 * s))
@@ -0,0 +1,181 @@
+# ##### BEGIN GPL LICENSE BLOCK #####
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 2
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software Foundation,
+#  Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA.
+#
+# ##### END GPL LICENSE BLOCK #####
+
+"""Synthetic scenes for the benchmark, built with the bpy stand-in.
+
+A scene is described by a few parameters:
+
+    triangles   triangles of every mesh, a grid of quads with bumps
+    objects     mesh objects in the scene
+    meshes      mesh data blocks the objects share round robin, default objects
+    materials   materials of every mesh, assigned in stripes of faces
+    depth       length of the parent chains the objects are arranged in
+    uvs         whether the meshes have a UV layer
+    animated    objects that spin and move over the frame range
+
+Meshes with the same triangle count share their arrays, so building even
+large scenes is cheap; the exporter still reads every mesh on its own.
+"""
+
+import math
+
+import numpy
+
+import bpy
+from mathutils import Matrix
+
+DEFAULTS = {
+    "triangles" : 1000,
+    "objects" : 1,
+    "meshes" : None,
+    "materials" : 1,
+    "depth" : 1,
+    "uvs" : True,
+    "animated" : 0,
+}
+
+# Scenario name -> parameters different from DEFAULTS
+SUITES = {
+    "quick" : [
+        ("mesh-1k", {"triangles" : 1000}),
+        ("mesh-100k", {"triangles" : 100000}),
+        ("objects-1k", {"triangles" : 200, "objects" : 1000}),
+        ("linked-1k", {"triangles" : 1000, "objects" : 1000, "meshes" : 10}),
+        ("materials-16", {"triangles" : 50000, "materials" : 16}),
+        ("depth-100", {"triangles" : 100, "objects" : 500, "depth" : 100}),
+        ("animated-100", {"triangles" : 100, "objects" : 100, "animated" : 100}),
+    ],
+    "full" : [
+        ("mesh-1k", {"triangles" : 1000}),
+        ("mesh-100k", {"triangles" : 100000}),
+        ("mesh-1m", {"triangles" : 1000000}),
+        ("mesh-10m", {"triangles" : 10000000}),
+        ("objects-100", {"triangles" : 1000, "objects" : 100}),
+        ("objects-1k", {"triangles" : 1000, "objects" : 1000}),
+        ("objects-10k", {"triangles" : 1000, "objects" : 10000}),
+        ("linked-10k", {"triangles" : 1000, "objects" : 10000, "meshes" : 100}),
+        ("materials-4", {"triangles" : 100000, "materials" : 4}),
+        ("materials-64", {"triangles" : 100000, "materials" : 64}),
+        ("depth-10", {"triangles" : 1000, "objects" : 1000, "depth" : 10}),
+        ("depth-500", {"triangles" : 100, "objects" : 1000, "depth" : 500}),
+        ("no-uvs", {"triangles" : 1000000, "uvs" : False}),
+        ("animated-1k", {"triangles" : 100, "objects" : 1000, "animated" : 1000}),
+    ],
+}
+
+
+def scenario(name) :
+    "Parameters of a named scenario of any suite"
+    for scenarios in SUITES.values() :
+        for scenarioName, parameters in scenarios :
+            if scenarioName == name :
+                return parameters
+    raise KeyError("Unknown scenario: %s" % name)
+
+
+def parseParameters(text) :
+    "Parameters from 'key=value,key=value'"
+    parameters = {}
+    for assignment in text.split(",") :
+        key, value = assignment.split("=", 1)
+        if key.strip() not in DEFAULTS :
+            raise KeyError("Unknown scene parameter: %s" % key)
+        parameters[key.strip()] = value.strip().lower() in ("1", "true", "yes") if key.strip() == "uvs" else int(value)
+    return parameters
+
+
+def gridArrays(triangles, materialCount, seed = 0) :
+    """Arrays of a height field grid of quads with about triangles triangles:
+    co, loopStart, loopTotal, loopVertices, loopNormals, materialIndex, uvs"""
+    n = max(1, int(round(math.sqrt(triangles / 2.0))))
+    random = numpy.random.RandomState(seed)
+    x, y = numpy.meshgrid(numpy.linspace(0.0, 1.0, n + 1), numpy.linspace(0.0, 1.0, n + 1))
+    z = random.random_sample((n + 1, n + 1)) * (0.5 / n)
+    co = numpy.stack((x, y, z), axis = -1).reshape(-1, 3).astype(numpy.float32)
+
+    # Smooth vertex normals of the height field
+    slopeY, slopeX = numpy.gradient(z, 1.0 / n)
+    normals = numpy.stack((-slopeX, -slopeY, numpy.ones_like(z)), axis = -1).reshape(-1, 3)
+    normals /= numpy.sqrt((normals * normals).sum(axis = 1))[:, None]
+
+    corner = (numpy.arange(n)[:, None] * (n + 1) + numpy.arange(n)[None, :]).ravel()
+    loopVertices = numpy.stack((corner, corner + 1, corner + n + 2, corner + n + 1), axis = 1).ravel().astype(numpy.int32)
+    faceCount = n * n
+    return {
+        "co" : co,
+        "loopStart" : numpy.arange(0, 4 * faceCount, 4, dtype = numpy.int32),
+        "loopTotal" : numpy.full(faceCount, 4, numpy.int32),
+        "loopVertices" : loopVertices,
+        "loopNormals" : normals[loopVertices].astype(numpy.float32),
+        # Stripes of rows, so every material gets a connected part
+        "materialIndex" : ((numpy.arange(faceCount) * materialCount) // faceCount).astype(numpy.int32),
+        "uvs" : co[loopVertices, :2].copy(),
+    }
+
+
+def spinAnimation(matrix, seed) :
+    "matrix_basis at a frame of an object turning around Z while it bobs up and down"
+    phase = 0.1 * seed
+
+    def matrixAt(frame) :
+        lift = Matrix.Translation((0.0, 0.0, 0.2 * math.sin(frame / 20.0 + phase)))
+        return lift * matrix * Matrix.Rotation(frame / 40.0, 4, 'Z')
+    return matrixAt
+
+
+def buildScene(**parameters) :
+    "Replaces the bpy stand-in scene with a synthetic one, returns the parameters used"
+    values = dict(DEFAULTS)
+    values.update(parameters)
+    objectCount = values["objects"]
+    meshCount = values["meshes"] or objectCount
+    depth = max(1, values["depth"])
+
+    bpy.reset()
+    materials = [bpy.Material("Material%d" % i, (0.2 + 0.6 * i / max(values["materials"], 1), 0.5, 0.3))
+                 for i in range(values["materials"])]
+    arrays = gridArrays(values["triangles"], len(materials))
+    meshes = []
+    for i in range(meshCount) :
+        meshes.append(bpy.Mesh("Grid%d" % i, arrays["co"], arrays["loopStart"], arrays["loopTotal"],
+                               arrays["loopVertices"], arrays["loopNormals"], arrays["materialIndex"],
+                               arrays["uvs"] if values["uvs"] else None, materials))
+
+    side = int(math.ceil(math.sqrt(max(objectCount // depth, 1))))
+    parent = None
+    for i in range(objectCount) :
+        chain, link = divmod(i, depth)
+        if link == 0 :
+            # Root of a chain, placed on a grid
+            matrix = Matrix.Translation((1.5 * (chain % side), 1.5 * (chain // side), 0.0))
+            parent = None
+        else :
+            matrix = Matrix.Translation((0.0, 0.0, 0.1)) * Matrix.Rotation(0.05, 4, 'Z')
+        obj = bpy.Object("Object%d" % i, meshes[i % meshCount], matrix, parent)
+        if i < values["animated"] :
+            obj.animation_data = bpy.AnimData(spinAnimation(matrix, i))
+        bpy.link(obj)
+        parent = obj
+
+    lamp = bpy.Object("Lamp", bpy.Lamp("LampData"), Matrix.Translation((0.0, 0.0, 10.0)))
+    bpy.link(lamp)
+    camera = bpy.Object("Camera", bpy.Camera("CameraData"), Matrix.Translation((0.0, -10.0, 5.0)))
+    bpy.link(camera)
+    bpy.context.scene.camera = camera
+    values["meshes"] = meshCount
+    return values
@@ -0,0 +1,414 @@
+# ##### BEGIN GPL LICENSE BLOCK #####
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 2
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software Foundation,
+#  Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA.
+#
+# ##### END GPL LICENSE BLOCK #####
+
+"""Semantic comparison of exported XML3D documents.
+
+    python compare.py expected.xhtml actual.xhtml [--tolerance 1e-6]
+
+Two documents are equivalent if their elements match one by one, with
+numbers in attributes and text equal within the tolerance, and every mesh
+has the same triangles. Meshes are compared as sets of triangles made of
+(position, normal, texcoord) corners, so the order of vertices and
+triangles, how the data blocks are laid out, binary payloads, quantized
+attributes, tile files and gzip compression do not matter. Mesh data
+blocks in defs are only compared through the meshes using them, the keys
+of animated transforms one by one. The levels of detail of a mesh are not
+in the expected document, they only have to be valid: fewer triangles of
+the same vertices with increasing switch distances. compareFrame checks
+the animated transforms of a document at one time against the transforms
+of a static export of that frame.
+"""
+
+import argparse
+import gzip
+import math
+import os
+import re
+import sys
+import xml.etree.ElementTree as ElementTree
+
+import numpy
+
+REGRESSION_DIR = os.path.dirname(os.path.abspath(__file__))
+EXPORTER_DIR = os.path.dirname(REGRESSION_DIR)
+for path in (os.path.join(EXPORTER_DIR, "benchmark", "fake"), os.path.join(EXPORTER_DIR, "src", "2.71")) :
+    if path not in sys.path :
+        sys.path.insert(0, path)
+
+from io_scene_xml3d import animation, quantize
+
+# Elements whose text is a list of numbers
+NUMERIC_TAGS = ("float", "float2", "float3", "float4", "float4x4", "int")
+COMPONENTS = {"position" : 3, "normal" : 3, "texcoord" : 2}
+# Type name in payload references -> dtype, float32 and uint32 are the defaults
+PAYLOAD_TYPES = {
+    "float32" : "<f4",
+    "uint32" : "<u4",
+    "uint16" : "<u2",
+    "int16" : "<i2",
+}
+# Attributes of meshes with levels of detail, see lod.SWITCH_SCRIPT
+LOD_ATTRIBUTES = ("data-lod-src", "data-lod-distance")
+COMPUTE = re.compile(r"\s*(\w+)\s*=\s*([\w.]+)\((.*)\)\s*$")
+
+
+def localName(tag) :
+    return tag.rsplit("}", 1)[-1]
+
+
+def numbers(text) :
+    "Array of the numbers in text, None if it is not a list of numbers"
+    try :
+        return numpy.array([float(v) for v in text.split()])
+    except ValueError :
+        return None
+
+
+class Document :
+    "A parsed document with its elements by id, follows references into other files"
+
+    def __init__(self, path) :
+        self.path = path
+        opener = gzip.open if path.endswith(".gz") else open
+        with opener(path, 'rb') as f :
+            self.root = ElementTree.parse(f).getroot()
+        self.ids = dict((element.get("id"), element) for element in self.root.iter() if element.get("id"))
+        # File name -> Document or payload bytes, shared by all documents of an export
+        self.files = {}
+
+    def file(self, name) :
+        if name not in self.files :
+            path = os.path.join(os.path.dirname(self.path), name)
+            if name.endswith((".xml", ".xhtml", ".gz")) :
+                document = Document(path)
+                document.files = self.files
+                self.files[name] = document
+            else :
+                with open(path, 'rb') as f :
+                    self.files[name] = f.read()
+        return self.files[name]
+
+    def resolve(self, reference) :
+        "Document and element of 'file#id' or '#id'"
+        name, elementId = reference.split("#", 1)
+        document = self.file(name) if name else self
+        if elementId not in document.ids :
+            raise KeyError("Missing element %s" % reference)
+        return document, document.ids[elementId]
+
+    def values(self, element) :
+        "Numbers of a value element, from its text or from the payload"
+        src = element.get("src")
+        if not src :
+            return numpy.array([float(v) for v in (element.text or "").split()])
+        name, query = src.split("#", 1)
+        parameters = dict(p.split("=", 1) for p in query.split("&"))
+        default = "uint32" if localName(element.tag) == "int" else "float32"
+        offset, length = int(parameters["byteOffset"]), int(parameters["byteLength"])
+        data = self.file(name)[offset:offset + length]
+        return numpy.frombuffer(data, PAYLOAD_TYPES[parameters.get("type", default)]).astype(numpy.float64)
+
+    def fields(self, element) :
+        "Name -> values of everything a data or mesh element provides, later fields win like in Xflow"
+        fields = {}
+        if element.get("src") :
+            document, target = self.resolve(element.get("src"))
+            fields.update(document.fields(target))
+        for child in element :
+            tag = localName(child.tag)
+            if tag == "data" :
+                childFields = self.fields(child)
+                if child.get("compute") :
+                    childFields.update(compute(child.get("compute"), childFields))
+                fields.update(childFields)
+            elif tag in NUMERIC_TAGS and child.get("name") :
+                fields[child.get("name")] = self.values(child)
+        return fields
+
+
+def composeMatrix(translation, rotation, scale) :
+    "Column major translation * rotation * scale, rotation a quaternion (x, y, z, w)"
+    x, y, z, w = rotation
+    rotationMatrix = numpy.array([[1 - 2 * (y * y + z * z), 2 * (x * y - w * z), 2 * (x * z + w * y)],
+                                  [2 * (x * y + w * z), 1 - 2 * (x * x + z * z), 2 * (y * z - w * x)],
+                                  [2 * (x * z - w * y), 2 * (y * z + w * x), 1 - 2 * (x * x + y * y)]])
+    matrix = numpy.identity(4)
+    matrix[:3, :3] = rotationMatrix * numpy.asarray(scale)[None, :]
+    matrix[:3, 3] = translation
+    return matrix.T.ravel()
+
+
+def transformMatrix(element) :
+    "Column major matrix of a transform element"
+    translation = numbers(element.get("translation") or "0 0 0")
+    scale = numbers(element.get("scale") or "1 1 1")
+    x, y, z, angle = numbers(element.get("rotation") or "0 0 1 0")
+    length = math.sqrt(x * x + y * y + z * z)
+    if length == 0.0 :
+        return composeMatrix(translation, (0.0, 0.0, 0.0, 1.0), scale)
+    s = math.sin(angle / 2.0) / length
+    return composeMatrix(translation, (x * s, y * s, z * s, math.cos(angle / 2.0)), scale)
+
+
+def sampleTrack(values, keys, components, time, rotation) :
+    "Value of a key track at time, like the sample function of xml3d.animateTransform"
+    values = values.reshape(-1, components)
+    last = len(keys) - 1
+    if last <= 0 or time <= keys[0] :
+        return values[0]
+    if time >= keys[last] :
+        return values[last]
+    high = int(numpy.searchsorted(keys, time, side = "right"))
+    low = high - 1
+    w = (time - keys[low]) / (keys[high] - keys[low])
+    if rotation :
+        return numpy.array(animation.slerp(values[low], values[high], w))
+    return values[low] + (values[high] - values[low]) * w
+
+
+def compute(expression, fields) :
+    "Applies the Xflow operators the exporter writes for quantized attributes and animated transforms"
+    match = COMPUTE.match(expression)
+    if not match :
+        raise ValueError("Unknown compute: %s" % expression)
+    output, operator, arguments = match.group(1), match.group(2), [a.strip() for a in match.group(3).split(",")]
+    if operator in ("xml3d.dequantize3", "xml3d.dequantize2") :
+        components = int(operator[-1])
+        value, scale, offset = [fields[a] for a in arguments]
+        return {output : (value.reshape(-1, components) * scale + offset).ravel()}
+    if operator == "xml3d.decodeOctahedral" :
+        return {output : quantize.decodeOctahedral(fields[arguments[0]]).ravel()}
+    if operator == "xml3d.animateTransform" :
+        translation, translationKey, rotation, rotationKey, scale, scaleKey, time = [fields[a] for a in arguments]
+        return {output : composeMatrix(sampleTrack(translation, translationKey, 3, time[0], False),
+                                       sampleTrack(rotation, rotationKey, 4, time[0], True),
+                                       sampleTrack(scale, scaleKey, 3, time[0], False))}
+    raise ValueError("Unknown operator: %s" % operator)
+
+
+def transformsAt(document, time) :
+    "Id -> column major matrix of the transforms and animated transforms of a document at time"
+    transforms = {}
+    for element in document.root.iter() :
+        tag = localName(element.tag)
+        if tag == "transform" and element.get("id") :
+            transforms[element.get("id")] = transformMatrix(element)
+        elif tag == "data" and element.get("compute") == animation.TRANSFORM_COMPUTE :
+            fields = document.fields(element)
+            fields["time"] = numpy.array([time])
+            transforms[element.get("id")] = compute(element.get("compute"), fields)["transform"]
+    return transforms
+
+
+def meshTriangles(fields) :
+    "Triangles x 3 corners x attributes of the fields of a mesh"
+    index = fields["index"].astype(numpy.int64)
+    attributes = [fields[name].reshape(-1, COMPONENTS[name])[index] for name in ("position", "normal", "texcoord")
+                  if name in fields]
+    return numpy.hstack(attributes).reshape(-1, 3, sum(a.shape[1] for a in attributes))
+
+
+def canonicalTriangles(triangles, tolerance) :
+    """Rotates every triangle to start with its smallest corner (keeping the
+    winding) and sorts the triangles, both on a grid coarser than tolerance"""
+    keys = numpy.round(triangles / (tolerance * 100.0))
+    corners = keys.reshape(-1, keys.shape[2])
+    rank = numpy.empty(len(corners), numpy.int64)
+    rank[numpy.lexsort(corners.T[::-1])] = numpy.arange(len(corners))
+    first = rank.reshape(-1, 3).argmin(axis = 1)
+    rotation = (first[:, None] + numpy.arange(3)[None, :]) % 3
+    triangles = triangles[numpy.arange(len(triangles))[:, None], rotation]
+    keys = keys[numpy.arange(len(keys))[:, None], rotation].reshape(len(keys), -1)
+    order = numpy.lexsort(keys.T[::-1])
+    return triangles[order]
+
+
+def sameTriangle(a, b, tolerance) :
+    return any(numpy.allclose(a, numpy.roll(b, shift, axis = 0), rtol = 0.0, atol = tolerance) for shift in range(3))
+
+
+def compareMeshes(expected, actual, tolerance) :
+    "None if the triangle sets match, else a description of the difference"
+    if expected.shape != actual.shape :
+        return "%d triangles with %d values per corner, expected %d with %d" % (
+            actual.shape[0], actual.shape[2], expected.shape[0], expected.shape[2])
+    expected = canonicalTriangles(expected, tolerance)
+    actual = canonicalTriangles(actual, tolerance)
+    close = numpy.all(numpy.abs(expected - actual) <= tolerance, axis = (1, 2))
+    # Values next to a grid line can sort differently, match the rest one by one
+    unmatched = list(actual[~close])
+    for triangle in expected[~close] :
+        for i, candidate in enumerate(unmatched) :
+            if sameTriangle(triangle, candidate, tolerance) :
+                del unmatched[i]
+                break
+        else :
+            return "no match for triangle %s" % numpy.array2string(triangle, precision = 6)
+    return None
+
+
+class Comparison :
+
+    def __init__(self, expected, actual, tolerance) :
+        self.expected = expected
+        self.actual = actual
+        self.tolerance = tolerance
+        self.differences = []
+
+    def differ(self, path, message) :
+        self.differences.append("%s: %s" % (path, message))
+
+    def sameValue(self, expected, actual) :
+        if expected == actual :
+            return True
+        a, b = numbers(expected), numbers(actual)
+        return a is not None and b is not None and a.shape == b.shape and \
+            numpy.allclose(a, b, rtol = 0.0, atol = self.tolerance)
+
+    def children(self, element) :
+        "Children that are compared one by one"
+        inDefs = localName(element.tag) == "defs"
+        result = []
+        for child in element :
+            tag = localName(child.tag)
+            if inDefs and tag == "data" and child.get("id") != animation.TIME_DATA and \
+                    child.get("compute") != animation.TRANSFORM_COMPUTE :
+                continue
+            if tag == "script" and not child.get("src") :
+                # Inline Xflow operators of quantized meshes
+                continue
+            result.append(child)
+        return result
+
+    def compareElements(self, expected, actual, path) :
+        tag = localName(expected.tag)
+        path = "%s/%s%s" % (path, tag, "#" + expected.get("id") if expected.get("id") else "")
+        if tag != localName(actual.tag) :
+            self.differ(path, "element %s instead" % localName(actual.tag))
+            return
+        ignored = ("src",) + LOD_ATTRIBUTES if tag == "mesh" else ()
+        names = set(expected.keys()) | set(actual.keys())
+        for name in sorted(names) :
+            if name in ignored :
+                continue
+            a, b = expected.get(name), actual.get(name)
+            if a is None or b is None :
+                self.differ(path, "attribute %s %s" % (name, "missing" if b is None else "unexpected"))
+            elif not self.sameValue(a, b) :
+                self.differ(path, "attribute %s is %r, expected %r" % (name, b, a))
+        if not self.sameValue((expected.text or "").strip(), (actual.text or "").strip()) :
+            self.differ(path, "text differs")
+        if tag == "mesh" :
+            self.compareGeometry(expected, actual, path)
+
+        expectedChildren, actualChildren = self.children(expected), self.children(actual)
+        if len(expectedChildren) != len(actualChildren) :
+            self.differ(path, "%d children, expected %d" % (len(actualChildren), len(expectedChildren)))
+        for a, b in zip(expectedChildren, actualChildren) :
+            self.compareElements(a, b, path)
+
+    def compareGeometry(self, expected, actual, path) :
+        try :
+            expectedTriangles = meshTriangles(self.expected.fields(expected))
+        except KeyError :
+            # Meshes of empty material slots point to data that is never written
+            expectedTriangles = None
+        except ValueError as e :
+            self.differ(path, "expected mesh data: %s" % e)
+            return
+        try :
+            actualTriangles = meshTriangles(self.actual.fields(actual))
+        except KeyError as e :
+            if expectedTriangles is not None :
+                self.differ(path, "mesh data: %s" % e)
+            return
+        except ValueError as e :
+            self.differ(path, "mesh data: %s" % e)
+            return
+        if expectedTriangles is None :
+            self.differ(path, "mesh data where the expected mesh has none")
+            return
+        difference = compareMeshes(expectedTriangles, actualTriangles, self.tolerance)
+        if difference :
+            self.differ(path, difference)
+        if actual.get("data-lod-src") or actual.get("data-lod-distance") :
+            self.checkLods(actual, len(actualTriangles), path)
+
+    def checkLods(self, actual, triangleCount, path) :
+        "Levels of detail of a mesh must have fewer triangles of its vertices, farther away"
+        sources = (actual.get("data-lod-src") or "").split()
+        distances = numbers(actual.get("data-lod-distance") or "")
+        if distances is None or len(distances) != len(sources) or numpy.any(numpy.diff(distances) <= 0) :
+            self.differ(path, "data-lod-distance %r does not fit data-lod-src" % actual.get("data-lod-distance"))
+            return
+        positions = self.actual.fields(actual)["position"]
+        previous = triangleCount
+        for source in sources :
+            try :
+                document, data = self.actual.resolve(source)
+                fields = document.fields(data)
+                lodTriangles = meshTriangles(fields)
+            except (KeyError, ValueError, IndexError) as e :
+                self.differ(path, "level of detail %s: %s" % (source, e))
+                continue
+            if not numpy.array_equal(fields["position"], positions) :
+                self.differ(path, "level of detail %s does not use the vertices of the mesh" % source)
+            if len(lodTriangles) > previous :
+                self.differ(path, "level of detail %s has %d triangles, more than the level before" % (source, len(lodTriangles)))
+            previous = len(lodTriangles)
+
+    def run(self) :
+        self.compareElements(self.expected.root, self.actual.root, "")
+        return self.differences
+
+
+def compareFiles(expectedPath, actualPath, tolerance = 1e-6) :
+    "List of the differences of two exported documents, empty if they are equivalent"
+    return Comparison(Document(expectedPath), Document(actualPath), tolerance).run()
+
+
+def compareFrame(staticPath, animatedPath, time, tolerance = 1e-3) :
+    """List of the transforms of an animated export that differ at time from
+    a static export of the frame at that time, empty if none does"""
+    expected = transformsAt(Document(staticPath), 0.0)
+    actual = transformsAt(Document(animatedPath), time)
+    differences = ["transform %s %s" % (name, "missing" if name in expected else "unexpected")
+                   for name in sorted(set(expected) ^ set(actual))]
+    for name in sorted(set(expected) & set(actual)) :
+        if not numpy.allclose(expected[name], actual[name], rtol = 0.0, atol = tolerance) :
+            differences.append("transform %s at %g s is %s, expected %s" % (
+                name, time, numpy.array2string(actual[name], precision = 4),
+                numpy.array2string(expected[name], precision = 4)))
+    return differences
+
+
+def main(argv) :
+    parser = argparse.ArgumentParser(description = "Compare two exported XML3D documents semantically.")
+    parser.add_argument("expected")
+    parser.add_argument("actual")
+    parser.add_argument("--tolerance", type = float, default = 1e-6, help = "absolute tolerance of numbers")
+    args = parser.parse_args(argv)
+    differences = compareFiles(args.expected, args.actual, args.tolerance)
+    for difference in differences :
+        print(difference)
+    print("equivalent" if not differences else "%d differences" % len(differences))
+    return 1 if differences else 0
+
+
+if __name__ == "__main__" :
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,293 @@
+# ##### BEGIN GPL LICENSE BLOCK #####
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 2
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software Foundation,
+#  Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA.
+#
+# ##### END GPL LICENSE BLOCK #####
+
+"""Reference scenes of the golden output regression check.
+
+Small scenes, built with the bpy stand-in of the benchmark, that together
+cover the code paths of the exporter: flat and smooth faces, UV seams,
+n-gons (convex and concave), several materials with empty and unused
+slots, linked duplicates, modifiers, hidden objects, parent chains,
+lamps, a camera and animated objects. VARIANTS are the export options that must not change
+the exported scene, compared with a tolerance for their numbers. The
+variants in IDENTICAL_VARIANTS must write the same bytes as each other.
+
+GOLDEN_EXPORTERS records which exporter wrote each golden file. Where it
+can, that is the legacy exporter of legacy.py, so the golden files do not
+come from the code they check. Its output of LEGACY_IDENTICAL_SCENES is
+also matched byte by byte, the others differ in the last digit of some
+normals (it rounds them twice) or in how modified meshes are named.
+The animated scenes of ANIMATION_FRAMES are checked against static
+exports of single frames instead.
+"""
+
+import math
+
+import numpy
+
+import bpy
+import scenes
+from mathutils import Matrix
+
+# Options of every export, XML3DExporterHelper defaults otherwise
+BASE_OPTIONS = {
+    "onlySelected" : False,
+    "exportCameras" : True,
+    "applyModifiers" : True,
+    "pathMode" : 'AUTO',
+    "annotatePhysics" : False,
+    "writeHTMLHeader" : True,
+    "ignoreLamps" : False,
+    "useRaytracing" : False,
+    "convertParenting" : False,
+}
+
+# Variant name -> (options, tolerance of the comparison)
+VARIANTS = {
+    "default" : ({}, 1e-6),
+    "pure-python" : ({}, 1e-6),
+    "stream" : ({"streamOutput" : True}, 1e-6),
+    "binary" : ({"binaryPayload" : True}, 1e-5),
+    "parallel" : ({"parallelMeshes" : True, "workerCount" : 2}, 1e-6),
+    "mesh-cache" : ({"useMeshCache" : True}, 1e-6),
+    "vertex-cache" : ({"optimizeVertexCache" : True}, 1e-6),
+    "quantized" : ({"quantizeMeshes" : True, "binaryPayload" : True}, 1e-3),
+    "quantized-text" : ({"quantizeMeshes" : True}, 1e-3),
+    "lod" : ({"lodLevels" : 2}, 1e-6),
+    "animation" : ({"exportAnimation" : True}, 1e-6),
+    "tiled" : ({"tiledOutput" : True, "tileSize" : 1}, 1e-6),
+    "compressed" : ({"compressOutput" : True}, 1e-6),
+    "incremental" : ({"incrementalExport" : True}, 1e-6),
+}
+# The streamed document must be the same as the one written at the end
+IDENTICAL_VARIANTS = ("default", "stream")
+
+# Scene -> exporter of its golden file, "legacy" or "current"
+GOLDEN_EXPORTERS = {
+    "cube" : "legacy",
+    "grid" : "legacy",
+    # The legacy exporter drops faces with more than four corners
+    "ngons" : "current",
+    "hierarchy" : "legacy",
+    "material-slots" : "legacy",
+    "many-meshes" : "legacy",
+    # The legacy exporter writes no animation, see ANIMATION_FRAMES
+    "animation" : "current",
+}
+# Scenes the default export writes exactly like the legacy exporter
+LEGACY_IDENTICAL_SCENES = ("cube", "material-slots")
+# The legacy exporter rounds normals to 8 digits before writing 6, one unit in the last digit
+LEGACY_ROUNDING = 1e-6
+
+
+def newellNormal(points) :
+    normal = numpy.zeros(3)
+    for i in range(len(points)) :
+        a, b = points[i - 1], points[i]
+        normal += ((a[1] - b[1]) * (a[2] + b[2]), (a[2] - b[2]) * (a[0] + b[0]), (a[0] - b[0]) * (a[1] + b[1]))
+    return normal / (numpy.linalg.norm(normal) or 1.0)
+
+
+def meshFromFaces(name, coords, faces, smooth = False, materials = (), faceMaterials = None, uvs = None) :
+    """Mesh of faces given as vertex index tuples. smooth is a bool or one per
+    face, uvs one (u, v) per face corner or None."""
+    co = numpy.array(coords, numpy.float32).reshape(-1, 3)
+    if not isinstance(smooth, (list, tuple)) :
+        smooth = [smooth] * len(faces)
+    faceNormals = [newellNormal(co[list(face)].astype(numpy.float64)) for face in faces]
+    vertexNormals = numpy.zeros((len(co), 3))
+    for face, normal in zip(faces, faceNormals) :
+        vertexNormals[list(face)] += normal
+    vertexNormals /= numpy.maximum(numpy.linalg.norm(vertexNormals, axis = 1), 1e-12)[:, None]
+
+    loopVertices = [v for face in faces for v in face]
+    loopNormals = [vertexNormals[v] if smooth[f] else faceNormals[f] for f, face in enumerate(faces) for v in face]
+    loopTotal = [len(face) for face in faces]
+    return bpy.Mesh(name, co,
+                    numpy.array(numpy.cumsum([0] + loopTotal[:-1]), numpy.int32),
+                    numpy.array(loopTotal, numpy.int32),
+                    numpy.array(loopVertices, numpy.int32),
+                    numpy.array(loopNormals, numpy.float32).reshape(-1, 3),
+                    numpy.array(faceMaterials or [0] * len(faces), numpy.int32),
+                    None if uvs is None else numpy.array(uvs, numpy.float32).reshape(-1, 2),
+                    materials, numpy.array(smooth, numpy.bool_))
+
+
+def gridMesh(name, arrays, materials, uvs = True) :
+    "Mesh of scenes.gridArrays, smooth shaded like its loop normals"
+    return bpy.Mesh(name, arrays["co"], arrays["loopStart"], arrays["loopTotal"], arrays["loopVertices"],
+                    arrays["loopNormals"], arrays["materialIndex"], arrays["uvs"] if uvs else None, materials,
+                    numpy.ones(len(arrays["loopStart"]), numpy.bool_))
+
+
+def link(name, data, matrix = None, parent = None) :
+    obj = bpy.Object(name, data, matrix, parent)
+    bpy.link(obj)
+    return obj
+
+
+def addCamera(location = (0.0, -8.0, 4.0)) :
+    camera = link("Camera", bpy.Camera("CameraData"), Matrix.Translation(location) * Matrix.Rotation(1.1, 4, 'X'))
+    bpy.context.scene.camera = camera
+
+
+def cubeScene() :
+    "Flat shaded cube with one material and a UV layout with seams"
+    coords = [(x, y, z) for x in (-1, 1) for y in (-1, 1) for z in (-1, 1)]
+    faces = [(0, 1, 3, 2), (4, 6, 7, 5), (0, 4, 5, 1), (2, 3, 7, 6), (0, 2, 6, 4), (1, 5, 7, 3)]
+    square = [(0.0, 0.0), (1.0, 0.0), (1.0, 1.0), (0.0, 1.0)]
+    uvs = [((f % 3) / 3.0 + u / 3.0, (f // 3) / 2.0 + v / 2.0) for f in range(6) for u, v in square]
+    material = bpy.Material("Red", (0.8, 0.1, 0.1))
+    link("Cube", meshFromFaces("CubeMesh", coords, faces, False, [material], None, uvs),
+         Matrix.Rotation(0.4, 4, 'Z') * Matrix.Scale(0.5, 4))
+    link("Lamp", bpy.Lamp("LampData"), Matrix.Translation((2.0, -2.0, 3.0)))
+    addCamera()
+
+
+def gridScene() :
+    "Smooth height field with three materials in stripes"
+    materials = [bpy.Material("Stripe%d" % i, (0.3 * i, 0.5, 0.2)) for i in range(3)]
+    link("Grid", gridMesh("GridMesh", scenes.gridArrays(200, len(materials), seed = 7), materials),
+         Matrix.Translation((-0.5, -0.5, 0.0)))
+    addCamera()
+
+
+def ngonScene() :
+    "Convex and concave n-gons next to triangles and quads, mixed smooth and flat, no material"
+    coords, faces = [], []
+
+    def polygon(points) :
+        faces.append(tuple(range(len(coords), len(coords) + len(points))))
+        coords.extend(points)
+
+    polygon([(math.cos(a), math.sin(a), 0.0) for a in numpy.linspace(0.0, 2 * math.pi, 7)[:-1]])
+    # Concave star, ear clipping must not fan it
+    polygon([(3.0 + (1.0 if k % 2 == 0 else 0.4) * math.cos(k * math.pi / 5),
+              (1.0 if k % 2 == 0 else 0.4) * math.sin(k * math.pi / 5), 0.2) for k in range(10)])
+    polygon([(-3.0, 0.0, 0.0), (-2.0, 0.0, 0.0), (-2.5, 1.0, 0.5)])
+    polygon([(-3.0, -2.0, 0.0), (-2.0, -2.0, 0.0), (-2.0, -1.0, 0.3), (-3.0, -1.0, 0.3)])
+    # L shaped hexagon with a reflex corner
+    polygon([(0.0, -3.0, 0.0), (2.0, -3.0, 0.0), (2.0, -2.0, 0.0), (1.0, -2.0, 0.0), (1.0, -1.5, 0.0), (0.0, -1.5, 0.0)])
+    link("Shapes", meshFromFaces("ShapesMesh", coords, faces, [True, False, True, False, True]))
+    addCamera()
+
+
+def hierarchyScene() :
+    """Parent chain with rotations and scales, linked duplicates, an object
+    with a modifier, a hidden object, a spot and a point lamp"""
+    coords = [(0, 0, 0), (1, 0, 0), (1, 1, 0), (0, 1, 0), (0.5, 0.5, 1)]
+    faces = [(0, 3, 2, 1), (0, 1, 4), (1, 2, 4), (2, 3, 4), (3, 0, 4)]
+    material = bpy.Material("Stone", (0.5, 0.5, 0.45))
+    pyramid = meshFromFaces("PyramidMesh", coords, faces, False, [material])
+
+    root = link("Root", None, Matrix.Translation((0.0, 0.0, 1.0)) * Matrix.Rotation(0.3, 4, 'Z'))
+    parent = root
+    for i in range(4) :
+        matrix = Matrix.Translation((1.5, 0.0, 0.0)) * Matrix.Rotation(0.4, 4, 'Y') * Matrix.Scale(0.8, 4)
+        parent = link("Pyramid%d" % i, pyramid, matrix, parent)
+    modified = link("Modified", pyramid, Matrix.Translation((0.0, 3.0, 0.0)))
+    modified.modifiers.append(bpy.Modifier("Subsurf", 'SUBSURF'))
+    hidden = link("Hidden", pyramid, Matrix.Translation((0.0, -3.0, 0.0)))
+    hidden.hide_render = True
+
+    spot = bpy.Lamp("SpotData", 'SPOT')
+    spot.falloff_type = 'INVERSE_LINEAR'
+    link("Spot", spot, Matrix.Translation((0.0, 0.0, 6.0)), root)
+    point = bpy.Lamp("PointData")
+    point.shadow_method = 'NOSHADOW'
+    link("Point", point, Matrix.Translation((-4.0, 0.0, 2.0)))
+    addCamera()
+
+
+def materialSlotScene() :
+    "Material slots with an empty slot in use and a slot no face uses"
+    coords = [(x, y, 0.0) for y in range(3) for x in range(4)]
+    faces = [(y * 4 + x, y * 4 + x + 1, y * 4 + x + 5, y * 4 + x + 4) for y in range(2) for x in range(3)]
+    materials = [bpy.Material("Gold", (0.9, 0.7, 0.2)), None, bpy.Material("Unused"), bpy.Material("Blue", (0.1, 0.2, 0.9))]
+    materials[0].emit = 0.5
+    materials[3].alpha = 0.5
+    materials[3].use_transparency = True
+    link("Slots", meshFromFaces("SlotsMesh", coords, faces, True, materials, [0, 1, 3, 0, 1, 3]))
+    addCamera()
+
+
+def manyMeshScene() :
+    """Enough meshes, materials and parent chains that a streamed export
+    flushes the defs many times before the scene graph is written"""
+    materials = [bpy.Material("Paint%d" % i, (0.2 + 0.2 * i, 0.4, 0.6 - 0.1 * i)) for i in range(3)]
+    meshes = [gridMesh("Patch%d" % i, scenes.gridArrays(40 + 8 * i, len(materials), seed = i), materials, i % 3)
+              for i in range(12)]
+    parent = None
+    for i in range(24) :
+        matrix = Matrix.Translation((1.2 * (i % 6), 1.2 * (i // 6), 0.1 * (i % 4))) * Matrix.Rotation(0.1 * i, 4, 'Z')
+        # Chains of four, the linked duplicates of the second half share the meshes of the first
+        parent = link("Patch%d" % i, meshes[i % 12], matrix, parent if i % 4 else None)
+    link("Lamp", bpy.Lamp("LampData"), Matrix.Translation((3.0, 2.0, 6.0)))
+    addCamera()
+
+
+def animate(obj, matrixAt) :
+    obj.animation_data = bpy.AnimData(matrixAt)
+    obj.matrix_basis = matrixAt(bpy.context.scene.frame_current)
+
+
+def animationScene() :
+    """Objects turning past half a turn (where the quaternion changes its
+    sign), sliding, bobbing and one with an animation that does not move it,
+    under and over static objects. Exported with exportAnimation."""
+    bpy.context.scene.frame_end = 48
+    coords = [(0, 0, 0), (1, 0, 0), (1, 1, 0), (0, 1, 0), (0.5, 0.5, 1)]
+    faces = [(0, 3, 2, 1), (0, 1, 4), (1, 2, 4), (2, 3, 4), (3, 0, 4)]
+    pyramid = meshFromFaces("PyramidMesh", coords, faces, False, [bpy.Material("Clay", (0.7, 0.4, 0.3))])
+
+    base = link("Base", pyramid, Matrix.Translation((0.0, 0.0, -1.0)) * Matrix.Scale(2.0, 4))
+    spinner = link("Spinner", pyramid, None, base)
+    animate(spinner, lambda frame : Matrix.Translation((0.0, 0.0, 1.0)) * Matrix.Rotation(frame * math.pi / 16.0, 4, 'Z'))
+    link("Orbiter", pyramid, Matrix.Translation((1.5, 0.0, 0.0)) * Matrix.Scale(0.5, 4), spinner)
+    slider = link("Slider", pyramid)
+    animate(slider, lambda frame : Matrix.Translation((-3.0 + 0.125 * frame, 2.0, 0.0)))
+    bobber = link("Bobber", pyramid)
+    animate(bobber, scenes.spinAnimation(Matrix.Translation((3.0, -2.0, 0.0)) * Matrix.Scale(0.75, 4), 3))
+    still = link("Still", pyramid)
+    animate(still, lambda frame : Matrix.Translation((0.0, -3.0, 0.0)))
+    link("Lamp", bpy.Lamp("LampData"), Matrix.Translation((2.0, -2.0, 5.0)))
+    addCamera()
+
+
+SCENES = {
+    "cube" : cubeScene,
+    "grid" : gridScene,
+    "ngons" : ngonScene,
+    "hierarchy" : hierarchyScene,
+    "material-slots" : materialSlotScene,
+    "many-meshes" : manyMeshScene,
+    "animation" : animationScene,
+}
+# Options of every export of a scene, on top of BASE_OPTIONS
+SCENE_OPTIONS = {
+    "animation" : {"exportAnimation" : True},
+}
+# Animated scene -> frames at which its golden file must match a static export
+ANIMATION_FRAMES = {
+    "animation" : (1, 9, 17, 30, 48),
+}
+
+
+def buildScene(name) :
+    "Replaces the bpy stand-in scene with a reference scene"
+    bpy.reset()
+    SCENES[name]()
@@ -0,0 +1,128 @@
+# ##### BEGIN GPL LICENSE BLOCK #####
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 2
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software Foundation,
+#  Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA.
+#
+# ##### END GPL LICENSE BLOCK #####
+
+
+"""Runs the first exporter of this add-on on the bpy stand-in.
+
+The golden files are written by the exporter of LEGACY_REVISION, the
+per-vertex writeMeshData with minidom, not by the code they check. Its
+export_xml3d.py and xml3d.py are taken from git into a temporary package.
+That exporter reads meshes item by item, LegacyMesh provides this on top
+of the attribute arrays of the stand-in: polygons with their vertices,
+normal and use_smooth, vertices with co and normal, and uv_textures with
+uv1 to uv4 per face. The data of 2.71's uv_textures has no uv1 to uv4,
+those are the per-face UVs of the tessfaces the code was written for.
+The legacy exporter only writes triangles and quads.
+"""
+
+import contextlib
+import importlib
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import types
+
+import bpy
+from mathutils import Vector
+
+# Commit of the exporter that writes the golden files
+LEGACY_REVISION = "599996f"
+LEGACY_MODULES = ("export_xml3d", "xml3d")
+PACKAGE = "io_scene_xml3d_legacy"
+
+REGRESSION_DIR = os.path.dirname(os.path.abspath(__file__))
+ADDON_DIR = os.path.join(os.path.dirname(REGRESSION_DIR), "src", "2.71", "io_scene_xml3d")
+
+
+class LegacyMesh :
+    "A stand-in mesh with the per item API the legacy exporter reads"
+
+    def __init__(self, mesh) :
+        self.name = mesh.name
+        self.materials = mesh.materials
+        co = mesh.co.tolist()
+        loops = mesh.loops.attributes
+        polygons = mesh.polygons.attributes
+        loopVertices = loops["vertex_index"].tolist()
+        loopNormals = loops["normal"].tolist()
+        smooth = polygons["use_smooth"].tolist()
+
+        # Split normals of smooth faces are the vertex normals, flat faces use theirs
+        vertexNormals = [(0.0, 0.0, 1.0)] * len(co)
+        faces = []
+        uvs = mesh.uv_layers.active.data.attributes["uv"].tolist() if mesh.uv_layers.active else None
+        uvFaces = []
+        for start, total, materialIndex, faceSmooth in zip(polygons["loop_start"].tolist(), polygons["loop_total"].tolist(),
+                                                           polygons["material_index"].tolist(), smooth) :
+            loopRange = range(start, start + total)
+            if faceSmooth :
+                for loop in loopRange :
+                    vertexNormals[loopVertices[loop]] = loopNormals[loop]
+            faces.append(types.SimpleNamespace(vertices = [loopVertices[loop] for loop in loopRange],
+                                               normal = Vector(loopNormals[start]),
+                                               use_smooth = faceSmooth, material_index = materialIndex))
+            if uvs is not None :
+                corners = [tuple(uvs[loop]) for loop in loopRange] + [(0.0, 0.0)] * 4
+                uvFaces.append(types.SimpleNamespace(uv1 = corners[0], uv2 = corners[1], uv3 = corners[2], uv4 = corners[3]))
+        self.polygons = faces
+        self.vertices = [types.SimpleNamespace(co = Vector(c), normal = Vector(n)) for c, n in zip(co, vertexNormals)]
+        self.uv_textures = types.SimpleNamespace(active = None)
+        if uvs is not None :
+            self.uv_textures.active = types.SimpleNamespace(name = mesh.uv_layers.active.name, data = uvFaces)
+
+
+def loadExporter(directory) :
+    "Writes the legacy modules from git into directory and imports them"
+    package = os.path.join(directory, PACKAGE)
+    os.makedirs(package)
+    open(os.path.join(package, "__init__.py"), 'w').close()
+    for name in LEGACY_MODULES :
+        source = subprocess.check_output(["git", "show", "%s:./%s.py" % (LEGACY_REVISION, name)], cwd = ADDON_DIR)
+        with open(os.path.join(package, name + ".py"), 'wb') as f :
+            f.write(source)
+    sys.path.insert(0, directory)
+    try :
+        return importlib.import_module(PACKAGE + ".export_xml3d")
+    finally :
+        sys.path.remove(directory)
+
+
+@contextlib.contextmanager
+def legacyMeshes() :
+    "Object.to_mesh returns LegacyMesh views while active"
+    toMesh = bpy.Object.to_mesh
+    bpy.Object.to_mesh = lambda obj, scene, applyModifiers, settings : LegacyMesh(toMesh(obj, scene, applyModifiers, settings))
+    try :
+        yield
+    finally :
+        bpy.Object.to_mesh = toMesh
+
+
+def export(filepath, options) :
+    "Exports the current stand-in scene with the legacy exporter"
+    directory = tempfile.mkdtemp()
+    try :
+        export_xml3d = loadExporter(directory)
+        with legacyMeshes() :
+            export_xml3d.XML3DExporterHelper(filepath, **options).write()
+    finally :
+        for name in [PACKAGE] + ["%s.%s" % (PACKAGE, name) for name in LEGACY_MODULES] :
+            sys.modules.pop(name, None)
+        shutil.rmtree(directory, ignore_errors = True)
@@ -0,0 +1,188 @@
+# ##### BEGIN GPL LICENSE BLOCK #####
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 2
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software Foundation,
+#  Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA.
+#
+# ##### END GPL LICENSE BLOCK #####
+
+"""Golden output regression check of the exporter.
+
+    python regress.py check [--scene name] [--variant name] [--keep-output dir]
+    python regress.py update [--scene name]
+
+Runs outside Blender with the bpy stand-in of the benchmark. update exports
+every scene of corpus.py into golden/ with the exporter named in
+corpus.GOLDEN_EXPORTERS, the legacy one needs git. Update the files of the
+current exporter only after checking a deliberate change of the output.
+check exports every scene with every variant of corpus.VARIANTS and
+compares the result with the golden file using compare.py. The variants of
+corpus.IDENTICAL_VARIANTS must also write the same bytes as each other, and
+as the golden file if the current exporter or, for
+corpus.LEGACY_IDENTICAL_SCENES, the legacy one wrote it. The animated
+transforms of the golden files of corpus.ANIMATION_FRAMES must match a
+static export of each of those frames. Exits with 1 if any check fails. The unit tests of the single modules are in tests/.
+"""
+
+import argparse
+import contextlib
+import importlib
+import os
+import shutil
+import sys
+import tempfile
+
+REGRESSION_DIR = os.path.dirname(os.path.abspath(__file__))
+EXPORTER_DIR = os.path.dirname(REGRESSION_DIR)
+sys.path[:0] = [os.path.join(EXPORTER_DIR, "benchmark", "fake"), os.path.join(EXPORTER_DIR, "benchmark"),
+                os.path.join(EXPORTER_DIR, "src", "2.71")]
+
+import bpy
+import compare
+import corpus
+import legacy
+from benchmark import NUMPY_MODULES
+from io_scene_xml3d import compression, export_xml3d
+
+GOLDEN_DIR = os.path.join(REGRESSION_DIR, "golden")
+
+
+@contextlib.contextmanager
+def numpyDisabled() :
+    modules = [importlib.import_module("io_scene_xml3d." + name) for name in NUMPY_MODULES]
+    saved = [module.numpy for module in modules]
+    for module in modules :
+        module.numpy = None
+    try :
+        yield
+    finally :
+        for module, numpy in zip(modules, saved) :
+            module.numpy = numpy
+
+
+def export(sceneName, filepath, options, frame = None) :
+    "Exports a reference scene, at a frame if given, returns the path of the written document"
+    corpus.buildScene(sceneName)
+    if frame is not None :
+        bpy.context.scene.frame_set(frame)
+    allOptions = dict(corpus.BASE_OPTIONS)
+    allOptions.update(corpus.SCENE_OPTIONS.get(sceneName, {}))
+    allOptions.update(options)
+    if allOptions.get("useMeshCache") :
+        allOptions["meshCacheDir"] = os.path.join(os.path.dirname(filepath), "cache")
+    # An incremental export is checked on its second run, which reuses the first
+    for run in range(2 if allOptions.get("incrementalExport") else 1) :
+        exporter = export_xml3d.XML3DExporterHelper(filepath, **allOptions)
+        with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull) :
+            exporter.write()
+    return filepath + compression.GZIP_EXT if allOptions.get("compressOutput") else filepath
+
+
+def goldenPath(sceneName) :
+    return os.path.join(GOLDEN_DIR, sceneName + ".xhtml")
+
+
+def update(sceneNames) :
+    for sceneName in sceneNames :
+        exporter = corpus.GOLDEN_EXPORTERS[sceneName]
+        if exporter == "legacy" :
+            corpus.buildScene(sceneName)
+            with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull) :
+                legacy.export(goldenPath(sceneName), corpus.BASE_OPTIONS)
+        else :
+            export(sceneName, goldenPath(sceneName), {})
+        print("updated %s with the %s exporter" % (os.path.relpath(goldenPath(sceneName)), exporter))
+    return 0
+
+
+def check(sceneNames, variantNames, keepOutput) :
+    failures = 0
+    for sceneName in sceneNames :
+        legacyGolden = corpus.GOLDEN_EXPORTERS[sceneName] == "legacy"
+        # Bytes the identical variants must write, the first one's unless the golden file has them
+        identical = None
+        if not legacyGolden or sceneName in corpus.LEGACY_IDENTICAL_SCENES :
+            with open(goldenPath(sceneName), 'rb') as f :
+                identical = f.read()
+        for variantName in variantNames :
+            options, tolerance = corpus.VARIANTS[variantName]
+            if legacyGolden :
+                tolerance += corpus.LEGACY_ROUNDING
+            outputDir = os.path.join(keepOutput, sceneName, variantName) if keepOutput else tempfile.mkdtemp()
+            if not os.path.isdir(outputDir) :
+                os.makedirs(outputDir)
+            try :
+                with numpyDisabled() if variantName == "pure-python" else contextlib.ExitStack() :
+                    path = export(sceneName, os.path.join(outputDir, sceneName + ".xhtml"), options)
+                differences = compare.compareFiles(goldenPath(sceneName), path, tolerance)
+                if variantName in corpus.IDENTICAL_VARIANTS and not differences :
+                    with open(path, 'rb') as f :
+                        output = f.read()
+                    if identical is None :
+                        identical = output
+                    elif output != identical :
+                        differences = ["equivalent, but not identical to the golden file or the %s variant" %
+                                       " and ".join(corpus.IDENTICAL_VARIANTS)]
+            except Exception as e :
+                differences = ["export failed: %r" % e]
+            finally :
+                if not keepOutput :
+                    shutil.rmtree(outputDir, ignore_errors = True)
+            print("%-16s %-14s %s" % (sceneName, variantName, "ok" if not differences else "FAILED"))
+            for difference in differences[:10] :
+                print("    " + difference)
+            failures += bool(differences)
+        if sceneName in corpus.ANIMATION_FRAMES :
+            differences = checkFrames(sceneName)
+            print("%-16s %-14s %s" % (sceneName, "frames", "ok" if not differences else "FAILED"))
+            for difference in differences[:10] :
+                print("    " + difference)
+            failures += bool(differences)
+    print("%d checks failed" % failures if failures else "all checks passed")
+    return 1 if failures else 0
+
+
+def checkFrames(sceneName) :
+    "Differences of the golden file's animated transforms from static exports of the frames"
+    differences = []
+    outputDir = tempfile.mkdtemp()
+    try :
+        for frame in corpus.ANIMATION_FRAMES[sceneName] :
+            path = export(sceneName, os.path.join(outputDir, "%s-%d.xhtml" % (sceneName, frame)),
+                          {"exportAnimation" : False}, frame)
+            scene = bpy.context.scene
+            time = (frame - scene.frame_start) * scene.render.fps_base / scene.render.fps
+            differences += ["frame %d: %s" % (frame, difference)
+                            for difference in compare.compareFrame(path, goldenPath(sceneName), time)]
+    except Exception as e :
+        differences.append("export failed: %r" % e)
+    finally :
+        shutil.rmtree(outputDir, ignore_errors = True)
+    return differences
+
+
+def main(argv) :
+    parser = argparse.ArgumentParser(description = "Compare the exporter output with the golden files.")
+    parser.add_argument("command", choices = ("check", "update"))
+    parser.add_argument("--scene", action = "append", choices = sorted(corpus.SCENES), help = "default is all scenes")
+    parser.add_argument("--variant", action = "append", choices = sorted(corpus.VARIANTS), help = "default is all variants")
+    parser.add_argument("--keep-output", default = None, help = "directory to keep the exported files in")
+    args = parser.parse_args(argv)
+    sceneNames = args.scene or sorted(corpus.SCENES)
+    if args.command == "update" :
+        return update(sceneNames)
+    return check(sceneNames, args.variant or list(corpus.VARIANTS), args.keep_output)
+
+
+if __name__ == "__main__" :
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,37 @@
+# ##### BEGIN GPL LICENSE BLOCK #####
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 2
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software Foundation,
+#  Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA.
+#
+# ##### END GPL LICENSE BLOCK #####
+
+"""Setup shared by the unit tests of the exporter modules.
+
+    python -m unittest discover -s regression/tests
+    python -m pytest regression/tests
+
+Like regress.py, the tests run outside Blender with the bpy stand-in of the
+benchmark. Importing this module puts it and the add-on on the path.
+"""
+
+import os
+import sys
+
+TESTS_DIR = os.path.dirname(os.path.abspath(__file__))
+if os.path.dirname(TESTS_DIR) not in sys.path :
+    sys.path.insert(0, os.path.dirname(TESTS_DIR))
+
+import regress
+
+numpyDisabled = regress.numpyDisabled
@@ -0,0 +1,82 @@
+# ##### BEGIN GPL LICENSE BLOCK #####
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 2
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software Foundation,
+#  Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA.
+#
+# ##### END GPL LICENSE BLOCK #####
+
+import math
+import unittest
+
+import support
+from io_scene_xml3d import animation
+
+TIMES = [i / 24.0 for i in range(100)]
+
+
+class ReduceKeysTest(unittest.TestCase) :
+
+    def reduce(self, values, tolerance = 1e-4, rotation = False) :
+        "Kept keys with NumPy, after checking that the pure Python path keeps the same"
+        kept = animation.reduceKeys(TIMES, values, tolerance, rotation)
+        with support.numpyDisabled() :
+            self.assertEqual(animation.reduceKeys(TIMES, values, tolerance, rotation), kept)
+        return kept
+
+    def testConstantTrack(self) :
+        self.assertEqual(self.reduce([(1.0, 2.0, 3.0)] * 100), [0])
+        # Noise below the tolerance is constant too
+        self.assertEqual(self.reduce([(1.0, 2.0, 3.0 + 1e-5 * (i % 2)) for i in range(100)]), [0])
+
+    def testLinearTrack(self) :
+        self.assertEqual(self.reduce([(0.1 * i, 0.0, -0.2 * i) for i in range(100)]), [0, 99])
+
+    def testPiecewiseLinearTrack(self) :
+        values = [(float(min(i, 40)), 0.0, 0.0) for i in range(100)]
+        self.assertEqual(self.reduce(values), [0, 40, 99])
+
+    def testCurvedTrackStaysWithinTolerance(self) :
+        values = [(math.sin(i / 20.0), math.cos(i / 30.0), 0.0) for i in range(100)]
+        tolerance = 1e-3
+        kept = self.reduce(values, tolerance)
+        self.assertLess(len(kept), 100)
+        for start, end in zip(kept, kept[1:]) :
+            for i in range(start + 1, end) :
+                w = (TIMES[i] - TIMES[start]) / (TIMES[end] - TIMES[start])
+                for c in range(3) :
+                    interpolated = values[start][c] + (values[end][c] - values[start][c]) * w
+                    self.assertLessEqual(abs(interpolated - values[i][c]), tolerance)
+
+    def testUniformRotation(self) :
+        # Turning at constant speed is exactly what slerp interpolates
+        rotations = [(0.0, 0.0, math.sin(i / 80.0), math.cos(i / 80.0)) for i in range(100)]
+        self.assertEqual(self.reduce(rotations, rotation = True), [0, 99])
+
+    def testRotationAcrossTheSignFlip(self) :
+        # Half angles past 90 degrees: w changes its sign, the ends of the track are on opposite sides
+        rotations = [(0.0, 0.0, math.sin(i / 40.0), math.cos(i / 40.0)) for i in range(100)]
+        kept = self.reduce(rotations, rotation = True)
+        self.assertGreater(len(kept), 2)
+        for start, end in zip(kept, kept[1:]) :
+            for i in range(start + 1, end) :
+                w = (TIMES[i] - TIMES[start]) / (TIMES[end] - TIMES[start])
+                interpolated = animation.slerp(rotations[start], rotations[end], w)
+                self.assertLessEqual(min(max(abs(a - b) for a, b in zip(interpolated, rotations[i])),
+                                         max(abs(a + b) for a, b in zip(interpolated, rotations[i]))), 1e-4)
+        # With w kept positive the track jumps from q to -q, which is the same rotation
+        flipped = [r if r[3] >= 0.0 else tuple(-c for c in r) for r in rotations]
+        self.assertEqual(self.reduce(flipped, rotation = True), kept)
+
+if __name__ == "__main__" :
+    unittest.main()
@@ -0,0 +1,88 @@
+# ##### BEGIN GPL LICENSE BLOCK #####
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 2
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software Foundation,
+#  Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA.
+#
+# ##### END GPL LICENSE BLOCK #####
+
+import contextlib
+import json
+import os
+import shutil
+import sys
+import tempfile
+import types
+import unittest
+
+import support
+from io_scene_xml3d import batch
+
+# The Python interpreter stands in for Blender: "python -b file.blend -P ..."
+# runs the .blend file as a script, which prints a log and a result line.
+WORKER = """import sys
+sys.stdout.buffer.write(b"Read blend: caf\\xe9 \\xff\\n")
+print(%r + '{"status" : "ok"}')
+"""
+
+
+class BatchTest(unittest.TestCase) :
+
+    def setUp(self) :
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self) :
+        shutil.rmtree(self.directory, ignore_errors = True)
+
+    def blendFile(self, name) :
+        path = os.path.join(self.directory, name)
+        with open(path, 'w') as f :
+            f.write(WORKER % batch.RESULT_PREFIX)
+        return path
+
+    def arguments(self, files, blender = sys.executable) :
+        args = types.SimpleNamespace(files = files, list = [], output_dir = None, extension = ".xhtml", jobs = 2,
+                                     timeout = 60.0, blender = blender,
+                                     summary = os.path.join(self.directory, "summary.json"))
+        for name, default in batch.exporterOptions() :
+            setattr(args, name, default)
+        return args
+
+    def runBatch(self, args) :
+        with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull) :
+            return batch.runBatch(args)
+
+    def summary(self) :
+        with open(os.path.join(self.directory, "summary.json")) as f :
+            return json.load(f)
+
+    def testLogThatIsNotValidInTheLocaleEncoding(self) :
+        path = self.blendFile("scene.blend")
+        result = batch.exportFile(sys.executable, batch.__file__, path, path + ".xhtml", {}, 60.0)
+        self.assertEqual(result["status"], "ok")
+
+    def testFailedProcessFailsItsFileOnly(self) :
+        self.blendFile("a.blend")
+        self.blendFile("b.blend")
+        self.assertFalse(self.runBatch(self.arguments([self.directory], os.path.join(self.directory, "no-blender"))))
+        summary = self.summary()
+        self.assertEqual((summary["files"], summary["failed"]), (2, 2))
+        self.assertTrue(all("FileNotFoundError" in r["error"] for r in summary["results"]))
+
+    def testNoFilesFound(self) :
+        self.assertFalse(self.runBatch(self.arguments([os.path.join(self.directory, "*.blend")])))
+        self.assertFalse(os.path.exists(os.path.join(self.directory, "summary.json")))
+
+
+if __name__ == "__main__" :
+    unittest.main()
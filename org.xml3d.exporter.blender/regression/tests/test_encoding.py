@@ -0,0 +1,60 @@
+# ##### BEGIN GPL LICENSE BLOCK #####
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 2
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software Foundation,
+#  Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA.
+#
+# ##### END GPL LICENSE BLOCK #####
+
+import unittest
+
+import numpy
+
+import support
+from io_scene_xml3d import encoding
+
+
+class FormatFixedTest(unittest.TestCase) :
+    "formatFixed must write exactly what '%.<precision>f' writes"
+
+    def expected(self, values, precision) :
+        return " ".join("%.*f" % (precision, v) for v in values.astype(numpy.float64))
+
+    def testRandomValues(self) :
+        random = numpy.random.RandomState(3)
+        values = (random.standard_normal(2000) * 10.0 ** random.randint(-4, 5, 2000)).astype(numpy.float32)
+        for precision in (0, 1, 3, 6, 9, 12) :
+            with self.subTest(precision = precision) :
+                self.assertEqual(encoding.formatFixed(values, precision), self.expected(values, precision))
+
+    def testSpecialValues(self) :
+        # Negative zero, negatives that round to zero, halves, integers and powers of ten
+        values = numpy.array([0.0, -0.0, -0.0001, 0.5, 1.5, 2.5, -2.5, 1.0, 10.0, 99.99, 100.0, 123456.0, 1e-7],
+                             numpy.float32)
+        for precision in (0, 2, 6) :
+            with self.subTest(precision = precision) :
+                self.assertEqual(encoding.formatFixed(values, precision), self.expected(values, precision))
+
+    def testEmptyAndUnsupported(self) :
+        self.assertEqual(encoding.formatFixed(numpy.zeros(0, numpy.float32), 6), "")
+        self.assertIsNone(encoding.formatFixed(numpy.array([numpy.inf], numpy.float32), 6))
+        self.assertIsNone(encoding.formatFixed(numpy.array([1e30], numpy.float32), 6))
+
+    def testFormatFloatsFallsBack(self) :
+        values = numpy.array([1e30, numpy.nan, 0.25], numpy.float32)
+        self.assertEqual(encoding.formatFloats(values, 2), self.expected(values, 2))
+        self.assertEqual(encoding.formatFloats([0.125, -1.0], 3), "0.125 -1.000")
+
+
+if __name__ == "__main__" :
+    unittest.main()
@@ -0,0 +1,81 @@
+# ##### BEGIN GPL LICENSE BLOCK #####
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 2
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software Foundation,
+#  Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA.
+#
+# ##### END GPL LICENSE BLOCK #####
+
+
+import contextlib
+import os
+import shutil
+import tempfile
+import types
+import unittest
+from unittest import mock
+
+import support
+import bpy
+import bpy_extras.io_utils
+import corpus
+from io_scene_xml3d import export_xml3d, incremental
+
+
+def pathReference(filepath, base_src, base_dst, mode = 'AUTO', copy_subdir = "", copy_set = None, library = None) :
+    "path_reference in COPY mode, the file is added to copy_set"
+    copy_set.add((filepath, os.path.join(base_dst, os.path.basename(filepath))))
+    return os.path.basename(filepath)
+
+
+class IncrementalExportTest(unittest.TestCase) :
+
+    def setUp(self) :
+        self.directory = tempfile.mkdtemp()
+        corpus.buildScene("cube")
+        image = types.SimpleNamespace(filepath = "//textures/bricks.png", source = 'FILE', library = None)
+        slot = types.SimpleNamespace(texture_coords = 'UV', use_map_color_diffuse = True, diffuse_color_factor = 1.0,
+                                     texture = types.SimpleNamespace(type = 'IMAGE', image = image))
+        material = bpy.data.materials[0]
+        material.texture_slots = [slot]
+        material.use_textures = [True]
+        incremental.states.clear()
+
+    def tearDown(self) :
+        incremental.states.clear()
+        shutil.rmtree(self.directory, ignore_errors = True)
+
+    def export(self) :
+        options = dict(corpus.BASE_OPTIONS, pathMode = 'COPY', incrementalExport = True)
+        exporter = export_xml3d.XML3DExporterHelper(os.path.join(self.directory, "cube.xhtml"), **options)
+        with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull) :
+            exporter.write()
+        return exporter
+
+    def testReusedShaderCopiesItsImage(self) :
+        # An active tracker without recorded changes lets the second export reuse the shader
+        with mock.patch.object(incremental.tracker, "active", True), \
+             mock.patch.object(bpy_extras.io_utils, "path_reference", pathReference) :
+            first = self.export()
+            second = self.export()
+        copied = (("//textures/bricks.png", os.path.join(self.directory, "bricks.png")),)
+        self.assertEqual(first.copySet, set(copied))
+        self.assertEqual(second.copySet, set(copied))
+        self.assertIn("Red", second.exportState.elements)
+        self.assertNotIn("reexportTime", first.profile.totals)
+        self.assertGreater(second.profile.totals["reexportTime"], 0.0)
+        self.assertLessEqual(second.profile.totals["writexmlTime"], second.profile.totals["reexportTime"])
+
+
+if __name__ == "__main__" :
+    unittest.main()
@@ -0,0 +1,105 @@
+# ##### BEGIN GPL LICENSE BLOCK #####
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 2
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software Foundation,
+#  Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA.
+#
+# ##### END GPL LICENSE BLOCK #####
+
+
+import contextlib
+import os
+import queue
+import time
+import unittest
+from unittest import mock
+
+import support
+import bpy
+import corpus
+from io_scene_xml3d import export_xml3d, incremental, live_server
+
+
+class LiveSessionTest(unittest.TestCase) :
+
+    def setUp(self) :
+        corpus.buildScene("cube")
+        incremental.states.clear()
+        patches = [mock.patch.object(incremental.tracker, "active", True),
+                   mock.patch.object(live_server, "STRUCTURE_INTERVAL", 0.0)]
+        for patch in patches :
+            patch.start()
+            self.addCleanup(patch.stop)
+        self.output = open(os.devnull, 'w')
+        self.addCleanup(self.output.close)
+        self.session = live_server.LiveSession(0, 0.0)
+        self.viewer = queue.Queue()
+        self.session.clients.add(self.viewer)
+
+    def tearDown(self) :
+        with contextlib.redirect_stdout(self.output) :
+            self.session.stop()
+        incremental.states.clear()
+
+    def document(self) :
+        with open(self.session.filepath) as f :
+            return f.read()
+
+    def updateUntilReload(self) :
+        deadline = time.time() + 10.0
+        while time.time() < deadline :
+            with contextlib.redirect_stdout(self.output) :
+                self.session.update()
+            try :
+                if self.viewer.get(timeout = 0.01) == {"type" : "reload"} :
+                    return
+            except queue.Empty :
+                pass
+        self.fail("the document was not rebuilt")
+
+    def changeScene(self) :
+        tracker = incremental.tracker
+        tracker.counter += 1
+        tracker.changed[("scene", "Scene")] = tracker.counter
+
+    def testStartServesPlaceholderUntilRebuilt(self) :
+        with mock.patch.object(export_xml3d.XML3DExporterHelper, "write") as write :
+            self.session.start()
+        write.assert_not_called()
+        self.assertEqual(self.document(), live_server.PLACEHOLDER)
+        self.assertEqual(list(self.session.rebuild["pending"]), ["CubeMesh"])
+        self.updateUntilReload()
+        self.assertIn('id="mesh_CubeMesh_Red"', self.document())
+        self.assertIsNone(self.session.rebuild)
+
+    def testStructureChangeRebuildsChangedMeshesOnly(self) :
+        self.session.start()
+        self.updateUntilReload()
+        mesh = corpus.meshFromFaces("ExtraMesh", [(0, 0, 0), (1, 0, 0), (0, 1, 0)], [(0, 1, 2)])
+        corpus.link("Extra", mesh)
+        self.changeScene()
+        with mock.patch.object(live_server.LiveSession, "continueRebuild") as continueRebuild :
+            self.session.update()
+        # The update only marks the document stale, the old one is still served
+        self.assertIsNotNone(self.session.rebuild)
+        self.assertEqual(self.session.rebuild["meshCount"], 1)
+        self.assertEqual(list(self.session.rebuild["pending"]), ["ExtraMesh"])
+        self.assertNotIn("ExtraMesh", self.document())
+        continueRebuild.assert_called_once()
+        self.updateUntilReload()
+        self.assertIn('id="mesh_ExtraMesh_noMat"', self.document())
+        self.assertIn('id="mesh_CubeMesh_Red"', self.document())
+
+
+if __name__ == "__main__" :
+    unittest.main()
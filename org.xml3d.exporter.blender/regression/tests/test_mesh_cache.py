@@ -0,0 +1,109 @@
+# ##### BEGIN GPL LICENSE BLOCK #####
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 2
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software Foundation,
+#  Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA.
+#
+# ##### END GPL LICENSE BLOCK #####
+
+import contextlib
+import os
+import shutil
+import tempfile
+import unittest
+
+import support
+from io_scene_xml3d import mesh_cache
+
+
+class MeshCacheTest(unittest.TestCase) :
+
+    def setUp(self) :
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self) :
+        shutil.rmtree(self.directory, ignore_errors = True)
+
+    def entry(self, name) :
+        "An encoded mesh of about 1000 bytes"
+        return {"name" : name, "index" : ["0 1 2 " * 160]}
+
+    def entrySize(self) :
+        cache = mesh_cache.MeshCache(os.path.join(self.directory, "size"), 1 << 30)
+        cache.put("a", self.entry("a"))
+        return cache.size()
+
+    def testLeastRecentlyUsedIsEvicted(self) :
+        size = self.entrySize()
+        cache = mesh_cache.MeshCache(self.directory, 2 * size)
+        cache.put("a", self.entry("a"))
+        cache.put("b", self.entry("b"))
+        # a is used again, so b is the least recently used entry
+        self.assertEqual(cache.get("a")["name"], "a")
+        cache.put("c", self.entry("c"))
+        self.assertEqual(list(cache.entries), ["a", "c"])
+        self.assertEqual(cache.evicted, 1)
+        self.assertFalse(os.path.exists(cache.path("b")))
+        self.assertIsNone(cache.get("b"))
+        self.assertEqual((cache.hits, cache.misses), (1, 1))
+        self.assertLessEqual(cache.size(), 2 * size)
+
+    def testEntriesSurviveAReload(self) :
+        size = self.entrySize()
+        cache = mesh_cache.MeshCache(self.directory, 2 * size)
+        cache.put("a", self.entry("a"))
+        cache.put("b", self.entry("b"))
+        os.utime(cache.path("a"), (1000, 1000))
+        os.utime(cache.path("b"), (2000, 2000))
+        # A smaller limit evicts the oldest file when the cache is opened
+        reloaded = mesh_cache.MeshCache(self.directory, size)
+        self.assertEqual(list(reloaded.entries), ["b"])
+        self.assertEqual(reloaded.get("b")["name"], "b")
+
+    def testUnreadableEntryIsDropped(self) :
+        cache = mesh_cache.MeshCache(self.directory, 1 << 20)
+        cache.put("a", self.entry("a"))
+        with open(cache.path("a"), 'wb') as f :
+            f.write(b"not a pickle")
+        with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull) :
+            self.assertIsNone(cache.get("a"))
+        self.assertNotIn("a", cache.entries)
+
+    def testFailedWriteSkipsTheEntry(self) :
+        cache = mesh_cache.MeshCache(os.path.join(self.directory, "gone"), 1 << 20)
+        cache.put("a", self.entry("a"))
+        shutil.rmtree(cache.directory)
+        with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull) :
+            cache.put("b", self.entry("b"))
+        self.assertEqual(list(cache.entries), ["a"])
+
+    def testWritesLeaveNoTemporaryFiles(self) :
+        cache = mesh_cache.MeshCache(self.directory, 1 << 20)
+        # The temporary file another export is writing is not touched
+        with open(cache.path("a") + ".tmp", 'wb') as f :
+            f.write(b"partial")
+        cache.put("a", self.entry("a"))
+        self.assertEqual(sorted(os.listdir(self.directory)), ["a.pickle", "a.pickle.tmp"])
+        self.assertEqual(cache.get("a")["name"], "a")
+
+    def testKeyDependsOnArraysAndOptions(self) :
+        cache = mesh_cache.MeshCache(self.directory, 1 << 20)
+        job = {"materialCount" : 1, "binary" : False, "arrays" : {"co" : [0.0, 1.0], "uvs" : None}}
+        other = dict(job, arrays = {"co" : [0.0, 2.0], "uvs" : None})
+        self.assertEqual(cache.key(job, ("a",)), cache.key(dict(job), ("a",)))
+        self.assertNotEqual(cache.key(job, ("a",)), cache.key(other, ("a",)))
+        self.assertNotEqual(cache.key(job, ("a",)), cache.key(job, ("b",)))
+
+
+if __name__ == "__main__" :
+    unittest.main()
@@ -0,0 +1,98 @@
+# ##### BEGIN GPL LICENSE BLOCK #####
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 2
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software Foundation,
+#  Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA.
+#
+# ##### END GPL LICENSE BLOCK #####
+
+import array
+import unittest
+
+import numpy
+
+import support
+import corpus
+from io_scene_xml3d import mesh_extract
+
+
+def stripMesh() :
+    """Three quads in a row: two smooth ones sharing an edge and a flat one
+    that is folded up, with two materials and a UV layer"""
+    coords = [(0, 0, 0), (1, 0, 0), (2, 0, 0), (3, 0, 1), (0, 1, 0), (1, 1, 0), (2, 1, 0), (3, 1, 1)]
+    faces = [(0, 1, 5, 4), (1, 2, 6, 5), (2, 3, 7, 6)]
+    uvs = [(0.25 * v, 0.5 * f) for f in range(3) for v in range(4)]
+    return corpus.meshFromFaces("Strip", coords, faces, [True, True, False], [None, None], [0, 1, 1], uvs)
+
+
+class ExtractMeshArraysTest(unittest.TestCase) :
+
+    def setUp(self) :
+        self.mesh = stripMesh()
+
+    def checkArrays(self, arrays) :
+        "Checks the arrays of stripMesh, flattened"
+        self.assertEqual(list(arrays["loopStart"]), [0, 4, 8])
+        self.assertEqual(list(arrays["loopTotal"]), [4, 4, 4])
+        self.assertEqual(list(arrays["loopVertices"]), [0, 1, 5, 4, 1, 2, 6, 5, 2, 3, 7, 6])
+        self.assertEqual(list(arrays["materials"]), [0, 1, 1])
+        self.assertEqual(len(arrays["co"]), 8 * 3)
+        self.assertEqual(list(arrays["co"][9:12]), [3.0, 0.0, 1.0])
+        self.assertEqual(list(arrays["uvs"]), [c for f in range(3) for v in range(4) for c in (0.25 * v, 0.5 * f)])
+
+    def loopNormals(self, arrays) :
+        return numpy.asarray(arrays["loopNormals"], numpy.float64).reshape(-1, 3)
+
+    def testNumpyArrays(self) :
+        arrays = mesh_extract.extractMeshArrays(self.mesh)
+        self.assertIsInstance(arrays["co"], numpy.ndarray)
+        self.assertEqual(arrays["co"].shape, (8, 3))
+        self.assertEqual(arrays["loopNormals"].shape, (12, 3))
+        self.assertEqual(arrays["uvs"].shape, (12, 2))
+        flat = dict((name, None if value is None else value.ravel()) for name, value in arrays.items())
+        self.checkArrays(flat)
+
+    def testFlatBuffers(self) :
+        with support.numpyDisabled() :
+            arrays = mesh_extract.extractMeshArrays(self.mesh)
+        for name in ("co", "materials", "loopStart", "loopTotal", "loopVertices", "loopNormals", "uvs") :
+            self.assertIsInstance(arrays[name], array.array, name)
+        self.checkArrays(arrays)
+        numpy.testing.assert_array_equal(self.loopNormals(arrays),
+                                         self.loopNormals(mesh_extract.extractMeshArrays(self.mesh)))
+
+    def testSmoothAndFlatNormals(self) :
+        arrays = mesh_extract.extractMeshArrays(self.mesh)
+        smooth = mesh_extract.readAttribute(self.mesh.polygons, "use_smooth", 'i')
+        self.assertEqual(list(smooth), [1, 1, 0])
+        normals = self.loopNormals(arrays)
+        # Corners of the shared edge have the same normal in both smooth faces
+        numpy.testing.assert_allclose(normals[1], normals[4])
+        numpy.testing.assert_allclose(normals[2], normals[7])
+        # Vertex normals include the normal of the folded flat face
+        self.assertLess(normals[5][0], 0.0)
+        numpy.testing.assert_allclose(normals[0], (0.0, 0.0, 1.0), atol = 1e-6)
+        # All corners of the flat face have its face normal
+        faceNormal = numpy.array([-1.0, 0.0, 1.0]) / numpy.sqrt(2.0)
+        for loop in range(8, 12) :
+            numpy.testing.assert_allclose(normals[loop], faceNormal, atol = 1e-6)
+
+    def testWithoutUVLayer(self) :
+        mesh = corpus.meshFromFaces("Triangle", [(0, 0, 0), (1, 0, 0), (0, 1, 0)], [(0, 1, 2)])
+        self.assertIsNone(mesh_extract.extractMeshArrays(mesh)["uvs"])
+        with support.numpyDisabled() :
+            self.assertIsNone(mesh_extract.extractMeshArrays(mesh)["uvs"])
+
+
+if __name__ == "__main__" :
+    unittest.main()
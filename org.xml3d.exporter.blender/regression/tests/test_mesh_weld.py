@@ -0,0 +1,73 @@
+# ##### BEGIN GPL LICENSE BLOCK #####
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 2
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software Foundation,
+#  Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA.
+#
+# ##### END GPL LICENSE BLOCK #####
+
+import unittest
+
+import numpy
+
+import support
+import bpy
+import corpus
+from io_scene_xml3d import mesh_extract, mesh_weld
+
+
+def corpusMeshes() :
+    "(name, mesh, material count) of every mesh of the reference scenes"
+    meshes = []
+    for sceneName in sorted(corpus.SCENES) :
+        corpus.buildScene(sceneName)
+        for obj in bpy.context.scene.objects :
+            if obj.type == 'MESH' :
+                meshes.append(("%s/%s" % (sceneName, obj.name), obj.data, max(len(obj.data.materials), 1)))
+    return meshes
+
+
+class WeldParityTest(unittest.TestCase) :
+    "weldArrays on NumPy arrays and weldBuffers on flat buffers weld the same vertices"
+
+    def testCorpusMeshes(self) :
+        for name, mesh, materialCount in corpusMeshes() :
+            with self.subTest(mesh = name) :
+                arrays = mesh_extract.extractMeshArrays(mesh)
+                with support.numpyDisabled() :
+                    buffers = mesh_extract.extractMeshArrays(mesh)
+                    expected = mesh_weld.weldBuffers(buffers, materialCount)
+                actual = mesh_weld.weldArrays(arrays, materialCount)
+                self.assertEqual(len(actual[3]), len(expected[3]))
+                for values, expectedValues in zip(actual[:3], expected[:3]) :
+                    if expectedValues is None :
+                        self.assertIsNone(values)
+                    else :
+                        numpy.testing.assert_array_equal(values, numpy.asarray(expectedValues))
+                for indices, expectedIndices in zip(actual[3], expected[3]) :
+                    self.assertEqual(list(indices), list(expectedIndices))
+
+    def testSmoothCornersAreWelded(self) :
+        # A smooth and a flat quad sharing an edge: the smooth corners share one
+        # vertex per mesh vertex, the flat ones get their own
+        coords = [(0, 0, 0), (1, 0, 0), (1, 1, 0), (0, 1, 0), (2, 0, 1), (2, 1, 1)]
+        for smooth, vertexCount in (([True, True], 6), ([False, False], 8)) :
+            mesh = corpus.meshFromFaces("Quads", coords, [(0, 1, 2, 3), (1, 4, 5, 2)], smooth)
+            positions, normals, texcoords, indices = mesh_weld.weldArrays(mesh_extract.extractMeshArrays(mesh), 1)
+            self.assertEqual(len(positions) // 3, vertexCount)
+            self.assertEqual(len(indices[0]), 12)
+            self.assertIsNone(texcoords)
+
+
+if __name__ == "__main__" :
+    unittest.main()
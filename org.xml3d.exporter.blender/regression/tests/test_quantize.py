@@ -0,0 +1,67 @@
+# ##### BEGIN GPL LICENSE BLOCK #####
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 2
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software Foundation,
+#  Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA.
+#
+# ##### END GPL LICENSE BLOCK #####
+
+import unittest
+
+import numpy
+
+import support
+from io_scene_xml3d import quantize
+
+
+class QuantizeRangeTest(unittest.TestCase) :
+
+    def testRoundTripError(self) :
+        random = numpy.random.RandomState(5)
+        values = random.uniform(-50.0, 20.0, (1000, 3)) * (1.0, 0.01, 3.0)
+        q, scale, offset = quantize.quantizeRange(values, 3)
+        self.assertEqual(q.dtype, numpy.uint16)
+        decoded = q.reshape(-1, 3) * scale + offset
+        extent = values.max(axis = 0) - values.min(axis = 0)
+        # At most half a step of the 16 bit grid over the bounding box
+        bound = extent / quantize.UINT16_MAX / 2.0 * (1.0 + 1e-9)
+        self.assertTrue((numpy.abs(decoded - values) <= bound).all())
+        # The bounding box itself is exact
+        numpy.testing.assert_allclose(decoded.min(axis = 0), values.min(axis = 0))
+        numpy.testing.assert_allclose(decoded.max(axis = 0), values.max(axis = 0))
+
+    def testFlatComponentAndEmpty(self) :
+        values = numpy.array([[0.0, 2.0], [1.0, 2.0]])
+        q, scale, offset = quantize.quantizeRange(values, 2)
+        numpy.testing.assert_array_equal(q.reshape(-1, 2) * scale + offset, values)
+        q, scale, offset = quantize.quantizeRange(numpy.zeros(0), 3)
+        self.assertEqual(len(q), 0)
+
+
+class OctahedralTest(unittest.TestCase) :
+
+    def testRoundTripError(self) :
+        random = numpy.random.RandomState(6)
+        normals = random.standard_normal((5000, 3))
+        normals /= numpy.sqrt((normals * normals).sum(axis = 1))[:, None]
+        # Axes and the folded edges of the octahedron
+        normals = numpy.vstack((normals, numpy.eye(3), -numpy.eye(3), [[0.0, 0.6, -0.8], [-0.6, 0.0, -0.8]]))
+        decoded = quantize.decodeOctahedral(quantize.encodeOctahedral(normals))
+        numpy.testing.assert_allclose((decoded * decoded).sum(axis = 1), 1.0)
+        angle = numpy.arccos(numpy.clip((decoded * normals).sum(axis = 1), -1.0, 1.0))
+        # 16 bit octahedral normals are within 1/10000 radian
+        self.assertLess(angle.max(), 1e-4)
+
+
+if __name__ == "__main__" :
+    unittest.main()
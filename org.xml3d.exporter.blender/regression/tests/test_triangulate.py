@@ -0,0 +1,110 @@
+# ##### BEGIN GPL LICENSE BLOCK #####
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 2
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software Foundation,
+#  Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA.
+#
+# ##### END GPL LICENSE BLOCK #####
+
+import array
+import math
+import unittest
+
+import numpy
+
+import support
+from io_scene_xml3d import triangulate
+
+
+def signedArea(points) :
+    "Signed area of a polygon in the xy plane"
+    return 0.5 * sum(a[0] * b[1] - b[0] * a[1] for a, b in zip(points, points[1:] + points[:1]))
+
+
+def star(count, outer = 1.0, inner = 0.4) :
+    return [((outer if k % 2 == 0 else inner) * math.cos(k * math.pi / count),
+             (outer if k % 2 == 0 else inner) * math.sin(k * math.pi / count), 0.0) for k in range(2 * count)]
+
+
+CONCAVE = {
+    "star" : star(5),
+    "L" : [(0, 0, 0), (2, 0, 0), (2, 1, 0), (1, 1, 0), (1, 2, 0), (0, 2, 0)],
+    "C" : [(0, 0, 0), (3, 0, 0), (3, 1, 0), (1, 1, 0), (1, 2, 0), (3, 2, 0), (3, 3, 0), (0, 3, 0)],
+    "comb" : [(0, 0, 0), (5, 0, 0), (5, 2, 0), (4, 2, 0), (4, 1, 0), (3, 1, 0), (3, 2, 0), (2, 2, 0), (2, 1, 0),
+              (1, 1, 0), (1, 2, 0), (0, 2, 0)],
+}
+
+
+class EarClipTest(unittest.TestCase) :
+
+    def checkTriangulation(self, points, offsets) :
+        "n - 2 triangles with the winding of the polygon that cover exactly its area"
+        self.assertEqual(len(offsets), 3 * (len(points) - 2))
+        self.assertEqual(sorted(set(offsets)), list(range(len(points))))
+        area = signedArea(points)
+        total = 0.0
+        for t in range(0, len(offsets), 3) :
+            triangleArea = signedArea([points[k] for k in offsets[t:t + 3]])
+            self.assertGreater(triangleArea * area, 0.0, "triangle %s is flipped" % (offsets[t:t + 3],))
+            total += triangleArea
+        self.assertAlmostEqual(total, area)
+
+    def testConcavePolygons(self) :
+        for name, points in sorted(CONCAVE.items()) :
+            with self.subTest(polygon = name) :
+                self.checkTriangulation(points, triangulate.earClip(points))
+
+    def testClockwiseAndTilted(self) :
+        points = list(reversed(CONCAVE["C"]))
+        self.checkTriangulation(points, triangulate.earClip(points))
+        # Projection onto the dominant plane: the L rotated into the xz plane
+        tilted = [(x, 0.1 * x, y) for x, y, z in CONCAVE["L"]]
+        offsets = triangulate.earClip(tilted)
+        self.checkTriangulation([(x, z, 0.0) for x, y, z in tilted], offsets)
+
+    def testConvexPolygon(self) :
+        points = [(math.cos(a), math.sin(a), 0.0) for a in (k * 2 * math.pi / 7 for k in range(7))]
+        self.checkTriangulation(points, triangulate.earClip(points))
+
+    def testMeshTriangulation(self) :
+        "triangulateArrays and triangulateBuffers ear clip the n-gons of a mesh and fan the rest"
+        polygons = [[(0, 0, 0), (1, 0, 0), (0, 1, 0)], [(0, 0, 1), (1, 0, 1), (1, 1, 1), (0, 1, 1)],
+                    CONCAVE["star"], CONCAVE["C"]]
+        co = [c for points in polygons for point in points for c in point]
+        loopTotal = [len(points) for points in polygons]
+        loopStart = [sum(loopTotal[:face]) for face in range(len(polygons))]
+        expected = [[0, 1, 2], [0, 1, 2, 2, 3, 0], triangulate.earClip(polygons[2]), triangulate.earClip(polygons[3])]
+        
+        buffers = {
+            "co" : array.array('f', co), "loopStart" : array.array('i', loopStart),
+            "loopTotal" : array.array('i', loopTotal), "loopVertices" : array.array('i', range(sum(loopTotal))),
+        }
+        faceOffsets = triangulate.triangulateBuffers(buffers)
+        self.assertEqual(faceOffsets, expected)
+        self.checkTriangulation(polygons[2], faceOffsets[2])
+        
+        arrays = dict((name, numpy.array(values, numpy.float32 if name == "co" else numpy.int32))
+                      for name, values in buffers.items())
+        arrays["co"] = arrays["co"].reshape(-1, 3)
+        faces, offsets = triangulate.triangulateArrays(arrays)
+        self.assertEqual(faces.tolist(), [face for face, points in enumerate(polygons) for t in range(len(points) - 2)])
+        self.assertEqual(offsets.ravel().tolist(), [offset for face in expected for offset in face])
+
+    def testFanTriangles(self) :
+        self.assertEqual(triangulate.fanTriangles(3), [0, 1, 2])
+        self.assertEqual(triangulate.fanTriangles(4), [0, 1, 2, 2, 3, 0])
+        self.assertEqual(triangulate.fanTriangles(2), [])
+
+
+if __name__ == "__main__" :
+    unittest.main()
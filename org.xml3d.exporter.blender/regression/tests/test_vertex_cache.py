@@ -0,0 +1,90 @@
+# ##### BEGIN GPL LICENSE BLOCK #####
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 2
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software Foundation,
+#  Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA.
+#
+# ##### END GPL LICENSE BLOCK #####
+
+import unittest
+
+import numpy
+
+import support
+import scenes
+from io_scene_xml3d import mesh_weld, vertex_cache
+
+
+def gridMesh(triangles = 2000, materials = 2) :
+    "Welded positions and index arrays of a benchmark grid"
+    arrays = scenes.gridArrays(triangles, materials)
+    extracted = {
+        "co" : arrays["co"], "materials" : arrays["materialIndex"], "loopStart" : arrays["loopStart"],
+        "loopTotal" : arrays["loopTotal"], "loopVertices" : arrays["loopVertices"],
+        "loopNormals" : arrays["loopNormals"], "uvs" : arrays["uvs"],
+    }
+    return mesh_weld.weldArrays(extracted, materials)
+
+
+def triangleSet(positions, indices) :
+    "Triangles as sorted tuples of corner positions, independent of the order and the rotation of the corners"
+    corners = numpy.asarray(positions).reshape(-1, 3)[numpy.asarray(indices, numpy.int64)].reshape(-1, 3, 3)
+    result = []
+    for triangle in corners.tolist() :
+        first = triangle.index(min(triangle))
+        result.append(tuple(map(tuple, triangle[first:] + triangle[:first])))
+    return sorted(result)
+
+
+class TipsifyTest(unittest.TestCase) :
+
+    def testACMRDoesNotIncrease(self) :
+        positions, normals, texcoords, indices = gridMesh()
+        vertexCount = len(positions) // 3
+        for i in indices :
+            reordered = vertex_cache.tipsify(i, vertexCount)
+            self.assertLessEqual(vertex_cache.acmr(reordered), vertex_cache.acmr(i))
+            self.assertEqual(sorted(map(tuple, numpy.reshape(reordered, (-1, 3)).tolist())),
+                             sorted(map(tuple, numpy.reshape(i, (-1, 3)).tolist())))
+
+    def testOptimizeMesh(self) :
+        positions, normals, texcoords, indices = gridMesh()
+        result = vertex_cache.optimizeMesh(positions, normals, texcoords, indices)
+        newPositions, newNormals, newTexcoords, newIndices, before, after = result
+        self.assertLessEqual(after, before)
+        self.assertEqual(len(newPositions), len(positions))
+        for old, new in zip(indices, newIndices) :
+            self.assertEqual(triangleSet(newPositions, new), triangleSet(positions, old))
+        # Vertices are numbered in order of their first use
+        first = numpy.concatenate([numpy.asarray(i) for i in newIndices])
+        unused, order = numpy.unique(first, return_index = True)
+        self.assertTrue((numpy.diff(first[numpy.sort(order)]) > 0).all())
+
+    def testPurePython(self) :
+        positions, normals, texcoords, indices = gridMesh(500, 1)
+        with support.numpyDisabled() :
+            result = vertex_cache.optimizeMesh(positions.tolist(), normals.tolist(), texcoords.tolist(),
+                                               [i.tolist() for i in indices])
+        self.assertLessEqual(result[5], result[4])
+        self.assertEqual(triangleSet(result[0], result[3][0]), triangleSet(positions, indices[0]))
+
+    def testACMR(self) :
+        self.assertEqual(vertex_cache.acmr([]), 0.0)
+        # Two triangles sharing an edge transform 4 vertices
+        self.assertEqual(vertex_cache.acmr([0, 1, 2, 2, 1, 3]), 2.0)
+        # A cache of 3 vertices misses every vertex of triangles using 3 new ones
+        self.assertEqual(vertex_cache.acmr([0, 1, 2, 3, 4, 5, 0, 1, 2], 3), 3.0)
+
+
+if __name__ == "__main__" :
+    unittest.main()
@@ -0,0 +1,105 @@
+# ##### BEGIN GPL LICENSE BLOCK #####
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 2
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software Foundation,
+#  Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA.
+#
+# ##### END GPL LICENSE BLOCK #####
+
+import io
+import unittest
+from unittest import mock
+
+import support
+from io_scene_xml3d import xml3d
+
+
+def buildDocument(doc, meshCount = 20) :
+    "A document like the exporter writes, flushing the defs after every mesh"
+    root = doc.createXml3dElement(activeView_ = "#View")
+    root.setAttribute("xmlns", "http://www.xml3d.org/2009/xml3d")
+    doc.appendChild(root)
+    defs = doc.createDefsElement("mainDef")
+    root.appendChild(defs)
+    for i in range(meshCount) :
+        transform = doc.createTransformElement("t_%d" % i, "%d 0 0" % i, "1 1 1", "0 0 1 0")
+        defs.appendChild(transform)
+        data = doc.createDataElement("mesh_%d" % i)
+        defs.appendChild(data)
+        value = doc.createFloat3Element(None, "position")
+        value.setValue("0 0 0 1 0 0 0 1 0")
+        data.appendChild(value)
+        index = doc.createIntElement(None, "index")
+        index.setValue("0 1 2")
+        data.appendChild(index)
+        doc.flush(defs)
+    for i in range(meshCount) :
+        group = doc.createGroupElement("g_%d" % i, transform_ = "#t_%d" % i, shader_ = "#noMat")
+        group.appendChild(doc.createMeshElement(None, None, "triangles", "#mesh_%d" % i))
+        root.appendChild(group)
+    return doc
+
+
+def writeTree(meshCount = 20) :
+    out = io.StringIO()
+    buildDocument(xml3d.XML3DDocument(), meshCount).writexml(out, "", "\t", "\n", "UTF-8")
+    return out.getvalue()
+
+
+class StreamDocumentTest(unittest.TestCase) :
+
+    def testSameOutputAsTree(self) :
+        out = io.StringIO()
+        doc = xml3d.XML3DStreamDocument(out, "", "\t", "\n", "UTF-8")
+        buildDocument(doc)
+        # Everything up to the last mesh is written before the document is complete
+        written = out.getvalue()
+        self.assertIn('<data id="mesh_19">', written)
+        self.assertNotIn("<group", written)
+        doc.writexml(out, "", "\t", "\n", "UTF-8")
+        self.assertEqual(out.getvalue(), writeTree())
+
+    def testWithoutFlushedElements(self) :
+        out = io.StringIO()
+        doc = xml3d.XML3DStreamDocument(out, "", "\t", "\n", "UTF-8")
+        buildDocument(doc, 0).writexml(out, "", "\t", "\n", "UTF-8")
+        self.assertEqual(out.getvalue(), writeTree(0))
+
+
+class AttributeOrderTest(unittest.TestCase) :
+    "Attributes are written in the order minidom uses on the running Python"
+
+    def startTag(self, sortedAttributes) :
+        doc = xml3d.XML3DDocument()
+        transform = doc.createTransformElement("t", "1 2 3", "1 1 1", "0 0 1 0")
+        with mock.patch.object(xml3d, "_SORTED_ATTRIBUTES", sortedAttributes) :
+            return transform.startTag("")
+
+    def testInsertionOrder(self) :
+        self.assertEqual(self.startTag(False), '<transform id="t" translation="1 2 3" scale="1 1 1" rotation="0 0 1 0"')
+
+    def testSortedOrder(self) :
+        # minidom before Python 3.8, e.g. the Python 3.4 of Blender 2.71
+        self.assertEqual(self.startTag(True), '<transform id="t" rotation="0 0 1 0" scale="1 1 1" translation="1 2 3"')
+
+    def testStreamedOrder(self) :
+        with mock.patch.object(xml3d, "_SORTED_ATTRIBUTES", True) :
+            out = io.StringIO()
+            doc = xml3d.XML3DStreamDocument(out, "", "\t", "\n", "UTF-8")
+            buildDocument(doc, 3).writexml(out, "", "\t", "\n", "UTF-8")
+            self.assertEqual(out.getvalue(), writeTree(3))
+        self.assertIn('<xml3d activeView="#View" xmlns=', out.getvalue())
+
+
+if __name__ == "__main__" :
+    unittest.main()
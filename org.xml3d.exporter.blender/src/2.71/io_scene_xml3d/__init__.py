@@ -42,7 +42,7 @@ else:
     import bpy
     import bpy.utils
 
-from bpy.props import StringProperty, BoolProperty, FloatProperty
+from bpy.props import StringProperty, BoolProperty, FloatProperty, IntProperty
 
 from bpy_extras.io_utils import (ExportHelper, path_reference_mode)
 
@@ -88,6 +88,131 @@ class XML3DExporter(bpy.types.Operator, ExportHelper) :
                             name          = "Convert parent transformations",
                             description   = "Convert parent transformation to the object",
                             default       = False)
+    streamOutput    = BoolProperty(
+                            name          = "Stream Output",
+                            description   = "Write the document while it is built instead of keeping all of it in memory",
+                            default       = False)
+    binaryPayload   = BoolProperty(
+                            name          = "Binary Mesh Data",
+                            description   = "Write mesh arrays as little-endian Float32/Uint32 buffers into a .xml3d-bin file next to the document",
+                            default       = False)
+    parallelMeshes  = BoolProperty(
+                            name          = "Parallel Mesh Conversion",
+                            description   = "Weld and encode meshes in worker processes (needs NumPy)",
+                            default       = False)
+    workerCount     = IntProperty(
+                            name          = "Worker Processes",
+                            description   = "Number of worker processes for parallel mesh conversion, 0 uses one per CPU core",
+                            default       = 0,
+                            min           = 0)
+    useMeshCache    = BoolProperty(
+                            name          = "Use Mesh Cache",
+                            description   = "Reuse meshes encoded by earlier exports if their geometry and the export options did not change",
+                            default       = False)
+    meshCacheDir    = StringProperty(
+                            name          = "Mesh Cache Directory",
+                            description   = "Directory of the mesh cache, empty uses the temporary directory",
+                            default       = "",
+                            subtype       = 'DIR_PATH')
+    meshCacheSize   = IntProperty(
+                            name          = "Mesh Cache Size (MB)",
+                            description   = "Least recently used meshes are removed from the cache above this size",
+                            default       = 512,
+                            min           = 1)
+    positionPrecision = IntProperty(
+                            name          = "Position Precision",
+                            description   = "Decimal places of vertex positions",
+                            default       = 6,
+                            min           = 0,
+                            max           = 12)
+    normalPrecision = IntProperty(
+                            name          = "Normal Precision",
+                            description   = "Decimal places of vertex normals",
+                            default       = 6,
+                            min           = 0,
+                            max           = 12)
+    texcoordPrecision = IntProperty(
+                            name          = "Texcoord Precision",
+                            description   = "Decimal places of texture coordinates",
+                            default       = 6,
+                            min           = 0,
+                            max           = 12)
+    transformPrecision = IntProperty(
+                            name          = "Transform Precision",
+                            description   = "Decimal places of transformations and views",
+                            default       = 6,
+                            min           = 0,
+                            max           = 12)
+    quantizeMeshes  = BoolProperty(
+                            name          = "Quantize Mesh Data",
+                            description   = "Store positions and texcoords as 16 bit integers and normals in octahedral encoding, decoded by Xflow (needs NumPy)",
+                            default       = False)
+    writeProfile    = BoolProperty(
+                            name          = "Write Profile",
+                            description   = "Write timings and counts of the export to a .profile.json file next to the output",
+                            default       = False)
+    printProfile    = BoolProperty(
+                            name          = "Print Profile",
+                            description   = "Print a table of the export timings to the console",
+                            default       = False)
+    optimizeVertexCache = BoolProperty(
+                            name          = "Optimize Vertex Cache",
+                            description   = "Reorder triangles and vertices of meshes for better GPU vertex cache use",
+                            default       = False)
+    lodLevels       = IntProperty(
+                            name          = "Levels of Detail",
+                            description   = "Number of simplified index arrays written for every mesh, switched by distance to the view (needs NumPy). Meshes are simplified in parallel only with Parallel Mesh Conversion",
+                            default       = 0,
+                            min           = 0,
+                            max           = 8)
+    lodRatio        = FloatProperty(
+                            name          = "LOD Ratio",
+                            description   = "Fraction of the triangles kept from one level of detail to the next",
+                            default       = 0.5,
+                            min           = 0.01,
+                            max           = 0.99)
+    lodDistance     = FloatProperty(
+                            name          = "LOD Distance",
+                            description   = "Distance from which on the first level of detail is used, doubled for every further level",
+                            default       = 10.0,
+                            min           = 0.0)
+    tiledOutput     = BoolProperty(
+                            name          = "Tiled Output",
+                            description   = "Write mesh data into spatial tile files next to the document, with an index of the tile bounds",
+                            default       = False)
+    tileSize        = IntProperty(
+                            name          = "Meshes per Tile",
+                            description   = "Tiles with more meshes are split further",
+                            default       = 32,
+                            min           = 1)
+    compressOutput  = BoolProperty(
+                            name          = "Compress Output",
+                            description   = "Write the document gzip compressed, as .xhtml.gz",
+                            default       = False)
+    compressionLevel = IntProperty(
+                            name          = "Compression Level",
+                            description   = "Level of the gzip and brotli compression, higher is smaller and slower",
+                            default       = 6,
+                            min           = 1,
+                            max           = 9)
+    precompressResources = BoolProperty(
+                            name          = "Precompress Resources",
+                            description   = "Write brotli compressed .br variants of the payload and tile files (needs the brotli module)",
+                            default       = False)
+    incrementalExport = BoolProperty(
+                            name          = "Incremental Export",
+                            description   = "Keep the encoded meshes, transforms and shaders in memory and regenerate only those that changed on the next export to the same file",
+                            default       = False)
+    exportAnimation = BoolProperty(
+                            name          = "Export Animation",
+                            description   = "Sample the transformations of animated objects over the frame range and play them back with Xflow",
+                            default       = False)
+    animationTolerance = FloatProperty(
+                            name          = "Animation Tolerance",
+                            description   = "Keys that interpolating their neighbours reproduces within this tolerance are dropped",
+                            default       = 0.0001,
+                            min           = 0.0,
+                            precision     = 5)
     
     pathMode = path_reference_mode
 
@@ -98,7 +223,7 @@ class XML3DExporter(bpy.types.Operator, ExportHelper) :
             raise Exception("Filepath not set")
         
         from . import export_xml3d
-        exporter = export_xml3d.XML3DExporterHelper(self.filepath, self.onlySelected, self.exportCameras, self.applyModifiers, self.pathMode, self.annotatePhysics, self.writeHTMLHeader, self.ignoreLamps, self.useRaytracing, self.convertParenting)
+        exporter = export_xml3d.XML3DExporterHelper(self.filepath, self.onlySelected, self.exportCameras, self.applyModifiers, self.pathMode, self.annotatePhysics, self.writeHTMLHeader, self.ignoreLamps, self.useRaytracing, self.convertParenting, self.streamOutput, self.binaryPayload, self.parallelMeshes, self.workerCount, self.useMeshCache, self.meshCacheDir, self.meshCacheSize, self.positionPrecision, self.normalPrecision, self.texcoordPrecision, self.transformPrecision, self.quantizeMeshes, self.writeProfile, self.printProfile, self.optimizeVertexCache, self.lodLevels, self.lodRatio, self.lodDistance, self.tiledOutput, self.tileSize, self.compressOutput, self.compressionLevel, self.precompressResources, self.incrementalExport, self.exportAnimation, self.animationTolerance)
         exporter.write()
 
         return {'FINISHED'}
@@ -112,19 +237,60 @@ class XML3DExporter(bpy.types.Operator, ExportHelper) :
         return {'RUNNING_MODAL'}
 
 
+class XML3DLivePreview(bpy.types.Operator) :
+    '''Serve the scene as XML3D on localhost and push its changes to the viewers, run again to stop'''
+    bl_idname = "export_scene.xhtml_live"
+    bl_label = "XML3D Live Preview"
+    
+    port            = IntProperty(
+                            name          = "Port",
+                            description   = "Port of the preview server on localhost",
+                            default       = 8380,
+                            min           = 1024,
+                            max           = 65535)
+    interval        = FloatProperty(
+                            name          = "Update Interval",
+                            description   = "Seconds between two updates pushed to the viewers",
+                            default       = 0.2,
+                            min           = 0.02)
+    
+    def execute(self, context) :
+        from . import live_server
+        if live_server.session :
+            live_server.stop()
+            self.report({'INFO'}, "XML3D live preview stopped")
+            return {'FINISHED'}
+        
+        try :
+            session = live_server.start(self.port, self.interval)
+        except OSError as e :
+            self.report({'ERROR'}, "Could not start the XML3D live preview: %s" % e)
+            return {'CANCELLED'}
+        self.report({'INFO'}, "XML3D live preview at " + session.url())
+        return {'FINISHED'}
+
+
 def menu_export(self, context) :
     self.layout.operator(XML3DExporter.bl_idname, text="XML3D (.xhtml)")
+    self.layout.operator(XML3DLivePreview.bl_idname, text="XML3D Live Preview")
 
 
 def register() :
     bpy.utils.register_module(__name__)
 
+    from . import incremental
+    incremental.tracker.start()
+
     bpy.types.INFO_MT_file_export.append(menu_export)
 
 
 def unregister() :
     bpy.utils.unregister_module(__name__)
 
+    from . import incremental, live_server
+    live_server.stop()
+    incremental.tracker.stop()
+
     bpy.types.INFO_MT_file_export.remove(menu_export)
 
 if __name__ == "__main__":
@@ -0,0 +1,296 @@
+# ##### BEGIN GPL LICENSE BLOCK #####
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 2
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software Foundation,
+#  Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA.
+#
+# ##### END GPL LICENSE BLOCK #####
+
+"""Baked object animation.
+
+sampleTransforms steps through the frame range once, reading the matrices
+of all animated objects at every frame. reduceKeys keeps only the keys that
+interpolating between their neighbours does not reproduce within a
+tolerance, so constant tracks end up with a single key and linear ones
+with two. The document interpolates the keys with the xml3d.animateTransform
+Xflow operator of XFLOW_OPERATORS, at the time PLAYER_SCRIPT advances.
+"""
+
+import math
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+# Id of the data element holding the animation time
+TIME_DATA = "animationTime"
+TRANSFORM_COMPUTE = ("transform = xml3d.animateTransform(translation, translationKey, rotation, rotationKey, "
+                     "scale, scaleKey, time)")
+TRACKS = ("translation", "rotation", "scale")
+# Above this quaternion dot product slerp falls back to a normalized lerp, like the operator
+SLERP_THRESHOLD = 0.9995
+
+XFLOW_OPERATORS = """
+(function() {
+    function lerp(result, values, a, b, w, components) {
+        for (var c = 0; c < components; c++) {
+            result[c] = values[a + c] + (values[b + c] - values[a + c]) * w;
+        }
+    }
+    function slerp(result, values, a, b, w) {
+        var dot = 0, sign = 1;
+        for (var c = 0; c < 4; c++) {
+            dot += values[a + c] * values[b + c];
+        }
+        if (dot < 0) {
+            dot = -dot;
+            sign = -1;
+        }
+        var wa = 1 - w, wb = w * sign;
+        if (dot < %(threshold)s) {
+            var theta = Math.acos(dot), s = Math.sin(theta);
+            wa = Math.sin(wa * theta) / s;
+            wb = Math.sin(w * theta) / s * sign;
+        }
+        var length = 0;
+        for (var c = 0; c < 4; c++) {
+            result[c] = values[a + c] * wa + values[b + c] * wb;
+            length += result[c] * result[c];
+        }
+        length = Math.sqrt(length) || 1;
+        for (var c = 0; c < 4; c++) {
+            result[c] /= length;
+        }
+    }
+    function sample(result, values, keys, components, time, interpolate) {
+        var last = keys.length - 1, i = 0;
+        if (last <= 0 || time <= keys[0]) {
+            interpolate(result, values, 0, 0, 0, components);
+            return;
+        }
+        if (time >= keys[last]) {
+            interpolate(result, values, last * components, last * components, 0, components);
+            return;
+        }
+        var low = 0, high = last;
+        while (high - low > 1) {
+            var middle = (low + high) >> 1;
+            if (keys[middle] <= time) {
+                low = middle;
+            } else {
+                high = middle;
+            }
+        }
+        var w = (time - keys[low]) / (keys[high] - keys[low]);
+        interpolate(result, values, low * components, high * components, w, components);
+    }
+    var t = new Float32Array(3), r = new Float32Array(4), s = new Float32Array(3);
+    Xflow.registerOperator("xml3d.animateTransform", {
+        outputs: [{type: 'float4x4', name: 'result', customAlloc: true}],
+        params:  [{type: 'float3', source: 'translation', array: true},
+                  {type: 'float', source: 'translationKey', array: true},
+                  {type: 'float4', source: 'rotation', array: true},
+                  {type: 'float', source: 'rotationKey', array: true},
+                  {type: 'float3', source: 'scale', array: true},
+                  {type: 'float', source: 'scaleKey', array: true},
+                  {type: 'float', source: 'time', array: true}],
+        alloc: function(sizes) { sizes['result'] = 1; },
+        evaluate: function(result, translation, translationKey, rotation, rotationKey, scale, scaleKey, time) {
+            sample(t, translation, translationKey, 3, time[0], lerp);
+            sample(r, rotation, rotationKey, 4, time[0], slerp);
+            sample(s, scale, scaleKey, 3, time[0], lerp);
+            var x = r[0], y = r[1], z = r[2], w = r[3];
+            // Column major translation * rotation * scale
+            result[0] = (1 - 2 * (y * y + z * z)) * s[0];
+            result[1] = 2 * (x * y + w * z) * s[0];
+            result[2] = 2 * (x * z - w * y) * s[0];
+            result[3] = 0;
+            result[4] = 2 * (x * y - w * z) * s[1];
+            result[5] = (1 - 2 * (x * x + z * z)) * s[1];
+            result[6] = 2 * (y * z + w * x) * s[1];
+            result[7] = 0;
+            result[8] = 2 * (x * z + w * y) * s[2];
+            result[9] = 2 * (y * z - w * x) * s[2];
+            result[10] = (1 - 2 * (x * x + y * y)) * s[2];
+            result[11] = 0;
+            result[12] = t[0];
+            result[13] = t[1];
+            result[14] = t[2];
+            result[15] = 1;
+            return true;
+        }
+    });
+})();
+""" % {"threshold" : SLERP_THRESHOLD}
+
+PLAYER_SCRIPT = """
+(function() {
+    var start = null;
+    function step(now) {
+        var data = document.getElementById("%(time)s");
+        if (data) {
+            var values = data.getElementsByTagName("float");
+            var duration = parseFloat(values[1].textContent);
+            if (start === null) {
+                start = now;
+            }
+            var time = (now - start) / 1000;
+            values[0].textContent = duration > 0 ? time %% duration : 0;
+        }
+        window.requestAnimationFrame(step);
+    }
+    window.requestAnimationFrame(step);
+})();
+""" % {"time" : TIME_DATA}
+
+
+def isAnimated(obj, convertParenting) :
+    """True if the exported transform of obj may change over the frame range.
+    Constraints and parents only change the world matrix."""
+    if obj.animation_data is not None :
+        return True
+    if not convertParenting :
+        return False
+    while obj is not None :
+        if obj.animation_data is not None or len(obj.constraints) > 0 :
+            return True
+        obj = obj.parent
+    return False
+
+
+def sampleTransforms(scene, objects, convertParenting) :
+    """Key times in seconds and object name -> (translations, rotations, scales)
+    at every frame. Sets every frame once and restores the current frame."""
+    step = max(scene.frame_step, 1)
+    frames = list(range(scene.frame_start, scene.frame_end + 1, step))
+    fps = scene.render.fps / scene.render.fps_base
+    samples = dict((obj.name, ([], [], [])) for obj in objects)
+    currentFrame = scene.frame_current
+    try :
+        for frame in frames :
+            scene.frame_set(frame)
+            for obj in objects :
+                matrix = obj.matrix_world if convertParenting else obj.matrix_basis
+                translations, rotations, scales = samples[obj.name]
+                location, quaternion, scale = matrix.to_translation(), matrix.to_quaternion(), matrix.to_scale()
+                translations.append((location.x, location.y, location.z))
+                rotation = (quaternion.x, quaternion.y, quaternion.z, quaternion.w)
+                # q and -q are the same rotation, keep neighbours on the same side for interpolation
+                if rotations and sum(a * b for a, b in zip(rotation, rotations[-1])) < 0.0 :
+                    rotation = tuple(-c for c in rotation)
+                rotations.append(rotation)
+                scales.append((scale.x, scale.y, scale.z))
+    finally :
+        scene.frame_set(currentFrame)
+    times = [(frame - frames[0]) / fps for frame in frames]
+    return times, samples
+
+
+def slerp(a, b, w) :
+    "Interpolated unit quaternion, the same as the slerp of the operator"
+    dot = sum(x * y for x, y in zip(a, b))
+    sign = 1.0
+    if dot < 0.0 :
+        dot, sign = -dot, -1.0
+    wa, wb = 1.0 - w, w * sign
+    if dot < SLERP_THRESHOLD :
+        theta = math.acos(dot)
+        s = math.sin(theta)
+        wa, wb = math.sin(wa * theta) / s, math.sin(w * theta) / s * sign
+    result = [x * wa + y * wb for x, y in zip(a, b)]
+    length = math.sqrt(sum(c * c for c in result)) or 1.0
+    return [c / length for c in result]
+
+
+def worstKey(times, values, start, end, rotation) :
+    """Index and error of the key between start and end that interpolating them
+    reproduces worst. times and values are arrays if NumPy is available.
+    Quaternions q and -q are the same rotation, their error is the smaller one."""
+    span = times[end] - times[start]
+    if numpy is not None :
+        weights = (times[start + 1:end] - times[start]) / span
+        a, b = values[start], values[end]
+        if rotation :
+            dot = float(numpy.dot(a, b))
+            if dot < 0.0 :
+                b, dot = -b, -dot
+            if dot < SLERP_THRESHOLD :
+                theta = math.acos(dot)
+                interpolated = (numpy.sin((1.0 - weights) * theta)[:, None] * a +
+                                numpy.sin(weights * theta)[:, None] * b) / math.sin(theta)
+            else :
+                interpolated = a + (b - a) * weights[:, None]
+            interpolated /= numpy.sqrt((interpolated * interpolated).sum(axis = 1))[:, None]
+            errors = numpy.minimum(numpy.abs(values[start + 1:end] - interpolated).max(axis = 1),
+                                   numpy.abs(values[start + 1:end] + interpolated).max(axis = 1))
+        else :
+            interpolated = a + (b - a) * weights[:, None]
+            errors = numpy.abs(values[start + 1:end] - interpolated).max(axis = 1)
+        index = int(errors.argmax())
+        return start + 1 + index, float(errors[index])
+    
+    worst, worstError = start + 1, -1.0
+    for i in range(start + 1, end) :
+        w = (times[i] - times[start]) / span
+        if rotation :
+            interpolated = slerp(values[start], values[end], w)
+            error = min(max(abs(x - y) for x, y in zip(values[i], interpolated)),
+                        max(abs(x + y) for x, y in zip(values[i], interpolated)))
+        else :
+            interpolated = [x + (y - x) * w for x, y in zip(values[start], values[end])]
+            error = max(abs(x - y) for x, y in zip(values[i], interpolated))
+        if error > worstError :
+            worst, worstError = i, error
+    return worst, worstError
+
+
+def reduceKeys(times, values, tolerance, rotation = False) :
+    """Indices of the keys to keep, so that interpolating between them
+    reproduces every value within tolerance. Constant tracks keep one key."""
+    last = len(values) - 1
+    if numpy is not None :
+        times, values = numpy.array(times, numpy.float64), numpy.array(values, numpy.float64)
+        if numpy.abs(values - values[0]).max() <= tolerance :
+            return [0]
+    elif all(max(abs(x - y) for x, y in zip(value, values[0])) <= tolerance for value in values) :
+        return [0]
+    kept = set([0, last])
+    segments = [(0, last)]
+    while segments :
+        start, end = segments.pop()
+        if end - start < 2 :
+            continue
+        index, error = worstKey(times, values, start, end, rotation)
+        if error > tolerance :
+            kept.add(index)
+            segments.append((start, index))
+            segments.append((index, end))
+    return sorted(kept)
+
+
+def animationTracks(times, samples, tolerance) :
+    """Object name -> track name -> (key times, flat key values) of the objects
+    whose transform changes, and the number of keys before and after reduction"""
+    animations = {}
+    sampledKeys = keptKeys = 0
+    for name, tracks in samples.items() :
+        reduced = {}
+        for trackName, values in zip(TRACKS, tracks) :
+            kept = reduceKeys(times, values, tolerance, trackName == "rotation")
+            reduced[trackName] = ([times[i] for i in kept], [c for i in kept for c in values[i]])
+            sampledKeys += len(values)
+            keptKeys += len(kept)
+        if any(len(keyTimes) > 1 for keyTimes, keyValues in reduced.values()) :
+            animations[name] = reduced
+    return animations, sampledKeys, keptKeys
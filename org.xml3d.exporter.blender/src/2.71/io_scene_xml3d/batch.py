@@ -0,0 +1,273 @@
+# ##### BEGIN GPL LICENSE BLOCK #####
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 2
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software Foundation,
+#  Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA.
+#
+# ##### END GPL LICENSE BLOCK #####
+
+"""Command line batch export of .blend files.
+
+    blender -b -P io_scene_xml3d/batch.py -- [options] files...
+
+Files may be .blend files, glob patterns or directories (searched for
+.blend files). Every file is exported by its own background Blender
+process, up to --jobs of them at a time. Every option of
+XML3DExporterHelper is available as a flag, e.g. --binary-payload,
+--no-apply-modifiers or --position-precision 4. A JSON summary of all
+exports is written to --summary or printed to stdout.
+"""
+
+import argparse
+import concurrent.futures
+import glob
+import inspect
+import json
+import os
+import re
+import subprocess
+import sys
+import time
+import traceback
+
+if __name__ == "__main__" :
+    # Run as a script with -P, import the add-on from next to this file
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    from io_scene_xml3d import export_xml3d
+else :
+    from . import export_xml3d
+
+import bpy
+
+# Prefix of the line a worker prints its result on, Blender prints a lot more to stdout
+RESULT_PREFIX = "XML3D_BATCH_RESULT "
+
+PATH_MODES = ('AUTO', 'ABSOLUTE', 'RELATIVE', 'MATCH', 'STRIP', 'COPY')
+
+# Defaults of the options XML3DExporterHelper has no default for. Like the
+# operator, except that the whole scene is exported instead of the selection.
+REQUIRED_DEFAULTS = {
+    "onlySelected" : False,
+    "exportCameras" : False,
+    "applyModifiers" : True,
+    "pathMode" : 'RELATIVE',
+    "annotatePhysics" : False,
+    "writeHTMLHeader" : False,
+    "ignoreLamps" : False,
+    "useRaytracing" : True,
+    "convertParenting" : False,
+}
+
+
+def exporterOptions() :
+    "Option name -> default for every argument of XML3DExporterHelper except filepath"
+    parameters = inspect.signature(export_xml3d.XML3DExporterHelper.__init__).parameters
+    options = []
+    for name, parameter in parameters.items() :
+        if name in ("self", "filepath") :
+            continue
+        if parameter.default is inspect.Parameter.empty :
+            options.append((name, REQUIRED_DEFAULTS[name]))
+        else :
+            options.append((name, parameter.default))
+    return options
+
+
+def flagName(optionName) :
+    "camelCase option name -> --dashed-flag"
+    dashed = re.sub(r"([a-z0-9])([A-Z])", r"\1-\2", optionName)
+    dashed = re.sub(r"([A-Z])([A-Z][a-z])", r"\1-\2", dashed)
+    return "--" + dashed.lower()
+
+
+def createParser() :
+    parser = argparse.ArgumentParser(prog = "blender -b -P batch.py --",
+                                     description = "Export .blend files to XML3D.")
+    parser.add_argument("files", nargs = "*", help = ".blend files, glob patterns or directories")
+    parser.add_argument("--list", action = "append", default = [],
+                        help = "text file with one .blend file or pattern per line")
+    parser.add_argument("--output-dir", default = None,
+                        help = "directory of the exported files, default is next to each .blend file")
+    parser.add_argument("--extension", default = ".xhtml", help = "extension of the exported files")
+    parser.add_argument("--jobs", type = int, default = os.cpu_count() or 1,
+                        help = "number of Blender processes exporting in parallel")
+    parser.add_argument("--timeout", type = float, default = None,
+                        help = "seconds after which an export is killed")
+    parser.add_argument("--blender", default = bpy.app.binary_path or "blender",
+                        help = "Blender executable of the worker processes")
+    parser.add_argument("--summary", default = None, help = "write the JSON summary to this file instead of stdout")
+    parser.add_argument("--worker", default = None, help = argparse.SUPPRESS)
+    addExporterArguments(parser)
+    return parser
+
+
+def addExporterArguments(parser) :
+    "A flag for every option of XML3DExporterHelper"
+    group = parser.add_argument_group("export options")
+    for name, default in exporterOptions() :
+        flag = flagName(name)
+        if isinstance(default, bool) :
+            group.add_argument(flag, dest = name, action = "store_true", default = default,
+                               help = "default" if default else None)
+            group.add_argument("--no-" + flag[2:], dest = name, action = "store_false",
+                               help = None if default else "default")
+        elif name == "pathMode" :
+            group.add_argument(flag, dest = name, choices = PATH_MODES, default = default)
+        else :
+            group.add_argument(flag, dest = name, type = type(default), default = default,
+                               help = "default: %r" % (default,))
+
+
+def scriptArguments(argv) :
+    "Arguments after '--', Blender ignores those"
+    if "--" in argv :
+        return argv[argv.index("--") + 1:]
+    return []
+
+
+def findBlendFiles(patterns, listFiles) :
+    "Expands files, glob patterns and directories to a sorted list without duplicates"
+    patterns = list(patterns)
+    for listFile in listFiles :
+        with open(listFile) as f :
+            patterns.extend(line.strip() for line in f if line.strip() and not line.startswith("#"))
+
+    files = []
+    for pattern in patterns :
+        if os.path.isdir(pattern) :
+            for root, dirNames, fileNames in os.walk(pattern) :
+                files.extend(os.path.join(root, fileName) for fileName in fileNames if fileName.endswith(".blend"))
+        elif glob.has_magic(pattern) :
+            files.extend(glob.glob(pattern))
+        else :
+            files.append(pattern)
+    return sorted(set(os.path.abspath(f) for f in files))
+
+
+def outputPath(blendFile, outputDir, inputDir, extension) :
+    """Path of the exported file, next to the .blend file or at the same
+    path relative to inputDir inside outputDir"""
+    output = os.path.splitext(blendFile)[0] + extension
+    if not outputDir :
+        return output
+    return os.path.join(outputDir, os.path.relpath(output, inputDir))
+
+
+def exportFile(blender, scriptPath, blendFile, output, options, timeout) :
+    "Exports blendFile in a background Blender process, returns the summary entry"
+    command = [blender, "-b", blendFile, "-P", scriptPath, "--", "--worker", json.dumps(dict(options, filepath = output))]
+    result = {"blend" : blendFile, "output" : output}
+    start = time.time()
+    process = subprocess.Popen(command, stdout = subprocess.PIPE, stderr = subprocess.STDOUT)
+    try :
+        log, _ = process.communicate(timeout = timeout)
+    except subprocess.TimeoutExpired :
+        process.kill()
+        log, _ = process.communicate()
+        result["error"] = "Timeout after %.0f s" % timeout
+    # Paths and object names in the log need not be valid in the locale encoding
+    log = log.decode("utf-8", "replace")
+    result["returncode"] = process.returncode
+    result["duration"] = time.time() - start
+
+    for line in log.splitlines() :
+        if line.startswith(RESULT_PREFIX) :
+            result.update(json.loads(line[len(RESULT_PREFIX):]))
+    if "status" not in result :
+        result["status"] = "failed"
+        result.setdefault("error", "Blender exited without a result")
+        result["log"] = log[-4000:]
+    return result
+
+
+def runBatch(args) :
+    files = findBlendFiles(args.files, args.list)
+    if not files :
+        print("ERROR: No .blend files found in %s" % " ".join(args.files + args.list))
+        return False
+    # Directory structure below the common directory of all files is kept in the output directory
+    inputDir = os.path.dirname(os.path.commonprefix(files))
+    outputs = [outputPath(blendFile, args.output_dir, inputDir, args.extension) for blendFile in files]
+    for output in outputs :
+        if not os.path.isdir(os.path.dirname(output)) :
+            os.makedirs(os.path.dirname(output))
+    options = dict((name, getattr(args, name)) for name, default in exporterOptions())
+    scriptPath = os.path.abspath(__file__)
+
+    print("Exporting %d files with %d Blender processes" % (len(files), args.jobs))
+    start = time.time()
+    results = []
+    with concurrent.futures.ThreadPoolExecutor(max(1, args.jobs)) as queue :
+        futures = dict((queue.submit(exportFile, args.blender, scriptPath, blendFile, output, options, args.timeout),
+                        (blendFile, output)) for blendFile, output in zip(files, outputs))
+        for future in concurrent.futures.as_completed(futures) :
+            try :
+                result = future.result()
+            except Exception as e :
+                # A file whose export could not even be run fails alone
+                blendFile, output = futures[future]
+                result = {"blend" : blendFile, "output" : output, "status" : "failed", "duration" : 0.0,
+                          "error" : "%s: %s" % (type(e).__name__, e), "traceback" : traceback.format_exc()}
+            print("%s: %s (%.1f s)" % (result["status"], result["blend"], result["duration"]))
+            results.append(result)
+
+    results.sort(key = lambda r : r["blend"])
+    failed = sum(1 for r in results if r["status"] != "ok")
+    summary = {
+        "files" : len(results),
+        "succeeded" : len(results) - failed,
+        "failed" : failed,
+        "duration" : time.time() - start,
+        "options" : options,
+        "results" : results,
+    }
+    if args.summary :
+        with open(args.summary, 'w') as out :
+            json.dump(summary, out, indent = 1)
+    else :
+        print(json.dumps(summary, indent = 1))
+    return failed == 0
+
+
+def runWorker(optionsJSON) :
+    "Exports the loaded .blend file and prints the result line"
+    options = json.loads(optionsJSON)
+    result = {}
+    try :
+        exporter = export_xml3d.XML3DExporterHelper(**options)
+        if exporter.write() is False :
+            result["status"] = "failed"
+            result["error"] = "Could not open %s" % options["filepath"]
+        else :
+            result["status"] = "ok"
+            result["profile"] = exporter.profile.report()["totals"]
+    except Exception as e :
+        result["status"] = "failed"
+        result["error"] = "%s: %s" % (type(e).__name__, e)
+        result["traceback"] = traceback.format_exc()
+    print(RESULT_PREFIX + json.dumps(result))
+    sys.stdout.flush()
+
+
+def main(argv) :
+    args = createParser().parse_args(scriptArguments(argv))
+    if args.worker :
+        runWorker(args.worker)
+        return True
+    return runBatch(args)
+
+
+if __name__ == "__main__" :
+    ok = main(sys.argv)
+    if bpy.app.background :
+        sys.exit(0 if ok else 1)
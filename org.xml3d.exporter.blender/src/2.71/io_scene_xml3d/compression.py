@@ -0,0 +1,112 @@
+# ##### BEGIN GPL LICENSE BLOCK #####
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 2
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software Foundation,
+#  Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA.
+#
+# ##### END GPL LICENSE BLOCK #####
+
+"""Compressed output.
+
+CompressedWriter is a text file object for the serializer. Written text is
+collected into chunks which a background thread gzip compresses, so the
+serializer only waits when the bounded queue of chunks is full. Brotli
+variants of external resources (payload, tiles) need the brotli module.
+"""
+
+import concurrent.futures
+import gzip
+import os
+import queue
+import threading
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+GZIP_EXT = ".gz"
+BROTLI_EXT = ".br"
+
+
+class CompressedWriter :
+
+    def __init__(self, filepath, level = 6, chunkSize = 1 << 20, queueSize = 16) :
+        self.filepath = filepath
+        self.chunkSize = chunkSize
+        self.parts = []
+        self.partsSize = 0
+        self.error = None
+        self.chunks = queue.Queue(queueSize)
+        self.raw = open(filepath, 'wb')
+        name = os.path.basename(filepath)
+        if name.endswith(GZIP_EXT) :
+            name = name[:-len(GZIP_EXT)]
+        self.gzip = gzip.GzipFile(name, 'wb', level, self.raw)
+        self.thread = threading.Thread(target = self.compress, name = "XML3D gzip")
+        self.thread.daemon = True
+        self.thread.start()
+
+    def write(self, text) :
+        self.parts.append(text)
+        self.partsSize += len(text)
+        if self.partsSize >= self.chunkSize :
+            self.flushParts()
+
+    def flushParts(self) :
+        if not self.parts :
+            return
+        if self.error :
+            raise self.error
+        self.chunks.put(''.join(self.parts).encode("utf-8"))
+        self.parts = []
+        self.partsSize = 0
+
+    def compress(self) :
+        "Runs in the background thread until close puts None into the queue"
+        while True :
+            chunk = self.chunks.get()
+            if chunk is None :
+                return
+            if self.error is None :
+                try :
+                    self.gzip.write(chunk)
+                except Exception as e :
+                    # Keep taking chunks, so the writer does not block on a full queue
+                    self.error = e
+
+    def close(self) :
+        try :
+            self.flushParts()
+        finally :
+            self.chunks.put(None)
+            self.thread.join()
+            self.gzip.close()
+            self.raw.close()
+        if self.error :
+            raise self.error
+
+
+def brotliCompress(filepath, quality) :
+    with open(filepath, 'rb') as f :
+        data = brotli.compress(f.read(), quality = quality)
+    with open(filepath + BROTLI_EXT, 'wb') as f :
+        f.write(data)
+    return filepath + BROTLI_EXT
+
+
+def precompress(filepaths, quality) :
+    "Writes a .br variant next to every file, returns their paths"
+    quality = max(0, min(quality, 11))
+    with concurrent.futures.ThreadPoolExecutor(os.cpu_count() or 1) as pool :
+        return list(pool.map(lambda filepath : brotliCompress(filepath, quality), filepaths))
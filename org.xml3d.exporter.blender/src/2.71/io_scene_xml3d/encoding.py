@@ -0,0 +1,200 @@
+# ##### BEGIN GPL LICENSE BLOCK #####
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 2
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software Foundation,
+#  Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA.
+#
+# ##### END GPL LICENSE BLOCK #####
+
+"""Encoding of mesh arrays into element text or binary payload bytes.
+
+Nothing in here touches bpy, so encodeMesh can run in a worker process on
+the buffers that were read from the mesh on the main thread.
+"""
+
+from . import mesh_weld
+from . import payload
+from . import lod
+from . import quantize
+from . import vertex_cache
+
+import time
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+DEFAULT_PRECISION = 6
+# Above this float32 * 10^precision is no longer exact in a double
+MAX_FIXED_PRECISION = 12
+
+
+def formatFloats(values, precision = DEFAULT_PRECISION) :
+    """Formats a flat float sequence as space separated '%.<precision>f' values.
+    Float32 arrays are formatted in one vectorized pass, everything else with
+    one % operation over the whole sequence."""
+    if numpy is not None and isinstance(values, numpy.ndarray) :
+        if values.dtype == numpy.float32 and precision <= MAX_FIXED_PRECISION :
+            text = formatFixed(values, precision)
+            if text is not None :
+                return text
+        values = values.tolist()
+    return ' '.join(["%%.%df" % precision] * len(values)) % tuple(values)
+
+
+def formatFixed(values, precision) :
+    """Vectorized '%.<precision>f' formatting of a float32 array.
+
+    The values are scaled to integers (exact for float32 up to 12 digits, so
+    rint rounds exactly like printf), split into integer and fraction digits
+    and written into a character matrix with zeros for unused columns.
+    Returns None for values that do not fit into the integer range.
+    """
+    v = values.astype(numpy.float64).ravel()
+    if len(v) == 0 :
+        return ""
+    scale = 10 ** precision
+    if not numpy.isfinite(v).all() or numpy.abs(v).max() * scale >= 2.0 ** 62 :
+        return None
+    q = numpy.rint(numpy.abs(v) * scale).astype(numpy.int64)
+    intPart, fraction = numpy.divmod(q, scale)
+    intDigits = len(str(int(intPart.max())))
+
+    # Columns: sign, integer digits, [point, fraction digits], separator
+    width = 2 + intDigits + (precision + 1 if precision else 0)
+    chars = numpy.zeros((len(v), width), numpy.uint8)
+    chars[:, 0] = numpy.where(numpy.signbit(v), ord('-'), 0)
+    rest = intPart
+    for column in range(intDigits, 0, -1) :
+        rest, digit = numpy.divmod(rest, 10)
+        chars[:, column] = digit + ord('0')
+        if column < intDigits :
+            # No leading zeros
+            chars[intPart < 10 ** (intDigits - column), column] = 0
+    if precision :
+        chars[:, intDigits + 1] = ord('.')
+        rest = fraction
+        for column in range(width - 2, intDigits + 1, -1) :
+            rest, digit = numpy.divmod(rest, 10)
+            chars[:, column] = digit + ord('0')
+    chars[:, -1] = ord(' ')
+
+    chars = chars.ravel()
+    return chars[chars != 0].tobytes()[:-1].decode("ascii")
+
+
+def formatInts(values) :
+    if hasattr(values, "tolist") :
+        values = values.tolist()
+    return ' '.join(map(str, values))
+
+
+def encodeValues(values, isIndex, binary, precision = DEFAULT_PRECISION) :
+    "Returns the element text, or the payload bytes if binary is set"
+    if binary :
+        return payload.encodeArray(values, 'I' if isIndex else 'f')
+    if isIndex :
+        return formatInts(values)
+    return formatFloats(values, precision)
+
+
+def formatDecodeParameters(values) :
+    "Full float32 precision for scale/offset of quantized attributes"
+    return ' '.join(["%.9g"] * len(values)) % tuple(values)
+
+
+def encodeQuantized(values, typecode, binary) :
+    "Integers of a quantized attribute, as text or as (bytes, type name) for the payload"
+    if binary :
+        return payload.encodeArray(values, typecode), payload.ARRAY_TYPES[typecode][1]
+    return formatInts(values)
+
+
+def encodeQuantizedMesh(positions, normals, texcoords, binary) :
+    """Returns (compute, [(element type, name, encoded value), ...]) for each
+    attribute, the element types are the XML3D value element names"""
+    blocks = []
+    q, scale, offset = quantize.quantizeRange(positions, 3)
+    blocks.append((quantize.POSITION_COMPUTE, [
+        ("int", "qPosition", encodeQuantized(q, 'H', binary)),
+        ("float3", "positionScale", formatDecodeParameters(scale)),
+        ("float3", "positionOffset", formatDecodeParameters(offset)),
+    ]))
+    blocks.append((quantize.NORMAL_COMPUTE, [
+        ("int", "qNormal", encodeQuantized(quantize.encodeOctahedral(normals), 'h', binary)),
+    ]))
+    if texcoords is not None :
+        q, scale, offset = quantize.quantizeRange(texcoords, 2)
+        blocks.append((quantize.TEXCOORD_COMPUTE, [
+            ("int", "qTexcoord", encodeQuantized(q, 'H', binary)),
+            ("float2", "texcoordScale", formatDecodeParameters(scale)),
+            ("float2", "texcoordOffset", formatDecodeParameters(offset)),
+        ]))
+    return blocks
+
+
+def encodeMesh(job) :
+    """Welds and encodes the arrays of a mesh job.
+
+    Returns a dict with the encoded position, normal, texcoord (or None),
+    the encoded index array of every material and the index counts. With
+    quantization, "quantized" holds the blocks of encodeQuantizedMesh
+    instead of position, normal and texcoord. The number of welded vertices,
+    the weld, optimize and encode times and, if the vertex cache was
+    optimized, the ACMR before and after are returned for the export profile.
+    With levels of detail, "lods" holds the encoded index arrays of every
+    level, they index the vertex arrays of the full mesh.
+    """
+    start = time.perf_counter()
+    positions, normals, texcoords, indices = mesh_weld.weldArrays(job["arrays"], job["materialCount"])
+    weldTime = time.perf_counter() - start
+    optimizeTime = 0.0
+    acmr = None
+    if job.get("optimizeVertexCache") :
+        positions, normals, texcoords, indices, acmrBefore, acmrAfter = \
+            vertex_cache.optimizeMesh(positions, normals, texcoords, indices)
+        acmr = acmrBefore, acmrAfter
+        optimizeTime = time.perf_counter() - start - weldTime
+    lods = None
+    if job.get("lod") :
+        levels, ratio = job["lod"]
+        lods = lod.levelsOfDetail(positions, indices, levels, ratio)
+        if job.get("optimizeVertexCache") :
+            vertexCount = len(positions) // 3
+            lods = [[vertex_cache.tipsify(i, vertexCount) for i in level] for level in lods]
+        optimizeTime = time.perf_counter() - start - weldTime
+
+    binary = job["binary"]
+    precision = job["precision"]
+    if job.get("quantize") :
+        encoded = {
+            "quantized" : encodeQuantizedMesh(positions, normals, texcoords, binary),
+        }
+    else :
+        encoded = {
+            "position" : encodeValues(positions, False, binary, precision["position"]),
+            "normal" : encodeValues(normals, False, binary, precision["normal"]),
+            "texcoord" : None if texcoords is None else encodeValues(texcoords, False, binary, precision["texcoord"]),
+        }
+    encoded["index"] = [encodeValues(i, True, binary) for i in indices]
+    encoded["indexCount"] = [len(i) for i in indices]
+    encoded["vertexCount"] = len(positions) // 3
+    if lods :
+        encoded["lods"] = [[encodeValues(i, True, binary) for i in level] for level in lods]
+        encoded["lodIndexCount"] = [[len(i) for i in level] for level in lods]
+    encoded["weldTime"] = weldTime
+    encoded["optimizeTime"] = optimizeTime
+    encoded["encodeTime"] = time.perf_counter() - start - weldTime - optimizeTime
+    encoded["acmr"] = acmr
+    return encoded
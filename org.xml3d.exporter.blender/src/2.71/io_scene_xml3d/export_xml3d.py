@@ -24,77 +24,32 @@ __bpydoc__ = """\
 import bpy
 import array
 from . import xml3d
+from . import mesh_extract
+from . import mesh_weld
+from . import payload
+from . import encoding
+from . import mesh_cache
+from . import quantize
+from . import profiling
+from . import lod
+from . import tiling
+from . import compression
+from . import incremental
+from . import animation
 import sys
 import time
 import os
+import collections
+import concurrent.futures
+import multiprocessing
 #from Blender import Mesh, Window, Mathutils, Material #@UnresolvedImport
 import mathutils
 import bpy_extras.io_utils
 
 DEG2RAD = 0.017453292519943295
 RAD2DEG = 57.295779513082323
-
-class Vertex :
-    index = None
-    normal = None
-    texcoord = None
-    color = None
-    
-    def veckey3d(self, v) :
-        if v == None :
-            return None
-        return mathutils.Vector((round(v[0], 8), round(v[1], 8), round(v[2], 8)))
-
-    def veckey2d(self, v):
-        if v == None:
-            return None
-        return mathutils.Vector((round(v[0], 8), round(v[1], 8)))
-
-    def __init__(self, index, normal = None, texcoord = None, color = None):
-        self.index = index
-        self.normal = self.veckey3d(normal)
-        self.texcoord = self.veckey2d(texcoord)
-    
-    def __str__( self ) :
-        return "i: " + str(self.index) + ", n: " + str(self.normal) + ", t: " + str(self.texcoord)
- 
-    def __cmp__(self, other):
-        "Currently not used as __eq__ has higher priority"
-        #print("Compare")
-        if self.index < other.index:
-            return -1;
-        if self.index > other.index:
-            return 1;
-        
-        if self.normal != other.normal:
-            if self.normal == None:
-                return -1;
-            if other.normal == None:
-                return 1;
-            return cmp(self.normal, other.normal)
-
-        if self.texcoord != other.texcoord:
-            if self.texcoord == None:
-                return -1;
-            if other.texcoord == None:
-                return 1;
-            return cmp(self.texcoord, other.texcoord)
-
-        return 0;
- 
-    def __hash__( self ) :
-        return self.index
-                   
-    def __eq__(self, other):
-        return self.index == other.index and self.normal == other.normal and self.texcoord == other.texcoord
-
-def appendUnique(mlist, value):
-    if value in mlist :
-        return mlist[value], False
-    # Not in dict, thus add it
-    index = len(mlist)
-    mlist[value] = index
-    return index, True  
+# Elements are written one by one, this keeps the number of system calls low
+OUTPUT_BUFFER_SIZE = 1 << 20
 
 class XML3DExporterHelper :
     
@@ -103,7 +58,17 @@ class XML3DExporterHelper :
     
     def __init__(self, filepath, onlySelected, exportCameras, applyModifiers,
                  pathMode, annotatePhysics, writeHTMLHeader, ignoreLamps,
-                 useRaytracing, convertParenting) :
+                 useRaytracing, convertParenting, streamOutput = False,
+                 binaryPayload = False, parallelMeshes = False, workerCount = 0,
+                 useMeshCache = False, meshCacheDir = "", meshCacheSize = 512,
+                 positionPrecision = 6, normalPrecision = 6, texcoordPrecision = 6,
+                 transformPrecision = 6, quantizeMeshes = False,
+                 writeProfile = False, printProfile = False,
+                 optimizeVertexCache = False, lodLevels = 0, lodRatio = 0.5,
+                 lodDistance = 10.0, tiledOutput = False, tileSize = 32,
+                 compressOutput = False, compressionLevel = 6,
+                 precompressResources = False, incrementalExport = False,
+                 exportAnimation = False, animationTolerance = 0.0001) :
         self.filepath = filepath
         self.onlySelected = onlySelected
         self.exportCameras = exportCameras
@@ -114,10 +79,74 @@ class XML3DExporterHelper :
         self.ignoreLamps = ignoreLamps
         self.useRaytracing = useRaytracing
         self.convertParenting = convertParenting
+        self.streamOutput = streamOutput
+        self.binaryPayload = binaryPayload
+        self.parallelMeshes = parallelMeshes
+        self.workerCount = workerCount
+        self.useMeshCache = useMeshCache
+        self.meshCacheDir = meshCacheDir
+        self.meshCacheSize = meshCacheSize
+        self.meshCache = None
+        self.positionPrecision = positionPrecision
+        self.normalPrecision = normalPrecision
+        self.texcoordPrecision = texcoordPrecision
+        self.transformPrecision = transformPrecision
+        self.quantizeMeshes = quantizeMeshes
+        self.writeProfile = writeProfile
+        self.printProfile = printProfile
+        self.optimizeVertexCache = optimizeVertexCache
+        self.lodLevels = lodLevels
+        self.lodRatio = lodRatio
+        self.lodDistance = lodDistance
+        # Mesh data name -> number of levels of detail written for it
+        self.meshLods = {}
+        self.tiledOutput = tiledOutput
+        self.tileSize = tileSize
+        # Mesh data name -> tile file holding its data blocks
+        self.meshFiles = {}
+        self.compressOutput = compressOutput
+        self.compressionLevel = compressionLevel
+        self.precompressResources = precompressResources
+        # External files (payload, tiles) that get a brotli variant
+        self.resourceFiles = []
+        self.incrementalExport = incrementalExport
+        # ExportState of the last export to filepath and the one this export fills
+        self.previousState = None
+        self.exportState = None
+        # Mesh data name -> signature the mesh is kept under for the next incremental export
+        self.meshSignatures = {}
+        self.reusedMeshes = set()
+        self.exportAnimation = exportAnimation
+        self.animationTolerance = animationTolerance
+        # Object name -> track name -> (key times, key values) of objects with animated transforms
+        self.animations = {}
+        self.profile = profiling.ExportProfile()
+        self.payload = None
         self.withGUI = True
+        # Object name -> name of the mesh data block it uses
+        self.meshNames = {}
+        # Mesh data name -> physics:material element, created while the mesh is evaluated
+        self.physicsMaterials = {}
+    
+    def hasObjectModifiers(self, obj) :
+        "True if the exported mesh of obj differs from its (possibly shared) mesh data"
+        if not self.applyModifiers :
+            return False
+        for modifier in obj.modifiers :
+            if modifier.show_render :
+                return True
+        return False
+    
+    def meshDataName(self, obj) :
+        """Objects sharing mesh data share one data block, unless they have
+        modifiers. Those get their own block named after data and object."""
+        if self.hasObjectModifiers(obj) :
+            return obj.data.name + "_" + obj.name
+        return obj.data.name
     
     def writeMeshObject(self, obj) :
         mesh = obj.data
+        meshName = self.meshNames.get(obj.name, mesh.name)
 
         group = self.doc.createGroupElement(obj.name)
         group.setTransform("#t_" + obj.name)
@@ -125,10 +154,14 @@ class XML3DExporterHelper :
         if self.annotatePhysics :
             group.setAttribute("physics-material", "#phy_" + obj.name)
         
+        # Data blocks of the mesh are in this document or in its tile file
+        meshFile = self.meshFiles.get(meshName, "")
+        
         materialCount = len(mesh.materials)
         if materialCount == 0 :
             group.setShader("#noMat")
-            meshElem = self.doc.createMeshElement(None, None, "triangles", "#mesh_" + mesh.name + "_noMat")
+            meshElem = self.doc.createMeshElement(None, None, "triangles", meshFile + "#mesh_" + meshName + "_noMat")
+            self.setLodAttributes(meshElem, meshName)
             group.appendChild(meshElem)
         else :
             for materialIndex, material in enumerate(mesh.materials) :
@@ -139,14 +172,44 @@ class XML3DExporterHelper :
                 subgroup = self.doc.createGroupElement(shader_ = "#" + materialName)
                 group.appendChild(subgroup)
                 meshElem = self.doc.createMeshElement(type_ = "triangles")
-                meshElem.setSrc("#mesh_" + mesh.name + "_" + materialName)
+                meshElem.setSrc(meshFile + "#mesh_" + meshName + "_" + materialName)
+                self.setLodAttributes(meshElem, meshName)
                 subgroup.appendChild(meshElem)
         
         return group
+    
+    def setLodAttributes(self, meshElem, meshName) :
+        """Lists the levels of detail of a mesh element and the distances
+        from which on lod.SWITCH_SCRIPT switches to them"""
+        levels = self.meshLods.get(meshName, 0)
+        if levels == 0 :
+            return
+        src = meshElem.getAttribute("src")
+        meshElem.setAttribute("data-lod-src", " ".join("%s_lod%d" % (src, level) for level in range(1, levels + 1)))
+        distances = [self.lodDistance * 2 ** (level - 1) for level in range(1, levels + 1)]
+        meshElem.setAttribute("data-lod-distance", encoding.formatFloats(distances, self.transformPrecision))
             
-    def writeMeshData(self, parent, mesh, meshName = None) :
+    def writeArray(self, parent, valueElement, encoded) :
+        """Writes encoded values as text or, if they are bytes, as a reference into the payload file.
+        Bytes that are not Float32/Uint32 come as (bytes, type name)"""
+        arrayType = None
+        if isinstance(encoded, tuple) :
+            encoded, arrayType = encoded
+        if isinstance(encoded, bytes) :
+            byteOffset, byteLength = self.payload.writeBytes(encoded)
+            src = "%s#byteOffset=%d&byteLength=%d" % (self.payloadName, byteOffset, byteLength)
+            if arrayType :
+                src += "&type=" + arrayType
+            valueElement.setAttribute("src", src)
+        else :
+            valueElement.setValue(encoded)
+        parent.appendChild(valueElement)
+    
+    def prepareMeshData(self, mesh, meshName = None) :
+        """Reads everything needed from the mesh into a job for encoding.encodeMesh,
+        returns None for meshes without faces"""
         if len(mesh.polygons) == 0 :
-            return
+            return None
         
         if not meshName :
             meshName = mesh.name
@@ -161,112 +224,70 @@ class XML3DExporterHelper :
         elif materialCount == 0 :
             singleMaterialName = "_noMat"
             materialCount = 1
-        
-        # Speichert für jedes Material die entsprechenden Vertexindices
-        indices = [[] for m in range(materialCount)] #@UnusedVariable
-        # Speichert alle Vertices des Meshes in einer aufbereiteten Form
-        vertices = []
-        # Stellt sicher, dass keine Vertices doppelt aufgenommen werden
-        vertex_dict = {}
        
         print("Faces: %i" % len(mesh.polygons))
         
-        uvTexture = mesh.uv_textures.active
-        if uvTexture :
-            print("Active UV Texture: " + uvTexture.name)
-        
-        #meshTextureFaceLayerData = None
-        #if mesh.tessface_uv_textures.active :
-        #    meshTextureFaceLayerData = mesh.tessface_uv_textures.active.data
-        
-        i = 0
-        for faceIndex, face in enumerate(mesh.polygons) :
-            mv = None
-            uvFace = None
-            if uvTexture and uvTexture.data[faceIndex] :
-                uvFaceData = uvTexture.data[faceIndex]
-                uvFace = uvFaceData.uv1, uvFaceData.uv2, uvFaceData.uv3, uvFaceData.uv4
-            
-            newFaceVertices = []
-            
-            for i, vertexIndex in enumerate(face.vertices) :
-                if face.use_smooth :
-                    if uvFace :
-                        mv = Vertex(vertexIndex, mesh.vertices[vertexIndex].normal, uvFace[i])
-                    else :
-                        mv = Vertex(vertexIndex, mesh.vertices[vertexIndex].normal, None)
-                else :
-                    if uvFace :
-                        meshTexturePolyLayer = mesh.uv_textures.active
-                        mv = Vertex(vertexIndex, face.normal, uvFace[i])
-                    else:
-                        mv = Vertex(vertexIndex, face.normal)
-                
-                index, added = appendUnique(vertex_dict, mv)
-                newFaceVertices.append(index)
-                #print("enumerate: %d -> %d (%d)" % (i, vertexIndex, index))
-                if added :
-                    vertices.append(mv)
-            
-            if len(newFaceVertices) == 3 :
-                for vertexIndex in newFaceVertices :
-                    indices[face.material_index].append(vertexIndex)
-            elif len(newFaceVertices) == 4 :
-                #print("4 vertices found")
-                indices[face.material_index].append(newFaceVertices[0])
-                indices[face.material_index].append(newFaceVertices[1])
-                indices[face.material_index].append(newFaceVertices[2])
-                indices[face.material_index].append(newFaceVertices[2])
-                indices[face.material_index].append(newFaceVertices[3])
-                indices[face.material_index].append(newFaceVertices[0])
-
-        data = self.doc.createDataElement("mesh_" + meshName + singleMaterialName, None, None, None, None)    
-        parent.appendChild(data)
+        uvLayer = mesh.uv_layers.active
+        if uvLayer :
+            print("Active UV Layer: " + uvLayer.name)
         
-        # Vertex positions
-        value_list = []
-        for v in vertices :
-            value_list.append("%.6f %.6f %.6f" % tuple(mesh.vertices[v.index].co))
-                
-        valueElement = self.doc.createFloat3Element(None, "position")
-        valueElement.setValue(' '.join(value_list))
-        data.appendChild(valueElement)
+        job = {
+            "meshName" : meshName,
+            "dataName" : "mesh_" + meshName + singleMaterialName,
+            "materialCount" : materialCount,
+            "materialNames" : [material.name if material else None for material in mesh.materials],
+            "binary" : self.payload is not None,
+            "uvLayer" : uvLayer.name if uvLayer else None,
+            "precision" : self.meshPrecision(),
+            "quantize" : self.quantizeMeshes,
+            "optimizeVertexCache" : self.optimizeVertexCache,
+            "lod" : (self.lodLevels, self.lodRatio) if self.lodLevels > 0 else None,
+        }
+        job["arrays"] = mesh_extract.extractMeshArrays(mesh)
+        return job
+    
+    def createValueElement(self, elementType, name) :
+        if elementType == "int" :
+            return self.doc.createIntElement(None, name)
+        if elementType == "float2" :
+            return self.doc.createFloat2Element(None, name)
+        return self.doc.createFloat3Element(None, name)
+    
+    def writeEncodedMesh(self, parent, job, encoded) :
+        meshName = job["meshName"]
+        materialCount = job["materialCount"]
         
-        # Vertex normals
-        value_list = []
-        for v in vertices :
-            value_list.append("%.6f %.6f %.6f" % tuple(v.normal))
-     
-        valueElement = self.doc.createFloat3Element(None, "normal")
-        valueElement.setValue(' '.join(value_list))
-        data.appendChild(valueElement)
+        data = self.doc.createDataElement(job["dataName"], None, None, None, None)    
+        parent.appendChild(data)
         
-        # Vertex texCoord
-        if uvTexture :
-            value_list = []
-            for v in vertices :
-                if v.texcoord :
-                    value_list.append("%.6f %.6f" % tuple(v.texcoord))
-                else :
-                    value_list.append("0.0 0.0")
-    
-            valueElement = self. doc.createFloat2Element(None, "texcoord")
-            valueElement.setValue(' '.join(value_list))
-            data.appendChild(valueElement);
+        if encoded.get("quantized") :
+            # Quantized attributes, each decoded by an Xflow operator
+            for compute, values in encoded["quantized"] :
+                block = self.doc.createDataElement()
+                block.setAttribute("compute", compute)
+                data.appendChild(block)
+                for elementType, name, value in values :
+                    self.writeArray(block, self.createValueElement(elementType, name), value)
+        else :
+            # Vertex positions
+            self.writeArray(data, self.doc.createFloat3Element(None, "position"), encoded["position"])
+            
+            # Vertex normals
+            self.writeArray(data, self.doc.createFloat3Element(None, "normal"), encoded["normal"])
+            
+            # Vertex texCoord
+            if encoded["texcoord"] is not None :
+                self.writeArray(data, self.doc.createFloat2Element(None, "texcoord"), encoded["texcoord"])
         
         # Single or no material: write all in one data block
         if materialCount <= 1 :
-            valueElement = self.doc.createIntElement(None, "index")
-            valueElement.setValue(' '.join(map(str, indices[0])))
-            data.appendChild(valueElement)
+            self.writeArray(data, self.doc.createIntElement(None, "index"), encoded["index"][0])
         elif materialCount > 1 :
-            for materialIndex, material in enumerate(mesh.materials) :
-                if len(indices[materialIndex]) == 0:
+            for materialIndex, materialName in enumerate(job["materialNames"]) :
+                if encoded["indexCount"][materialIndex] == 0:
                     continue
                 
-                if material :
-                    materialName = material.name
-                else :
+                if not materialName :
                     materialName = "noMat%d" % (materialIndex)
                     self.noMaterialAppeared = True
                 
@@ -276,16 +297,264 @@ class XML3DExporterHelper :
                 refdata = self.doc.createDataElement(src_ = "#mesh_" + meshName)
                 data.appendChild(refdata)
 
-                valueElement = self.doc.createIntElement(None, "index")
-                valueElement.setValue(' '.join(map(str, indices[materialIndex])))
-                data.appendChild(valueElement)
-       
+                self.writeArray(data, self.doc.createIntElement(None, "index"), encoded["index"][materialIndex])
+        
+        # Levels of detail, only index arrays on top of the vertex data of the full mesh
+        for level, lodIndices in enumerate(encoded.get("lods") or (), 1) :
+            if materialCount <= 1 :
+                self.writeLodData(parent, job["dataName"], job["dataName"], level, lodIndices[0])
+                continue
+            for materialIndex, materialName in enumerate(job["materialNames"]) :
+                if encoded["indexCount"][materialIndex] == 0 :
+                    continue
+                if not materialName :
+                    materialName = "noMat%d" % (materialIndex)
+                self.writeLodData(parent, "mesh_" + meshName + "_" + materialName, "mesh_" + meshName,
+                                  level, lodIndices[materialIndex])
+        if encoded.get("lods") :
+            self.meshLods[meshName] = len(encoded["lods"])
+    
+    def writeLodData(self, parent, dataName, vertexDataName, level, encodedIndex) :
+        data = self.doc.createDataElement("%s_lod%d" % (dataName, level))
+        parent.appendChild(data)
+        
+        refdata = self.doc.createDataElement(src_ = "#" + vertexDataName)
+        data.appendChild(refdata)
+        
+        # Comes after the referenced data, so it replaces its index
+        self.writeArray(data, self.doc.createIntElement(None, "index"), encodedIndex)
+    
+    def writeMeshData(self, parent, mesh, meshName = None) :
+        job = self.prepareMeshData(mesh, meshName)
+        if job :
+            self.writeEncodedMesh(parent, job, encoding.encodeMesh(job))
+    
+    def createProcessPool(self, workerCount) :
+        "Process pool for encoding meshes, None if meshes are encoded on the main thread"
+        if not self.parallelMeshes :
+            return None
+        if mesh_weld.numpy is None :
+            print("WARNING: Parallel mesh conversion needs NumPy. Converting meshes one after another.")
+            return None
+        try :
+            context = multiprocessing.get_context("fork")
+        except ValueError :
+            context = multiprocessing.get_context("spawn")
+            context.set_executable(bpy.app.binary_path_python)
+        return concurrent.futures.ProcessPoolExecutor(workerCount, mp_context = context)
+    
+    def meshPrecision(self) :
+        return {
+            "position" : self.positionPrecision,
+            "normal" : self.normalPrecision,
+            "texcoord" : self.texcoordPrecision,
+        }
+    
+    def meshCacheOptions(self) :
+        "Export options that change the encoded meshes"
+        return (self.applyModifiers, sorted(self.meshPrecision().items()), self.quantizeMeshes,
+                self.optimizeVertexCache, self.lodLevels, self.lodRatio)
+    
+    def incrementalOptions(self) :
+        "Export options that change the meshes and elements kept for incremental exports"
+        return self.meshCacheOptions() + (self.binaryPayload, self.annotatePhysics, self.pathMode,
+                                          self.convertParenting, self.transformPrecision,
+                                          self.exportAnimation, self.animationTolerance)
+    
+    def writeMeshes(self, parent, meshes, writePhysics = True) :
+        workerCount = self.workerCount or os.cpu_count() or 1
+        pool = self.createProcessPool(workerCount)
+        # Jobs are written in submission order, with at most maxPending in flight
+        maxPending = 2 * workerCount if pool else 0
+        pending = collections.deque()
+        
+        def finish(meshName, job, future, cacheKey) :
+            profile = self.profile
+            if job :
+                try :
+                    with profile.measure("wait", "mesh", meshName) :
+                        encoded = future.result()
+                except concurrent.futures.BrokenExecutor :
+                    print("WARNING: Mesh worker processes failed. Converting %s on the main thread." % job["meshName"])
+                    with profile.measure("encode", "mesh", meshName) :
+                        encoded = encoding.encodeMesh(job)
+                if cacheKey :
+                    with profile.measure("cache", "mesh", meshName) :
+                        self.meshCache.put(cacheKey, encoded)
+                reused = meshName in self.reusedMeshes
+                self.profileMesh(meshName, encoded, cached = reused or (cacheKey is None and self.meshCache is not None))
+                with profile.measure("dom", "mesh", meshName) :
+                    self.writeEncodedMesh(parent, job, encoded)
+                if self.exportState :
+                    self.exportState.meshes[meshName] = (self.meshSignatures[meshName], incremental.withoutArrays(job),
+                                                         encoded, self.physicsMaterials.get(meshName))
+            with profile.measure("dom", "mesh", meshName) :
+                # The physics material was created while the mesh was evaluated
+                if (self.annotatePhysics and writePhysics):
+                    parent.appendChild(self.physicsMaterials[meshName])
+                self.doc.flush(parent)
+        
+        try :
+            for meshName in meshes :
+                job, encoded = self.reuseMesh(meshes[meshName], meshName)
+                future, cacheKey = None, None
+                if encoded is not None :
+                    future = concurrent.futures.Future()
+                    future.set_result(encoded)
+                if job and self.meshCache and future is None :
+                    with self.profile.measure("cache", "mesh", meshName) :
+                        cacheKey = self.meshCache.key(job, self.meshCacheOptions())
+                        encoded = self.meshCache.get(cacheKey)
+                    if encoded is not None :
+                        future = concurrent.futures.Future()
+                        future.set_result(encoded)
+                        cacheKey = None
+                if job and pool and future is None :
+                    try :
+                        future = pool.submit(encoding.encodeMesh, job)
+                    except concurrent.futures.BrokenExecutor :
+                        pass
+                if job and future is None :
+                    future = concurrent.futures.Future()
+                    with self.profile.measure("encode", "mesh", meshName) :
+                        future.set_result(encoding.encodeMesh(job))
+                pending.append((meshName, job, future, cacheKey))
+                
+                while len(pending) > maxPending :
+                    finish(*pending.popleft())
+            
+            while pending :
+                finish(*pending.popleft())
+        finally :
+            if pool :
+                pool.shutdown()
+    
+    def reuseMesh(self, obj, meshName) :
+        """Job and encoded mesh kept by the last incremental export if the
+        mesh did not change, else the extracted job and None. Without change
+        tracking the mesh is extracted and compared by its hash."""
+        if not self.exportState :
+            return self.extractMesh(obj, meshName), None
+        kept = self.keptMesh(obj, meshName)
+        if kept :
+            self.meshSignatures[meshName] = kept[0]
+            self.reusedMeshes.add(meshName)
+            if kept[3] is not None :
+                self.physicsMaterials[meshName] = kept[3]
+            return kept[1], kept[2]
+        
+        job = self.extractMesh(obj, meshName)
+        if job is None :
+            return None, None
+        self.meshSignatures[meshName] = self.meshSignature(obj) + (incremental.meshHash(job),)
+        kept = self.previousState.meshes.get(meshName) if self.previousState else None
+        if kept and kept[0] == self.meshSignatures[meshName] :
+            self.reusedMeshes.add(meshName)
+            return job, kept[2]
+        return job, None
+    
+    def meshSignature(self, obj) :
+        "Object and materials a kept mesh was written for, the hash of its geometry is added"
+        return (obj.name, tuple(material.name if material else None for material in obj.data.materials))
+    
+    def keptMesh(self, obj, meshName) :
+        """What the last incremental export kept of a mesh, if it can be used
+        without evaluating the mesh again, else None"""
+        previous = self.previousState
+        kept = previous.meshes.get(meshName) if previous else None
+        dataKind = "mesh" if obj.type == 'MESH' else "curve"
+        if kept and kept[0][:2] == self.meshSignature(obj) and \
+                previous.unchanged(("objectData", obj.name), (dataKind, obj.data.name)) :
+            return kept
+        return None
+    
+    def extractMesh(self, obj, meshName) :
+        """Evaluates the mesh of an object, reads it into a job for
+        encoding.encodeMesh and frees the evaluated mesh again, so only one
+        evaluated mesh exists at a time"""
+        with self.profile.measure("toMesh", "mesh", meshName) :
+            mesh = obj.to_mesh(self.scene, self.applyModifiers, 'RENDER')
+        try :
+            self.profile.count("mesh", meshName, faces = len(mesh.polygons), corners = len(mesh.loops))
+            with self.profile.measure("extract", "mesh", meshName) :
+                job = self.prepareMeshData(mesh, meshName)
+            if self.annotatePhysics :
+                self.physicsMaterials[meshName] = self.createPhysicsMaterial(mesh)
+        finally :
+            # The job holds copies of the arrays. Without remove the mesh
+            # would stay in memory and end up as an orphan in the file.
+            bpy.data.meshes.remove(mesh)
+        return job
+    
+    def profileMesh(self, meshName, encoded, cached) :
+        "Adds the counts and the weld/encode times of an encoded mesh to the profile"
+        arrays = [encoded.get("position"), encoded.get("normal"), encoded.get("texcoord"), encoded["index"]]
+        for compute, values in encoded.get("quantized") or () :
+            arrays.extend(value for elementType, name, value in values)
+        self.profile.count("mesh", meshName, vertices = encoded.get("vertexCount", 0),
+                           triangles = sum(encoded["indexCount"]) // 3,
+                           bytes = profiling.encodedSize(arrays), cached = cached)
+        if encoded.get("lods") :
+            lodTriangles = [sum(counts) // 3 for counts in encoded["lodIndexCount"]]
+            self.profile.item("mesh", meshName)["lodTriangles"] = lodTriangles
+        if encoded.get("acmr") :
+            acmrBefore, acmrAfter = encoded["acmr"]
+            self.profile.item("mesh", meshName).update(acmrBefore = acmrBefore, acmrAfter = acmrAfter)
+        if not cached :
+            # Measured in encodeMesh, possibly in a worker process
+            self.profile.setTime("mesh", meshName, weldTime = encoded.get("weldTime", 0.0),
+                                 optimizeTime = encoded.get("optimizeTime", 0.0),
+                                 encodeTime = encoded.get("encodeTime", 0.0))
+    
+    def writeTiles(self, parent, meshes) :
+        """Writes the mesh data blocks into one file per tile next to the
+        document and an index of the tiles with their bounds"""
+        items = []
+        for dataName in meshes :
+            obj = meshes[dataName]
+            items.append((dataName, tiling.worldBounds(obj.bound_box, obj.matrix_world)))
+        tiles = tiling.buildTiles(items, max(self.tileSize, 1))
+        self.profile.totals["tiles"] = len(tiles)
+        
+        base = os.path.splitext(self.filepath)[0]
+        mainDoc = self.doc
+        try :
+            for tileIndex, tile in enumerate(tiles) :
+                tilePath = "%s_tile_%d.xml" % (base, tileIndex)
+                tile["file"] = os.path.basename(tilePath)
+                out = open(tilePath, 'w', OUTPUT_BUFFER_SIZE, "UTF-8")
+                self.doc = self.createDocument(out)
+                tileElem = self.doc.createXml3dElement()
+                tileElem.setAttribute("xmlns", "http://www.xml3d.org/2009/xml3d")
+                self.doc.appendChild(tileElem)
+                
+                tileMeshes = collections.OrderedDict((dataName, meshes[dataName]) for dataName in tile["names"])
+                self.writeMeshes(tileElem, tileMeshes, writePhysics = False)
+                with self.profile.phase("writexml") :
+                    self.doc.writexml(out, "", "\t", "\n", "UTF-8")
+                out.close()
+                self.profile.count("file", tile["file"], fileBytes = os.path.getsize(tilePath))
+                self.resourceFiles.append(tilePath)
+                for dataName in tile["names"] :
+                    self.meshFiles[dataName] = tile["file"]
+        finally :
+            self.doc = mainDoc
+        
+        # Physics materials are referenced from the scene graph of the document
+        if self.annotatePhysics :
+            for dataName in meshes :
+                parent.appendChild(self.physicsMaterials[dataName])
+        
+        tiling.writeIndex(base + tiling.TILE_INDEX_EXT, tiles, os.path.basename(self.outputPath))
+        self.resourceFiles.append(base + tiling.TILE_INDEX_EXT)
+    
     def writeMainDef(self, parent) :
         defElement = self.doc.createDefsElement("mainDef")
         defElement.setIdAttribute( "id" )
         
         parent.appendChild(defElement)
         
+        # Mesh data name -> first object using it, evaluated one by one in writeMeshes
         meshes, lights, unknownParents = {}, {}, {}
         
         old_objmode = None
@@ -296,6 +565,10 @@ class XML3DExporterHelper :
         else :
             objects = bpy.context.scene.objects
             print("Objects: %i" % len(objects))
+        
+        if self.exportAnimation :
+            with self.profile.phase("animation") :
+                self.sampleAnimations(defElement, objects)
             
         for obj in objects :
             
@@ -309,10 +582,12 @@ class XML3DExporterHelper :
             objType = obj.type
             
             if objType == 'MESH' or objType == 'CURVE' :
-                dataName = obj.data.name
-                mesh = obj.to_mesh(self.scene, self.applyModifiers, 'RENDER')
+                dataName = self.meshDataName(obj)
+                self.meshNames[obj.name] = dataName
+                # Linked duplicates without modifiers are evaluated only once
+                if dataName not in meshes :
+                    meshes[dataName] = obj
                 #print("%s found: %s" % (objType, dataName))
-                meshes[dataName] = mesh
                 self.writeTransform(defElement, obj)
             elif objType == 'LAMP' and (not self.ignoreLamps) :
                 dataName = obj.data.name
@@ -334,30 +609,120 @@ class XML3DExporterHelper :
                 if not (unknownParents[objName] == None) :
                     self.writeTransform(defElement, unknownParents[objName])
         
-        for meshName in meshes :
-            mesh = meshes[meshName]
-            self.writeMeshData(defElement, mesh, meshName)
-            del mesh
-            #TODO
-            if (self.annotatePhysics):
-                self.writePhysicsMaterial(defElement, mesh);
+        print("Meshes: %i data blocks for %i objects" % (len(meshes), len(self.meshNames)))
+        if self.tiledOutput :
+            self.writeTiles(defElement, meshes)
+        else :
+            self.writeMeshes(defElement, meshes)
+        if self.exportState :
+            print("Incremental export: reused %i of %i meshes" % (len(self.reusedMeshes), len(meshes)))
+            self.profile.totals["reusedMeshes"] = len(self.reusedMeshes)
         
         for lightName in lights :
             light = lights[lightName]
-            self.writeLightShader(defElement, light)
-            
+            with self.profile.measure("lights", "light", lightName) :
+                if not self.reuseElement(defElement, "ls_" + light.name, ("lamp", light.name)) :
+                    self.writeLightShader(defElement, light)
+        
+        world = self.scene.world
         for material in bpy.data.materials :
             if material.users > 0 :
-                self.writePhongShader(defElement, material)
+                with self.profile.measure("materials", "material", material.name) :
+                    # The ambient intensity depends on the world
+                    if not self.reuseElement(defElement, material.name, ("material", material.name),
+                                             ("world", world.name if world else "")) :
+                        self.writePhongShader(defElement, material)
+                    else :
+                        # The kept shader references its image, which still has to be copied
+                        image = self.diffuseImage(material)
+                        if image :
+                            self.imageReference(image)
         
         if self.noMaterialAppeared :
             self.writeDefaultShader(defElement)
         
+        self.doc.flush(defElement)
+        
         if old_objmode :
             bpy.ops.object.mode_set(mode=old_objmode, toggle=False)
     
+    def sampleAnimations(self, parent, objects) :
+        "Bakes the transforms of animated objects (and their parents) into keys and writes the animation time"
+        animated = {}
+        for obj in objects :
+            while obj is not None :
+                if obj.users > 0 and animation.isAnimated(obj, self.convertParenting) :
+                    animated[obj.name] = obj
+                # Parents get their own transforms unless parenting is converted
+                obj = None if self.convertParenting else obj.parent
+        if not animated :
+            print("Animation: no animated objects")
+            return
+        
+        times, samples = animation.sampleTransforms(self.scene, list(animated.values()), self.convertParenting)
+        self.animations, sampledKeys, keptKeys = animation.animationTracks(times, samples, self.animationTolerance)
+        print("Animation: %i animated objects, kept %i of %i keys" % (len(self.animations), keptKeys, sampledKeys))
+        
+        data = self.doc.createDataElement(animation.TIME_DATA, None, None, None, None)
+        valueElement = self.doc.createFloatElement(None, "time")
+        valueElement.setValue("0")
+        data.appendChild(valueElement)
+        valueElement = self.doc.createFloatElement(None, "duration")
+        valueElement.setValue(encoding.formatFloats((times[-1],), self.transformPrecision))
+        data.appendChild(valueElement)
+        parent.appendChild(data)
+    
+    def writeAnimatedTransform(self, parent, obj) :
+        "Transform of an animated object, computed by Xflow from its keys and the animation time"
+        precision = self.transformPrecision
+        data = self.doc.createDataElement("t_" + obj.name, None, None, None, None)
+        data.setAttribute("compute", animation.TRANSFORM_COMPUTE)
+        tracks = self.animations[obj.name]
+        for trackName, createElement in (("translation", self.doc.createFloat3Element),
+                                         ("rotation", self.doc.createFloat4Element),
+                                         ("scale", self.doc.createFloat3Element)) :
+            keyTimes, keyValues = tracks[trackName]
+            valueElement = createElement(None, trackName)
+            valueElement.setValue(encoding.formatFloats(keyValues, precision))
+            data.appendChild(valueElement)
+            valueElement = self.doc.createFloatElement(None, trackName + "Key")
+            valueElement.setValue(encoding.formatFloats(keyTimes, precision))
+            data.appendChild(valueElement)
+        data.appendChild(self.doc.createDataElement(None, None, None, "#" + animation.TIME_DATA, None))
+        parent.appendChild(data)
+    
+    def reportReexport(self) :
+        """Adds the time of an incremental re-export and of writing the whole
+        document, which it does not save, to the profile totals"""
+        totals = self.profile.totals
+        totals["reexportTime"] = self.profile.duration
+        totals["writexmlTime"] = self.profile.phases.get("writexml", 0.0)
+        print("Incremental export: %.3f s, %.3f s of them writing the document" % (totals["reexportTime"],
+                                                                                   totals["writexmlTime"]))
+        if totals["reexportTime"] > incremental.REEXPORT_TARGET :
+            print("WARNING: Incremental export took longer than %.1f s, writing the document alone %.1f s." %
+                  (incremental.REEXPORT_TARGET, totals["writexmlTime"]))
+    
+    def reuseElement(self, parent, elementId, *datablocks) :
+        """Appends the element kept by the last incremental export, if none of
+        the (kind, name) data blocks it was written from changed since"""
+        previous = self.previousState
+        if previous is None or elementId not in previous.elements or not previous.unchanged(*datablocks) :
+            return False
+        self.keepElement(elementId, parent.appendChild(previous.elements[elementId]))
+        return True
+    
+    def keepElement(self, elementId, element) :
+        if self.exportState :
+            self.exportState.elements[elementId] = element
+    
     def writeTransform(self, parent, obj) :
         #try:
+            if obj.name in self.animations :
+                self.writeAnimatedTransform(parent, obj)
+                return
+            if self.reuseElement(parent, "t_" + obj.name, ("object", obj.name)) :
+                return
             matrix = None
             if self.convertParenting :
                 matrix = obj.matrix_world
@@ -368,20 +733,21 @@ class XML3DExporterHelper :
             scale = matrix.to_scale()
             #print("%s: %.6f %.6f %.6f %.6f" % (obj.name, quat[1], quat[2], quat[3], quat[0]))
 
+            precision = self.transformPrecision
             transform = self.doc.createTransformElement("t_" + obj.name)
-            transform.setTranslation("%.6f %.6f %.6f" % (location.x, location.y, location.z))
-            transform.setScale("%.6f %.6f %.6f" % (scale.x, scale.y, scale.z))
-            transform.setRotation("%.6f %.6f %.6f %.6f" % (axis.x, axis.y, axis.z, angle))
+            transform.setTranslation(encoding.formatFloats((location.x, location.y, location.z), precision))
+            transform.setScale(encoding.formatFloats((scale.x, scale.y, scale.z), precision))
+            transform.setRotation(encoding.formatFloats((axis.x, axis.y, axis.z, angle), precision))
 
             parent.appendChild(transform)
+            self.keepElement("t_" + obj.name, transform)
         #except AttributeError:
             #print("Warning object has no name and got no transform")
         
-    def writePhysicsMaterial(self, parent, mesh):
+    def createPhysicsMaterial(self, mesh):
         
         mat = self.doc.createElement("physics:material")
         mat.setAttribute("id", "phy_" + mesh.name)
-        parent.appendChild(mat)        
         
         # Set the actor type
         type = self.doc.createElement("string")
@@ -402,6 +768,8 @@ class XML3DExporterHelper :
             restitutionElement.setAttribute("name", "restitution")
             restitutionElement.appendChild(self.doc.createTextNode(str(materials[0].rbRestitution)))
             mat.appendChild(restitutionElement)
+        
+        return mat
 
     def writeLightShader(self, parent, light):
         # TODO: Directional Light
@@ -438,6 +806,7 @@ class XML3DExporterHelper :
             return
         
         parent.appendChild(lightShaderElement)
+        self.keepElement("ls_" + light.name, lightShaderElement)
             
         valueElement = self.doc.createBoolElement(None, "castShadow")
         if light.shadow_method == 'RAY_SHADOW' :
@@ -480,17 +849,8 @@ class XML3DExporterHelper :
 
         parent.appendChild(shaderElement)
         
-    def writePhongShader(self, parent, material) :
-        
-        if material.specular_shader != 'PHONG' :
-            print("WARNING: %s shader not supported. Using PHONG instead." % (material.specular_shader))
-        
-        shaderElement = self.doc.createShaderElement(material.name, "urn:xml3d:shader:phong");
-        parent.appendChild(shaderElement)
-        
-        #TODO
-        print("Write Material: " + material.name)
-        hasTexture = False
+    def diffuseImage(self, material) :
+        "Image of the first texture slot mapping the diffuse color, None if there is none"
         for textureIndex, texture in enumerate(material.texture_slots) :
             if not material.use_textures[textureIndex] or texture == None:
                 continue
@@ -510,28 +870,43 @@ class XML3DExporterHelper :
                 print("WARNING: %s not supported as image source. Ignoring texture!" % (source))
                 continue
             
-            imageFileName = bpy_extras.io_utils.path_reference(texture.texture.image.filepath,
-                                                               os.path.dirname(bpy.data.filepath),
-                                                               os.path.dirname(self.filepath),
-                                                               self.pathMode,
-                                                               "",
-                                                               self.copySet,
-                                                               texture.texture.image.library)
-            
+            return texture.texture.image
+        return None
+    
+    def imageReference(self, image) :
+        "Path of image in the document, adds the file to copySet if pathMode copies it"
+        return bpy_extras.io_utils.path_reference(image.filepath,
+                                                  os.path.dirname(bpy.data.filepath),
+                                                  os.path.dirname(self.filepath),
+                                                  self.pathMode,
+                                                  "",
+                                                  self.copySet,
+                                                  image.library)
+    
+    def writePhongShader(self, parent, material) :
+        
+        if material.specular_shader != 'PHONG' :
+            print("WARNING: %s shader not supported. Using PHONG instead." % (material.specular_shader))
+        
+        shaderElement = self.doc.createShaderElement(material.name, "urn:xml3d:shader:phong");
+        parent.appendChild(shaderElement)
+        self.keepElement(material.name, shaderElement)
+        
+        #TODO
+        print("Write Material: " + material.name)
+        image = self.diffuseImage(material)
+        if image :
             textureElement = self.doc.createTextureElement(None, "diffuseTexture")
-            img = self.doc.createImgElement(None, imageFileName)
+            img = self.doc.createImgElement(None, self.imageReference(image))
             textureElement.appendChild(img)
             shaderElement.appendChild(textureElement)
-            hasTexture = True
             
             valueElement = self.doc.createFloat3Element(None, "diffuseColor")
             #fac = 1.0 - mtex.colfac
             #valueElement.setValue("%f %f %f" % (material.rgbCol[0] * fac, material.rgbCol[1] * fac, material.rgbCol[2] * fac))
             valueElement.setValue("1 1 1")
             shaderElement.appendChild(valueElement)
-            break;
-            
-        if not hasTexture:
+        else :
             valueElement = self.doc.createFloat3Element(None, "diffuseColor")
             valueElement.setValue("%f %f %f" % tuple(material.diffuse_color))
             shaderElement.appendChild(valueElement)
@@ -614,6 +989,21 @@ class XML3DExporterHelper :
         for script in scripts:
             scriptElem = self.doc.createScriptElement(None, location + script, "text/javascript")
             parent.appendChild(scriptElem)
+        
+        if self.quantizeMeshes :
+            scriptElem = self.doc.createScriptElement(None, None, "text/javascript")
+            scriptElem.setValue(quantize.XFLOW_OPERATORS)
+            parent.appendChild(scriptElem)
+        
+        if self.lodLevels > 0 :
+            scriptElem = self.doc.createScriptElement(None, None, "text/javascript")
+            scriptElem.setValue(lod.SWITCH_SCRIPT)
+            parent.appendChild(scriptElem)
+        
+        if self.exportAnimation :
+            scriptElem = self.doc.createScriptElement(None, None, "text/javascript")
+            scriptElem.setValue(animation.XFLOW_OPERATORS + animation.PLAYER_SCRIPT)
+            parent.appendChild(scriptElem)
       
     def writeLight(self, obj):
         group = self.doc.createGroupElement()
@@ -687,23 +1077,75 @@ class XML3DExporterHelper :
                     
                     axis, angle = matrix.to_quaternion().to_axis_angle()
                     location = matrix.to_translation()
-                    view.setPosition("%.6f %.6f %.6f" % (location.x, location.y, location.z))
-                    view.setOrientation("%.6f %.6f %.6f %.6f" % (axis.x, axis.y, axis.z, angle))
-                    view.setFieldOfView("%.6f" % obj.data.angle)
+                    precision = self.transformPrecision
+                    view.setPosition(encoding.formatFloats((location.x, location.y, location.z), precision))
+                    view.setOrientation(encoding.formatFloats((axis.x, axis.y, axis.z, angle), precision))
+                    view.setFieldOfView(encoding.formatFloats((obj.data.angle,), precision))
                     parent.appendChild(view)
       
+    def createDocument(self, out) :
+        "Document that is written to out, while it is built with streamOutput"
+        if self.streamOutput :
+            return xml3d.XML3DStreamDocument(out, "", "\t", "\n", "UTF-8")
+        return xml3d.XML3DDocument()
+    
     def write(self) :
-        self.doc = xml3d.XML3DDocument()
         self.scene = bpy.context.scene
         self.copySet = set()
         
-        print('--> START: Exporting XML3D to %s' % self.filepath)
+        self.outputPath = self.filepath
+        if self.compressOutput :
+            self.outputPath += compression.GZIP_EXT
+        print('--> START: Exporting XML3D to %s' % self.outputPath)
         start_time = time.time()
+        self.profile = profiling.ExportProfile()
+        self.resourceFiles = []
+        self.previousState, self.exportState = None, None
+        self.meshSignatures, self.reusedMeshes = {}, set()
+        self.animations = {}
+        if self.incrementalExport :
+            options = self.incrementalOptions()
+            # Taken out until this export succeeds, a failed export leaves nothing to reuse
+            previous = incremental.states.pop(self.filepath, None)
+            if previous and previous.options == options :
+                previous.release()
+                self.previousState = previous
+            self.exportState = incremental.ExportState(options)
         try:
-            out = open(self.filepath, 'w')
+            if self.compressOutput :
+                out = compression.CompressedWriter(self.outputPath, self.compressionLevel)
+            else :
+                out = open(self.filepath, 'w', OUTPUT_BUFFER_SIZE, "UTF-8")
         except:
-            print('ERROR: Could not open %s' % self.filepath)
+            print('ERROR: Could not open %s' % self.outputPath)
             return False
+        
+        self.doc = self.createDocument(out)
+        
+        if self.quantizeMeshes and quantize.numpy is None :
+            print("WARNING: Quantization needs NumPy. Writing unquantized meshes.")
+            self.quantizeMeshes = False
+        if self.lodLevels > 0 and lod.numpy is None :
+            print("WARNING: Levels of detail need NumPy. Writing full resolution meshes only.")
+            self.lodLevels = 0
+        if self.quantizeMeshes and not self.writeHTMLHeader :
+            print("WARNING: Quantized meshes need the xml3d.dequantize operators, which are only written with the HTML header.")
+        if self.lodLevels > 0 and not self.writeHTMLHeader :
+            print("WARNING: Levels of detail are switched by a script, which is only written with the HTML header.")
+        if self.exportAnimation and not self.writeHTMLHeader :
+            print("WARNING: Animations need the xml3d.animateTransform operator, which is only written with the HTML header.")
+        if self.precompressResources and compression.brotli is None :
+            print("WARNING: Precompressed resources need the brotli module. Writing uncompressed resources only.")
+            self.precompressResources = False
+        
+        if self.binaryPayload :
+            payloadPath = os.path.splitext(self.filepath)[0] + payload.PAYLOAD_EXT
+            self.payloadName = os.path.basename(payloadPath)
+            self.payload = payload.BinaryPayloadWriter(payloadPath)
+        
+        if self.useMeshCache :
+            self.meshCache = mesh_cache.MeshCache(self.meshCacheDir or mesh_cache.defaultCacheDir(),
+                                                  self.meshCacheSize * 1048576)
       
         divElem = None
         if self.writeHTMLHeader :
@@ -758,16 +1200,51 @@ class XML3DExporterHelper :
         self.writeMainDef(xml3dElem)
       
         if self.exportCameras :
-            self.writeViews(xml3dElem)
+            with self.profile.phase("views") :
+                self.writeViews(xml3dElem)
       
-        self.writeSceneGraph(xml3dElem)
+        with self.profile.phase("sceneGraph") :
+            self.writeSceneGraph(xml3dElem)
     
-        self.doc.writexml(out, "", "\t", "\n", "UTF-8")
-    
-        out.close()
+        with self.profile.phase("writexml") :
+            self.doc.writexml(out, "", "\t", "\n", "UTF-8")
+            # Waits for the background compression to finish
+            out.close()
+        self.profile.count("file", os.path.basename(self.outputPath), fileBytes = os.path.getsize(self.outputPath))
+        
+        if self.payload :
+            self.payload.close()
+            self.profile.count("file", self.payloadName, fileBytes = self.payload.offset)
+            self.resourceFiles.append(self.payload.filepath)
+            self.payload = None
+        
+        if self.precompressResources and self.resourceFiles :
+            with self.profile.phase("compress") :
+                for path in compression.precompress(self.resourceFiles, self.compressionLevel) :
+                    self.profile.count("file", os.path.basename(path), fileBytes = os.path.getsize(path))
+        
+        if self.meshCache :
+            print(self.meshCache.report())
+            self.meshCache = None
+        
+        with self.profile.phase("pathReferenceCopy") :
+            bpy_extras.io_utils.path_reference_copy(self.copySet)
+        
+        reexport = self.previousState is not None
+        if self.exportState :
+            incremental.states[self.filepath] = self.exportState
+            self.previousState = None
         
-        bpy_extras.io_utils.path_reference_copy(self.copySet)
+        self.profile.finish()
+        if reexport :
+            self.reportReexport()
+        if self.writeProfile :
+            self.profile.writeJSON(os.path.splitext(self.filepath)[0] + profiling.PROFILE_EXT)
+        if self.printProfile :
+            print(self.profile.table())
         
+        if self.profile.peakMemory :
+            print("Peak memory: %.1f MB" % (self.profile.peakMemory / 1048576.0))
         print('--> END: Exporting XML3D. Duration: %.2f' % (time.time() - start_time))
         return
 
@@ -0,0 +1,159 @@
+# ##### BEGIN GPL LICENSE BLOCK #####
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 2
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software Foundation,
+#  Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA.
+#
+# ##### END GPL LICENSE BLOCK #####
+
+"""State kept between incremental exports.
+
+An incremental export keeps what it wrote for one file: the encoded meshes
+and the transform and shader elements. The next export to the same file
+reuses everything that did not change and regenerates the rest.
+
+Changes are recorded by ChangeTracker from the is_updated flags Blender
+sets after every scene update, it runs while the add-on is registered.
+Without it (batch exports, the benchmark) only meshes are reused, if the
+hash of their evaluated geometry did not change.
+
+The whole document is still written again, a re-export reports how long
+that took against REEXPORT_TARGET in the totals of its profile.
+"""
+
+import hashlib
+
+import bpy
+
+from . import mesh_cache
+
+# Seconds a re-export after a small change should stay under
+REEXPORT_TARGET = 1.0
+
+
+class ChangeTracker :
+
+    def __init__(self) :
+        self.active = False
+        # Incremented for every update that changed something
+        self.counter = 0
+        # (kind, name) -> counter of its last change
+        self.changed = {}
+
+    def start(self) :
+        if self.active :
+            return
+        handlers = bpy.app.handlers
+        handlers.scene_update_post.append(sceneUpdated)
+        handlers.load_post.append(fileChanged)
+        handlers.undo_post.append(fileChanged)
+        handlers.redo_post.append(fileChanged)
+        self.active = True
+
+    def stop(self) :
+        if not self.active :
+            return
+        handlers = bpy.app.handlers
+        for handlerList, handler in ((handlers.scene_update_post, sceneUpdated), (handlers.load_post, fileChanged),
+                                     (handlers.undo_post, fileChanged), (handlers.redo_post, fileChanged)) :
+            if handler in handlerList :
+                handlerList.remove(handler)
+        self.active = False
+        # Changes are not recorded from now on, nothing kept is safe to reuse
+        states.clear()
+
+    def update(self) :
+        "Records the data blocks flagged as updated"
+        data = bpy.data
+        counter = self.counter + 1
+        for kind, collection in (("object", data.objects), ("mesh", data.meshes), ("curve", data.curves),
+                                 ("material", data.materials), ("lamp", data.lamps), ("world", data.worlds),
+                                 ("scene", data.scenes)) :
+            if not collection.is_updated :
+                continue
+            for datablock in collection :
+                if datablock.is_updated :
+                    self.changed[(kind, datablock.name)] = counter
+                    self.counter = counter
+                if kind == "object" and datablock.is_updated_data :
+                    self.changed[("objectData", datablock.name)] = counter
+                    self.counter = counter
+
+    def changedSince(self, counter, kind, name) :
+        return self.changed.get((kind, name), 0) > counter
+
+    def changes(self, counter) :
+        "Set of the (kind, name) pairs that changed since counter"
+        return set(key for key, changed in self.changed.items() if changed > counter)
+
+
+tracker = ChangeTracker()
+
+# Output file path -> ExportState of the last incremental export to it
+states = {}
+
+
+@bpy.app.handlers.persistent
+def sceneUpdated(scene) :
+    tracker.update()
+
+
+@bpy.app.handlers.persistent
+def fileChanged(dummy) :
+    # Names may now belong to other data blocks
+    states.clear()
+
+
+class ExportState :
+
+    def __init__(self, options) :
+        self.options = options
+        # Tracker counter when the export started, None if changes are not tracked
+        self.counter = tracker.counter if tracker.active else None
+        # Mesh data name -> (signature, job without its arrays, encoded mesh, physics material)
+        self.meshes = {}
+        # Element id -> element, for transforms, light shaders and shaders
+        self.elements = {}
+
+    def tracked(self) :
+        return self.counter is not None and tracker.active
+
+    def unchanged(self, *datablocks) :
+        "True if none of the (kind, name) pairs changed since this export started"
+        if not self.tracked() :
+            return False
+        return not any(tracker.changedSince(self.counter, kind, name) for kind, name in datablocks)
+
+    def release(self) :
+        """Detaches the kept elements from the document they were written to,
+        so appending them to the next document does not search the old one"""
+        for element in self.elements.values() :
+            element.parentNode = None
+        for signature, job, encoded, physicsMaterial in self.meshes.values() :
+            if physicsMaterial is not None :
+                physicsMaterial.parentNode = None
+
+
+def meshHash(job) :
+    "Hash of the geometry and materials read from an evaluated mesh"
+    h = hashlib.sha1()
+    mesh_cache.hashValue(h, (job["materialNames"], job["uvLayer"]))
+    mesh_cache.hashValue(h, job["arrays"])
+    return h.hexdigest()
+
+
+def withoutArrays(job) :
+    "Copy of a job without the mesh arrays, enough to write its encoded mesh again"
+    job = dict(job)
+    job["arrays"] = None
+    return job
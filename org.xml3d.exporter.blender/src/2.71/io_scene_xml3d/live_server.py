@@ -0,0 +1,564 @@
+# ##### BEGIN GPL LICENSE BLOCK #####
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 2
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software Foundation,
+#  Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA.
+#
+# ##### END GPL LICENSE BLOCK #####
+
+"""Live preview of the scene in a browser.
+
+LiveSession exports the scene into a temporary directory and serves it on
+localhost. The served page loads LIVE_SCRIPT, which listens for server-sent
+events and updates elements of the document by their id. After a scene
+update, at most every interval seconds, the transforms, shaders, views and
+meshes that changed are written with the exporter's own methods and pushed
+to all viewers. Meshes are evaluated on Blender's thread for at most
+MESH_BUDGET seconds per update, the rest waits for the next one, and are
+welded and encoded on a worker thread.
+
+Changes of the scene graph (objects added, removed or reparented, other
+materials) are looked for at most every STRUCTURE_INTERVAL seconds. They
+make the document stale, it is rebuilt over several updates: the meshes
+that changed are evaluated within MESH_BUDGET per update and encoded on the
+worker thread, then LiveExporter writes the document from them and the
+meshes kept by the last one, and the worker thread serializes it and makes
+the viewers reload. The first document is built the same way, until then a
+placeholder page is served.
+"""
+
+import collections
+import http.server
+import io
+import json
+import mimetypes
+import os
+import queue
+import shutil
+import socketserver
+import tempfile
+import threading
+import time
+import urllib.parse
+
+import bpy
+import bpy_extras.io_utils
+
+from . import encoding
+from . import export_xml3d
+from . import incremental
+from . import xml3d
+
+DOCUMENT_NAME = "scene.xhtml"
+# Written by LiveExporter, the served document is replaced once it is serialized
+STAGING_NAME = "next.xhtml"
+# Seconds of mesh evaluation per update on Blender's thread
+MESH_BUDGET = 0.02
+# Seconds between two comparisons of the scene structure
+STRUCTURE_INTERVAL = 1.0
+# Seconds after which an idle event stream gets a comment, so closed connections are noticed
+KEEPALIVE = 10.0
+# Messages queued for a viewer before it is told to reload instead
+CLIENT_QUEUE_SIZE = 256
+
+LIVE_SCRIPT = """
+(function() {
+    var XML3D_NS = "http://www.xml3d.org/2009/xml3d";
+    var events = new EventSource("/events");
+    events.onmessage = function(event) {
+        var message = JSON.parse(event.data);
+        if (message.type == "reload") {
+            events.close();
+            window.location.reload();
+            return;
+        }
+        var fragment = new DOMParser().parseFromString(
+            '<defs xmlns="' + XML3D_NS + '">' + message.xml + '</defs>', "application/xml").documentElement;
+        var defs = document.getElementById("mainDef");
+        while (fragment.firstChild) {
+            var element = document.importNode(fragment.firstChild, true);
+            fragment.removeChild(fragment.firstChild);
+            var old = document.getElementById(element.getAttribute("id"));
+            if (!old) {
+                defs.appendChild(element);
+                continue;
+            }
+            // Updated in place, so references to the element stay valid
+            while (old.firstChild) {
+                old.removeChild(old.firstChild);
+            }
+            while (element.firstChild) {
+                old.appendChild(element.firstChild);
+            }
+            for (var i = 0; i < element.attributes.length; i++) {
+                old.setAttribute(element.attributes[i].name, element.attributes[i].value);
+            }
+        }
+    };
+})();
+"""
+
+PLACEHOLDER = """<?xml version="1.0" encoding="UTF-8"?>
+<html xmlns="http://www.w3.org/1999/xhtml"><head><title>XML3D Live Preview</title></head>
+<body><p>Exporting the scene...</p></body></html>
+"""
+
+# The running LiveSession, None if the preview is stopped
+session = None
+
+
+def exporterOptions() :
+    "Options of the exports and updates: a text document with copies of the textures next to it"
+    return {
+        "onlySelected" : False,
+        "exportCameras" : True,
+        "applyModifiers" : True,
+        "pathMode" : 'COPY',
+        "annotatePhysics" : False,
+        "writeHTMLHeader" : True,
+        "ignoreLamps" : False,
+        "useRaytracing" : False,
+        "convertParenting" : False,
+        "incrementalExport" : True,
+    }
+
+
+def written(writer, write, *args) :
+    "Serialized elements a write method of the exporter writer appends to its parent"
+    parent = writer.doc.createElement("defs")
+    write(parent, *args)
+    out = io.StringIO()
+    for element in parent.childNodes :
+        element.serialize(out)
+    return out.getvalue()
+
+
+class DeferredDocument(xml3d.XML3DDocument) :
+    "Document that is not written by the exporter, the worker thread serializes it afterwards"
+    __slots__ = ()
+
+    def writexml(self, out, indent = "", addindent = "", newl = "", encoding = None) :
+        pass
+
+
+class LiveExporter(export_xml3d.XML3DExporterHelper) :
+    """Exporter of a rebuilt document. Takes the meshes evaluated and encoded
+    over the updates of a rebuild instead of evaluating them."""
+
+    def __init__(self, filepath, prepared) :
+        export_xml3d.XML3DExporterHelper.__init__(self, filepath, **exporterOptions())
+        # Mesh data name -> (job, encoded mesh, hash of the job)
+        self.prepared = prepared
+
+    def createDocument(self, out) :
+        return DeferredDocument()
+
+    def reuseMesh(self, obj, meshName) :
+        if meshName not in self.prepared :
+            return export_xml3d.XML3DExporterHelper.reuseMesh(self, obj, meshName)
+        job, encoded, jobHash = self.prepared[meshName]
+        if job is not None :
+            self.meshSignatures[meshName] = self.meshSignature(obj) + (jobHash,)
+        return job, encoded
+
+
+class LiveSession :
+
+    def __init__(self, port, interval) :
+        self.server = LiveHTTPServer(("127.0.0.1", port), LiveRequestHandler)
+        self.server.session = self
+        self.port = self.server.server_address[1]
+        self.interval = interval
+        self.directory = tempfile.mkdtemp(prefix = "xml3d_live_")
+        self.filepath = os.path.join(self.directory, DOCUMENT_NAME)
+        # Held while the served document is read or replaced
+        self.documentLock = threading.Lock()
+        # Guards clients and encoding
+        self.lock = threading.Lock()
+        # Message queues of the connected viewers
+        self.clients = set()
+        self.stagingPath = os.path.join(self.directory, STAGING_NAME)
+        self.lastUpdate = 0.0
+        self.counter = incremental.tracker.counter
+        # Incremented by every rebuild, mesh updates of an older one are dropped
+        self.generation = 0
+        self.structure = None
+        self.transformNames = set()
+        self.lastStructureCheck = 0.0
+        # Changes since the last comparison of the scene structure
+        self.structureChanged = False
+        # State of the rebuild of a stale document, None if it is current
+        self.rebuild = None
+        # True while the worker thread serializes a rebuilt document
+        self.serializing = False
+        # Mesh data name -> object it is evaluated from, left for the next update
+        self.dirtyMeshes = {}
+        # Mesh data names the worker thread is encoding
+        self.encoding = set()
+        self.jobs = queue.Queue()
+        # Used on the worker thread only
+        self.meshWriter = export_xml3d.XML3DExporterHelper(self.filepath, **exporterOptions())
+        self.meshWriter.doc = xml3d.XML3DDocument()
+        self.serverThread = threading.Thread(target = self.server.serve_forever, name = "XML3D live server")
+        self.serverThread.daemon = True
+        self.meshThread = threading.Thread(target = self.encodeMeshes, name = "XML3D live meshes")
+        self.meshThread.daemon = True
+
+    def url(self) :
+        return "http://localhost:%d/" % self.port
+
+    def start(self) :
+        with open(self.filepath, 'w', encoding = "UTF-8") as f :
+            f.write(PLACEHOLDER)
+        self.startRebuild()
+        self.serverThread.start()
+        self.meshThread.start()
+
+    def stop(self) :
+        self.jobs.put(None)
+        # Ends the event streams
+        self.broadcast(None)
+        self.server.shutdown()
+        self.server.server_close()
+        self.meshThread.join()
+        shutil.rmtree(self.directory, ignore_errors = True)
+
+    def createWriter(self) :
+        "Exporter whose write methods are used on their own, for the elements of an update"
+        writer = export_xml3d.XML3DExporterHelper(self.filepath, **exporterOptions())
+        writer.scene = bpy.context.scene
+        writer.copySet = set()
+        writer.doc = xml3d.XML3DDocument()
+        return writer
+
+    def startRebuild(self) :
+        """Marks the document stale and collects the meshes that have to be
+        evaluated again, the following updates rebuild it"""
+        self.generation += 1
+        self.counter = incremental.tracker.counter
+        self.lastStructureCheck = time.perf_counter()
+        self.structureChanged = False
+        self.dirtyMeshes.clear()
+        writer = self.createWriter()
+        state = incremental.states.get(self.stagingPath)
+        writer.previousState = state if state and state.options == writer.incrementalOptions() else None
+        structure, transformNames = self.sceneStructure(writer)
+        pending = collections.OrderedDict()
+        for obj in bpy.context.scene.objects :
+            if obj.users > 0 and (obj.type == 'MESH' or obj.type == 'CURVE') :
+                dataName = writer.meshDataName(obj)
+                if dataName not in pending and writer.keptMesh(obj, dataName) is None :
+                    pending[dataName] = obj
+        self.rebuild = {
+            "generation" : self.generation,
+            "structure" : structure,
+            "transformNames" : transformNames,
+            # Mesh data name -> object, not evaluated yet
+            "pending" : pending,
+            "meshCount" : len(pending),
+            # Filled by the worker thread
+            "prepared" : {},
+        }
+
+    def continueRebuild(self, start) :
+        "Evaluates meshes of the rebuild within MESH_BUDGET, writes the document once all are encoded"
+        rebuild = self.rebuild
+        writer = self.createWriter()
+        if self.structureChanged and start - self.lastStructureCheck >= STRUCTURE_INTERVAL :
+            self.structureChanged = False
+            self.lastStructureCheck = start
+            if self.sceneStructure(writer)[0] != rebuild["structure"] :
+                self.startRebuild()
+                return
+        
+        pending = rebuild["pending"]
+        while pending and time.perf_counter() - start <= MESH_BUDGET :
+            dataName, obj = pending.popitem(last = False)
+            self.jobs.put(("rebuild", rebuild["generation"], (dataName, writer.extractMesh(obj, dataName))))
+        with self.lock :
+            encoded = len(rebuild["prepared"])
+        if pending or encoded < rebuild["meshCount"] or self.serializing :
+            return
+        
+        # Takes over the elements kept by the last document, which is serialized by now
+        exporter = LiveExporter(self.stagingPath, rebuild["prepared"])
+        exporter.write()
+        self.rebuild = None
+        self.structure, self.transformNames = rebuild["structure"], rebuild["transformNames"]
+        self.serializing = True
+        self.jobs.put(("document", rebuild["generation"], exporter.doc))
+
+    def sceneStructure(self, writer) :
+        """Everything the scene graph and the ids of the document depend on,
+        and the names of the objects with a transform in the document"""
+        scene = bpy.context.scene
+        structure = [scene.camera.name if scene.camera else None, scene.world.name if scene.world else None]
+        transformNames = set()
+        for obj in scene.objects :
+            entry = [obj.name, obj.type, obj.parent.name if obj.parent else None, obj.hide_render]
+            if obj.type == 'MESH' or obj.type == 'CURVE' :
+                entry.append(writer.meshDataName(obj))
+                entry.extend(material.name if material else None for material in obj.data.materials)
+            elif obj.type == 'LAMP' or obj.type == 'CAMERA' :
+                entry.extend((obj.data.name, obj.data.type))
+            structure.append(tuple(entry))
+            if obj.type == 'MESH' or obj.type == 'CURVE' or obj.type == 'LAMP' :
+                while obj :
+                    transformNames.add(obj.name)
+                    obj = obj.parent
+        structure.append(tuple(material.name for material in bpy.data.materials if material.users > 0))
+        return tuple(structure), transformNames
+
+    def update(self) :
+        "Pushes what changed since the last update to the viewers, called after scene updates"
+        start = time.perf_counter()
+        tracker = incremental.tracker
+        if start - self.lastUpdate < self.interval :
+            return
+        if tracker.counter != self.counter :
+            self.structureChanged = True
+        if self.rebuild is not None :
+            self.lastUpdate = start
+            self.continueRebuild(start)
+            return
+        if not self.structureChanged and not self.dirtyMeshes :
+            return
+        self.lastUpdate = start
+        writer = self.createWriter()
+        if self.structureChanged and start - self.lastStructureCheck >= STRUCTURE_INTERVAL :
+            self.structureChanged = False
+            self.lastStructureCheck = start
+            if self.sceneStructure(writer)[0] != self.structure :
+                self.startRebuild()
+                self.continueRebuild(start)
+                return
+        changes = tracker.changes(self.counter)
+        self.counter = tracker.counter
+        
+        fragments = []
+        viewsChanged = False
+        for kind, name in sorted(changes) :
+            if kind == "object" or kind == "objectData" :
+                obj = bpy.data.objects.get(name)
+                if obj is None :
+                    continue
+                if kind == "object" and name in self.transformNames :
+                    fragments.append(written(writer, writer.writeTransform, obj))
+                elif kind == "object" and obj.type == 'CAMERA' :
+                    viewsChanged = True
+                elif kind == "objectData" and name in self.transformNames and obj.type in ('MESH', 'CURVE') :
+                    self.dirtyMeshes[writer.meshDataName(obj)] = obj
+            elif kind == "lamp" :
+                lamp = bpy.data.lamps.get(name)
+                if lamp is not None and lamp.users > 0 :
+                    fragments.append(written(writer, writer.writeLightShader, lamp))
+        # The ambient intensity of every shader depends on the world
+        worldChanged = any(kind == "world" for kind, name in changes)
+        for material in bpy.data.materials :
+            if material.users > 0 and (worldChanged or ("material", material.name) in changes) :
+                fragments.append(written(writer, writer.writePhongShader, material))
+        if viewsChanged :
+            fragments.append(written(writer, writer.writeViews))
+        bpy_extras.io_utils.path_reference_copy(writer.copySet)
+        if fragments :
+            self.broadcast({"type" : "update", "xml" : "".join(fragments)})
+        
+        for dataName, obj in list(self.dirtyMeshes.items()) :
+            if time.perf_counter() - start > MESH_BUDGET :
+                break
+            with self.lock :
+                if dataName in self.encoding :
+                    # Evaluated again once the worker thread is done with it
+                    continue
+                self.encoding.add(dataName)
+            del self.dirtyMeshes[dataName]
+            job = writer.extractMesh(obj, dataName)
+            if job is None :
+                with self.lock :
+                    self.encoding.discard(dataName)
+                continue
+            self.jobs.put(("mesh", self.generation, job))
+
+    def encodeMeshes(self) :
+        "Runs on the worker thread until stop puts None into the queue"
+        while True :
+            item = self.jobs.get()
+            if item is None :
+                return
+            kind, generation, payload = item
+            if kind == "mesh" :
+                self.pushMesh(generation, payload)
+            elif kind == "rebuild" :
+                self.prepareMesh(generation, *payload)
+            else :
+                self.pushDocument(generation, payload)
+
+    def pushMesh(self, generation, job) :
+        "Encodes a changed mesh and sends it to the viewers"
+        writer = self.meshWriter
+        try :
+            encoded = encoding.encodeMesh(job)
+            xml = written(writer, writer.writeEncodedMesh, job, encoded)
+            if generation == self.generation :
+                self.broadcast({"type" : "update", "xml" : xml})
+        except Exception as e :
+            print("WARNING: Live update of mesh %s failed: %s" % (job["meshName"], e))
+        finally :
+            with self.lock :
+                self.encoding.discard(job["meshName"])
+
+    def pushDocument(self, generation, doc) :
+        "Serializes a rebuilt document, replaces the served one with it and makes the viewers reload"
+        try :
+            temporaryPath = self.filepath + ".tmp"
+            with open(temporaryPath, 'w', export_xml3d.OUTPUT_BUFFER_SIZE, "UTF-8") as out :
+                xml3d.XML3DDocument.writexml(doc, out, "", "\t", "\n", "UTF-8")
+            with self.documentLock :
+                os.replace(temporaryPath, self.filepath)
+            if generation == self.generation :
+                self.broadcast({"type" : "reload"})
+        except Exception as e :
+            print("WARNING: Writing the live document failed: %s" % e)
+        finally :
+            self.serializing = False
+
+    def prepareMesh(self, generation, dataName, job) :
+        "Encodes a mesh of a rebuild, LiveExporter encodes it itself if that fails"
+        encoded, jobHash = None, None
+        try :
+            if job is not None :
+                jobHash = incremental.meshHash(job)
+                encoded = encoding.encodeMesh(job)
+        except Exception as e :
+            print("WARNING: Live update of mesh %s failed: %s" % (dataName, e))
+        with self.lock :
+            rebuild = self.rebuild
+            if rebuild is not None and rebuild["generation"] == generation :
+                rebuild["prepared"][dataName] = (job, encoded, jobHash)
+
+    def broadcast(self, message) :
+        "Queues a message for every viewer, None ends their event streams"
+        with self.lock :
+            clients = list(self.clients)
+        for client in clients :
+            try :
+                client.put_nowait(message)
+            except queue.Full :
+                # The viewer fell behind, it reloads instead of getting every update
+                while not client.empty() :
+                    try :
+                        client.get_nowait()
+                    except queue.Empty :
+                        break
+                client.put_nowait({"type" : "reload"} if message is not None else None)
+
+
+class LiveHTTPServer(socketserver.ThreadingMixIn, http.server.HTTPServer) :
+    daemon_threads = True
+    allow_reuse_address = True
+
+
+class LiveRequestHandler(http.server.BaseHTTPRequestHandler) :
+
+    def do_GET(self) :
+        session = self.server.session
+        path = urllib.parse.unquote(urllib.parse.urlsplit(self.path).path)
+        if path == "/events" :
+            self.sendEvents(session)
+        elif path == "/live.js" :
+            self.sendContent(LIVE_SCRIPT.encode("utf-8"), "application/javascript")
+        elif path == "/" or path == "/" + DOCUMENT_NAME :
+            with session.documentLock :
+                with open(session.filepath, 'rb') as f :
+                    document = f.read()
+            script = b'<script type="text/javascript" src="/live.js"></script>'
+            self.sendContent(document.replace(b"</body>", script + b"</body>", 1), "application/xhtml+xml")
+        else :
+            # Textures copied next to the document
+            filepath = os.path.normpath(os.path.join(session.directory, path.lstrip("/")))
+            if not filepath.startswith(session.directory + os.sep) or not os.path.isfile(filepath) :
+                self.send_error(404)
+                return
+            with open(filepath, 'rb') as f :
+                content = f.read()
+            self.sendContent(content, mimetypes.guess_type(filepath)[0] or "application/octet-stream")
+
+    def sendContent(self, content, contentType) :
+        self.send_response(200)
+        self.send_header("Content-Type", contentType)
+        self.send_header("Content-Length", str(len(content)))
+        self.send_header("Cache-Control", "no-cache")
+        self.end_headers()
+        self.wfile.write(content)
+
+    def sendEvents(self, session) :
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-cache")
+        self.end_headers()
+        client = queue.Queue(CLIENT_QUEUE_SIZE)
+        with session.lock :
+            session.clients.add(client)
+        try :
+            while True :
+                try :
+                    message = client.get(timeout = KEEPALIVE)
+                except queue.Empty :
+                    self.wfile.write(b": keepalive\n\n")
+                else :
+                    if message is None :
+                        return
+                    self.wfile.write(("data: %s\n\n" % json.dumps(message)).encode("utf-8"))
+                self.wfile.flush()
+        except OSError :
+            # The viewer went away
+            pass
+        finally :
+            with session.lock :
+                session.clients.discard(client)
+
+    def log_message(self, format, *args) :
+        pass
+
+
+def start(port, interval) :
+    "Starts the live preview, returns its session"
+    global session
+    if session :
+        return session
+    incremental.tracker.start()
+    newSession = LiveSession(port, interval)
+    newSession.start()
+    session = newSession
+    bpy.app.handlers.scene_update_post.append(sceneUpdated)
+    return session
+
+
+def stop() :
+    global session
+    if session is None :
+        return
+    if sceneUpdated in bpy.app.handlers.scene_update_post :
+        bpy.app.handlers.scene_update_post.remove(sceneUpdated)
+    session.stop()
+    session = None
+
+
+@bpy.app.handlers.persistent
+def sceneUpdated(scene) :
+    if session is None :
+        return
+    try :
+        session.update()
+    except Exception as e :
+        print("WARNING: Live update failed: %s" % e)
@@ -0,0 +1,170 @@
+# ##### BEGIN GPL LICENSE BLOCK #####
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 2
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software Foundation,
+#  Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA.
+#
+# ##### END GPL LICENSE BLOCK #####
+
+"""Level of detail index arrays for welded meshes (needs NumPy).
+
+Simplification is vertex clustering with quadric error metrics (Lindstrom,
+"Out-of-Core Simplification of Large Polygonal Models", 2000): vertices are
+clustered in a uniform grid and every cluster collapses onto the member
+vertex with the smallest error under the summed quadrics of the cluster.
+The representatives are existing vertices, so a level of detail is only a
+new index array on top of the vertex arrays of the full mesh. The grid
+resolution is searched for the one that comes closest to the requested
+triangle count.
+
+Meshes are simplified in encoding.encodeMesh, so different meshes are only
+simplified in parallel if the export runs with parallelMeshes. Mesh elements
+list their levels in data-lod-src and data-lod-distance, SWITCH_SCRIPT
+switches their src by the distance to the active view.
+"""
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+# Indices into the 4x4 symmetric quadric of the 10 stored components
+QUADRIC_ROWS = (0, 0, 0, 0, 1, 1, 1, 2, 2, 3)
+QUADRIC_COLUMNS = (0, 1, 2, 3, 1, 2, 3, 2, 3, 3)
+MAX_RESOLUTION = 1 << 12
+# Milliseconds between two checks of the distances
+SWITCH_INTERVAL = 250
+
+SWITCH_SCRIPT = """
+(function() {
+    function viewPosition() {
+        var xml3d = document.getElementsByTagName("xml3d")[0];
+        var viewId = xml3d && xml3d.getAttribute("activeView");
+        var view = viewId ? document.getElementById(viewId.replace(/^#/, "")) : null;
+        var position = view ? (view.getAttribute("position") || "").split(/\\s+/).map(parseFloat) : [];
+        return position.length == 3 ? position : [0, 0, 0];
+    }
+    function update() {
+        var eye = viewPosition();
+        var meshes = document.querySelectorAll("mesh[data-lod-src]");
+        for (var i = 0; i < meshes.length; i++) {
+            var mesh = meshes[i];
+            if (!mesh._lodSources) {
+                mesh._lodSources = [mesh.getAttribute("src")].concat(mesh.getAttribute("data-lod-src").split(" "));
+                mesh._lodDistances = mesh.getAttribute("data-lod-distance").split(" ").map(parseFloat);
+            }
+            var box = mesh.getWorldBoundingBox && mesh.getWorldBoundingBox();
+            if (!box || (box.isEmpty && box.isEmpty())) {
+                continue;
+            }
+            var center = box.center();
+            var dx = center.x - eye[0], dy = center.y - eye[1], dz = center.z - eye[2];
+            var distance = Math.sqrt(dx * dx + dy * dy + dz * dz);
+            var level = 0;
+            while (level < mesh._lodDistances.length && distance >= mesh._lodDistances[level]) {
+                level++;
+            }
+            var src = mesh._lodSources[level];
+            if (mesh.getAttribute("src") != src) {
+                mesh.setAttribute("src", src);
+            }
+        }
+    }
+    window.setInterval(update, %(interval)d);
+})();
+""" % {"interval" : SWITCH_INTERVAL}
+
+
+def vertexQuadrics(points, triangles) :
+    "Area weighted plane quadrics summed per vertex, as 10 components"
+    a, b, c = points[triangles[:, 0]], points[triangles[:, 1]], points[triangles[:, 2]]
+    normals = numpy.cross(b - a, c - a)
+    area = numpy.sqrt((normals * normals).sum(axis = 1))
+    planes = numpy.zeros((len(triangles), 4))
+    valid = area > 0
+    planes[valid, :3] = normals[valid] / area[valid, None]
+    planes[:, 3] = -(planes[:, :3] * a).sum(axis = 1)
+    weighted = planes[:, QUADRIC_ROWS] * planes[:, QUADRIC_COLUMNS] * area[:, None]
+
+    quadrics = numpy.zeros((len(points), 10))
+    for corner in range(3) :
+        numpy.add.at(quadrics, triangles[:, corner], weighted)
+    return quadrics
+
+
+def quadricError(quadrics, points) :
+    "v^T Q v with v = (x, y, z, 1) for every row"
+    v = numpy.hstack((points, numpy.ones((len(points), 1))))
+    terms = v[:, QUADRIC_ROWS] * v[:, QUADRIC_COLUMNS]
+    # Off-diagonal components stand for two matrix entries
+    terms[:, [1, 2, 3, 5, 6, 8]] *= 2
+    return (quadrics * terms).sum(axis = 1)
+
+
+def clusterRemap(points, quadrics, resolution) :
+    "Representative vertex of every vertex for a grid with resolution cells along the longest axis"
+    low = points.min(axis = 0)
+    extent = max((points.max(axis = 0) - low).max(), 1e-12)
+    cells = numpy.minimum(((points - low) * (resolution / extent)).astype(numpy.int64), resolution - 1)
+    keys = (cells[:, 0] * resolution + cells[:, 1]) * resolution + cells[:, 2]
+    unused, cluster = numpy.unique(keys, return_inverse = True)
+    cluster = cluster.ravel()
+
+    clusterQuadrics = numpy.zeros((cluster.max() + 1, 10))
+    numpy.add.at(clusterQuadrics, cluster, quadrics)
+    error = quadricError(clusterQuadrics[cluster], points)
+    # Smallest error first within every cluster, its first entry is the representative
+    order = numpy.lexsort((error, cluster))
+    first = numpy.ones(len(order), bool)
+    first[1:] = cluster[order][1:] != cluster[order][:-1]
+    representative = numpy.empty(cluster.max() + 1, numpy.int64)
+    representative[cluster[order][first]] = order[first]
+    return representative[cluster]
+
+
+def collapse(triangles, remap) :
+    "Remapped triangles without the degenerate ones"
+    triangles = remap[triangles]
+    keep = ((triangles[:, 0] != triangles[:, 1]) & (triangles[:, 1] != triangles[:, 2]) &
+            (triangles[:, 2] != triangles[:, 0]))
+    return triangles[keep]
+
+
+def simplify(positions, indices, ratio) :
+    """Index arrays (one per material, like indices) with about ratio times
+    the triangles of indices, referencing the same vertices"""
+    points = numpy.asarray(positions, numpy.float64).reshape(-1, 3)
+    triangles = [numpy.asarray(i, numpy.int64).reshape(-1, 3) for i in indices]
+    allTriangles = numpy.concatenate(triangles)
+    target = int(len(allTriangles) * ratio)
+    if len(allTriangles) == 0 or target <= 0 :
+        return [numpy.zeros(0, numpy.int64) for i in indices]
+    quadrics = vertexQuadrics(points, allTriangles)
+
+    # The triangle count grows with the resolution, bisect for the largest
+    # resolution that stays within the target
+    low, high = 1, MAX_RESOLUTION
+    best = clusterRemap(points, quadrics, 1)
+    while low < high :
+        resolution = (low + high + 1) // 2
+        remap = clusterRemap(points, quadrics, resolution)
+        if len(collapse(allTriangles, remap)) <= target :
+            low, best = resolution, remap
+        else :
+            high = resolution - 1
+    return [collapse(t, best).ravel() for t in triangles]
+
+
+def levelsOfDetail(positions, indices, levels, ratio) :
+    "levels lists of index arrays, level k has about ratio^k of the triangles"
+    return [simplify(positions, indices, ratio ** k) for k in range(1, levels + 1)]
@@ -0,0 +1,153 @@
+# ##### BEGIN GPL LICENSE BLOCK #####
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 2
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software Foundation,
+#  Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA.
+#
+# ##### END GPL LICENSE BLOCK #####
+
+"""Persistent cache of encoded meshes.
+
+Entries are keyed by a hash of the buffers read from the evaluated mesh and
+the export options that change the encoding. Each entry is one pickle file
+holding the result of encoding.encodeMesh. The least recently used entries
+are removed once the cache grows beyond its size limit.
+"""
+
+import collections
+import hashlib
+import os
+import pickle
+import tempfile
+
+# Bump when the encoded format changes, so old entries are not reused
+CACHE_VERSION = 3
+CACHE_EXT = ".pickle"
+
+
+def defaultCacheDir() :
+    return os.path.join(tempfile.gettempdir(), "xml3d_mesh_cache")
+
+
+def hashValue(h, value) :
+    if value is None :
+        h.update(b"\0")
+    elif hasattr(value, "tobytes") :
+        h.update(str(getattr(value, "dtype", getattr(value, "typecode", ""))).encode())
+        h.update(value.tobytes())
+    elif isinstance(value, dict) :
+        for name in sorted(value) :
+            h.update(name.encode())
+            hashValue(h, value[name])
+    elif isinstance(value, (list, tuple)) :
+        h.update(("[%d" % len(value)).encode())
+        for item in value :
+            hashValue(h, item)
+    else :
+        h.update(repr(value).encode())
+
+
+class MeshCache :
+
+    def __init__(self, directory, maxBytes) :
+        self.directory = directory
+        self.maxBytes = maxBytes
+        self.hits = 0
+        self.misses = 0
+        self.evicted = 0
+        # key -> size in bytes, least recently used first
+        self.entries = collections.OrderedDict()
+
+        if not os.path.isdir(directory) :
+            os.makedirs(directory)
+        files = []
+        for fileName in os.listdir(directory) :
+            if fileName.endswith(CACHE_EXT) :
+                stat = os.stat(os.path.join(directory, fileName))
+                files.append((stat.st_mtime, fileName[:-len(CACHE_EXT)], stat.st_size))
+        for mtime, key, size in sorted(files) :
+            self.entries[key] = size
+        self.evict()
+
+    def path(self, key) :
+        return os.path.join(self.directory, key + CACHE_EXT)
+
+    def key(self, job, options) :
+        "Hash of the mesh buffers of a job and the options that influence its encoding"
+        h = hashlib.sha1()
+        hashValue(h, (CACHE_VERSION, options, job["materialCount"], job["binary"], job.get("uvLayer")))
+        hashValue(h, job["arrays"])
+        return h.hexdigest()
+
+    def get(self, key) :
+        if key not in self.entries :
+            self.misses += 1
+            return None
+        path = self.path(key)
+        try :
+            with open(path, 'rb') as f :
+                encoded = pickle.load(f)
+        except Exception :
+            print("WARNING: Dropping unreadable mesh cache entry %s" % path)
+            self.remove(key)
+            self.misses += 1
+            return None
+        os.utime(path, None)
+        self.entries.move_to_end(key)
+        self.hits += 1
+        return encoded
+
+    def put(self, key, encoded) :
+        """Stores an entry. Several exports can share the directory, so each
+        writes its own temporary file. A failed write only skips caching."""
+        path = self.path(key)
+        tmpPath = None
+        try :
+            fd, tmpPath = tempfile.mkstemp(dir = self.directory, prefix = key, suffix = ".tmp")
+            with os.fdopen(fd, 'wb') as f :
+                pickle.dump(encoded, f, pickle.HIGHEST_PROTOCOL)
+            size = os.path.getsize(tmpPath)
+            os.replace(tmpPath, path)
+        except OSError as e :
+            print("WARNING: Could not write mesh cache entry %s: %s" % (path, e))
+            if tmpPath is not None :
+                try :
+                    os.remove(tmpPath)
+                except OSError :
+                    pass
+            return
+        self.entries[key] = size
+        self.entries.move_to_end(key)
+        self.evict()
+
+    def remove(self, key) :
+        self.entries.pop(key, None)
+        try :
+            os.remove(self.path(key))
+        except OSError :
+            pass
+
+    def evict(self) :
+        size = self.size()
+        while size > self.maxBytes and len(self.entries) > 1 :
+            key, entrySize = next(iter(self.entries.items()))
+            self.remove(key)
+            size -= entrySize
+            self.evicted += 1
+
+    def size(self) :
+        return sum(self.entries.values())
+
+    def report(self) :
+        return "Mesh cache: %d hits, %d misses, %d evicted, %d entries, %.1f MB" % (
+            self.hits, self.misses, self.evicted, len(self.entries), self.size() / 1048576.0)
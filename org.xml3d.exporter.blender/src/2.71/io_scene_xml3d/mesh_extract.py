@@ -0,0 +1,87 @@
+# ##### BEGIN GPL LICENSE BLOCK #####
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 2
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software Foundation,
+#  Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA.
+#
+# ##### END GPL LICENSE BLOCK #####
+
+"""Bulk extraction of mesh attributes.
+
+Every attribute is read with a single foreach_get call into a NumPy array
+or, without NumPy, into an array.array. Anything that implements
+foreach_get(attribute, buffer) on its collections can be extracted, the
+rest of the export only works on the returned buffers.
+"""
+
+import array
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+# array typecode -> NumPy dtype of the buffers
+BUFFER_TYPES = {
+    'f' : "float32",
+    'i' : "int32",
+}
+
+
+def newBuffer(typecode, count) :
+    if numpy is not None :
+        return numpy.empty(count, BUFFER_TYPES[typecode])
+    return array.array(typecode, bytes(array.array(typecode).itemsize * count))
+
+
+def readAttribute(collection, attribute, typecode, components = 1) :
+    "Reads attribute of every item of collection with foreach_get"
+    data = newBuffer(typecode, len(collection) * components)
+    collection.foreach_get(attribute, data)
+    if numpy is not None and components > 1 :
+        return data.reshape(-1, components)
+    return data
+
+
+def readLoopNormals(mesh) :
+    """Normal of every face corner: the custom or auto smooth split normal,
+    else the vertex normal of smooth and the face normal of flat faces"""
+    mesh.calc_normals_split()
+    normals = readAttribute(mesh.loops, "normal", 'f', 3)
+    mesh.free_normals_split()
+    return normals
+
+
+def extractMeshArrays(mesh) :
+    """Reads all attributes needed for welding.
+
+    Everything a vertex is made of is read per loop (face corner), so
+    split normals, UV seams and n-gons need no special handling. With
+    NumPy, vector attributes have one row per item, otherwise all buffers
+    are flat. uvs are the UVs of the active UV layer or None. Meshes of
+    Blender 2.71 have no loop_triangles, triangulate splits the faces.
+    """
+    uvs = None
+    uvLayer = mesh.uv_layers.active
+    if uvLayer :
+        uvs = readAttribute(uvLayer.data, "uv", 'f', 2)
+
+    return {
+        "co" : readAttribute(mesh.vertices, "co", 'f', 3),
+        "materials" : readAttribute(mesh.polygons, "material_index", 'i'),
+        "loopStart" : readAttribute(mesh.polygons, "loop_start", 'i'),
+        "loopTotal" : readAttribute(mesh.polygons, "loop_total", 'i'),
+        "loopVertices" : readAttribute(mesh.loops, "vertex_index", 'i'),
+        "loopNormals" : readLoopNormals(mesh),
+        "uvs" : uvs,
+    }
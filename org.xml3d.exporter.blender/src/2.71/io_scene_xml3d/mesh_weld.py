@@ -0,0 +1,154 @@
+# ##### BEGIN GPL LICENSE BLOCK #####
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 2
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software Foundation,
+#  Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA.
+#
+# ##### END GPL LICENSE BLOCK #####
+
+"""Vertex welding of the buffers read by mesh_extract.
+
+Every face corner (loop) becomes a vertex made of its vertex index, its
+split normal and its texcoord, rounded to 8 places. Equal corners are
+merged and vertices are numbered in order of their first appearance. With
+NumPy every corner gets a packed key and np.unique merges equal keys on
+whole arrays, without NumPy a dict does the same corner by corner. The
+index arrays hold the triangles of triangulate, split by material.
+"""
+
+import array
+
+from . import mesh_extract
+from . import triangulate
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+def roundKey(values) :
+    "Rounds to 8 places like round(v, 8), stored as float32 again"
+    return numpy.round(values.astype(numpy.float64), 8).astype(numpy.float32)
+
+
+def weldArrays(arrays, materialCount) :
+    """Welds the corners of all faces.
+
+    Returns flat position, normal and texcoord arrays of the unique vertices
+    (texcoords are None if there is no UV layer) and a list of triangle index
+    arrays, one per material.
+    """
+    if numpy is None or not isinstance(arrays["co"], numpy.ndarray) :
+        return weldBuffers(arrays, materialCount)
+    loopStart = arrays["loopStart"]
+    loopTotal = arrays["loopTotal"]
+    faceCount = len(loopTotal)
+
+    # Enumerate corners face by face, just like iterating face.vertices
+    cornerFace = numpy.repeat(numpy.arange(faceCount), loopTotal)
+    faceFirstCorner = numpy.cumsum(loopTotal) - loopTotal
+    cornerOffset = numpy.arange(len(cornerFace)) - faceFirstCorner[cornerFace]
+    cornerLoop = loopStart[cornerFace] + cornerOffset
+    cornerVertex = arrays["loopVertices"][cornerLoop]
+
+    normals = roundKey(arrays["loopNormals"][cornerLoop])
+
+    # Packed key per corner; adding 0.0 turns -0.0 into 0.0 so that both
+    # compare equal like they do for mathutils vectors
+    columns = [cornerVertex.astype(numpy.int32)[:, None], (normals + numpy.float32(0.0)).view(numpy.int32)]
+    texcoords = None
+    if arrays["uvs"] is not None :
+        texcoords = roundKey(arrays["uvs"][cornerLoop])
+        columns.append((texcoords + numpy.float32(0.0)).view(numpy.int32))
+    keys = numpy.ascontiguousarray(numpy.hstack(columns))
+    keys = keys.view(numpy.dtype((numpy.void, keys.dtype.itemsize * keys.shape[1]))).ravel()
+
+    unused, firstCorner, inverse = numpy.unique(keys, return_index = True, return_inverse = True)
+    # np.unique sorts by key, renumber in order of first appearance
+    order = numpy.argsort(firstCorner, kind = "mergesort")
+    rank = numpy.empty_like(order)
+    rank[order] = numpy.arange(len(order))
+    cornerIndex = rank[inverse.ravel()]
+    firstCorner = firstCorner[order]
+
+    positions = arrays["co"][cornerVertex[firstCorner]]
+    normals = normals[firstCorner]
+    if texcoords is not None :
+        texcoords = texcoords[firstCorner]
+
+    triangleFaces, triangleOffsets = triangulate.triangulateArrays(arrays)
+    entryFace = numpy.repeat(triangleFaces, 3)
+    entryCorner = (faceFirstCorner[triangleFaces][:, None] + triangleOffsets).ravel()
+    entryIndex = cornerIndex[entryCorner]
+
+    entryMaterial = arrays["materials"][entryFace]
+    if materialCount <= 1 :
+        indices = [entryIndex]
+    else :
+        indices = [entryIndex[entryMaterial == m] for m in range(materialCount)]
+
+    return positions.ravel(), normals.ravel(), None if texcoords is None else texcoords.ravel(), indices
+
+
+def roundValues(values) :
+    "Same rounding as roundKey, for flat buffers without NumPy"
+    return array.array('f', [round(v, 8) for v in values])
+
+
+def weldBuffers(arrays, materialCount) :
+    "weldArrays for the flat array.array buffers read without NumPy"
+    co = arrays["co"]
+    loopNormals = roundValues(arrays["loopNormals"])
+    uvs = arrays["uvs"]
+    if uvs is not None :
+        uvs = roundValues(uvs)
+    faceMaterials = arrays["materials"]
+    loopStart = arrays["loopStart"]
+    loopTotal = arrays["loopTotal"]
+    loopVertices = arrays["loopVertices"]
+
+    positions, normals = array.array('f'), array.array('f')
+    texcoords = None if uvs is None else array.array('f')
+    indices = [[] for m in range(max(materialCount, 1))]
+    vertexIndices = {}
+    faceTriangles = triangulate.triangulateBuffers(arrays)
+
+    for face in range(len(loopTotal)) :
+        corners = []
+        for loop in range(loopStart[face], loopStart[face] + loopTotal[face]) :
+            vertex = loopVertices[loop]
+            normal = tuple(loopNormals[3 * loop:3 * loop + 3])
+            key = (vertex,) + normal
+            if uvs is not None :
+                key += tuple(uvs[2 * loop:2 * loop + 2])
+
+            index = vertexIndices.get(key)
+            if index is None :
+                index = len(vertexIndices)
+                vertexIndices[key] = index
+                positions.extend(co[3 * vertex:3 * vertex + 3])
+                normals.extend(normal)
+                if uvs is not None :
+                    texcoords.extend(key[4:])
+            corners.append(index)
+
+        material = faceMaterials[face] if materialCount > 1 else 0
+        if material < len(indices) :
+            indices[material].extend(corners[m] for m in faceTriangles[face])
+
+    return positions, normals, texcoords, indices
+
+
+def weldMesh(mesh, materialCount) :
+    return weldArrays(mesh_extract.extractMeshArrays(mesh), materialCount)
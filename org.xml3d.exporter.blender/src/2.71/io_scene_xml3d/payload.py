@@ -0,0 +1,82 @@
+# ##### BEGIN GPL LICENSE BLOCK #####
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 2
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software Foundation,
+#  Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA.
+#
+# ##### END GPL LICENSE BLOCK #####
+
+"""Binary sidecar file for mesh arrays.
+
+Float arrays are stored as little-endian Float32, index arrays as
+little-endian Uint32 and quantized attributes as Uint16/Int16. Every array
+starts at a 4 byte aligned offset so a client can map it directly onto a
+typed array.
+"""
+
+import array
+import sys
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+PAYLOAD_EXT = ".xml3d-bin"
+
+
+# array typecode -> (NumPy dtype, type name used in src references)
+ARRAY_TYPES = {
+    'f' : ("<f4", "float32"),
+    'I' : ("<u4", "uint32"),
+    'H' : ("<u2", "uint16"),
+    'h' : ("<i2", "int16"),
+}
+
+
+def encodeArray(values, typecode) :
+    "Returns the little-endian bytes of values, typecode is one of ARRAY_TYPES"
+    if numpy is not None :
+        return numpy.asarray(values).astype(ARRAY_TYPES[typecode][0]).tobytes()
+    data = array.array(typecode, values)
+    if sys.byteorder != "little" :
+        data.byteswap()
+    return data.tobytes()
+
+
+class BinaryPayloadWriter :
+
+    def __init__(self, filepath) :
+        self.filepath = filepath
+        self.out = open(filepath, 'wb')
+        self.offset = 0
+
+    def writeBytes(self, data) :
+        "Appends data and returns its byte offset and length"
+        padding = -self.offset % 4
+        if padding :
+            self.out.write(b"\0" * padding)
+            self.offset += padding
+        offset = self.offset
+        self.out.write(data)
+        self.offset += len(data)
+        return offset, len(data)
+
+    def writeFloat32(self, values) :
+        return self.writeBytes(encodeArray(values, 'f'))
+
+    def writeUint32(self, values) :
+        return self.writeBytes(encodeArray(values, 'I'))
+
+    def close(self) :
+        self.out.close()
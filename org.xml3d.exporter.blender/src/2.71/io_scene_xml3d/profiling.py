@@ -0,0 +1,183 @@
+# ##### BEGIN GPL LICENSE BLOCK #####
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 2
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software Foundation,
+#  Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA.
+#
+# ##### END GPL LICENSE BLOCK #####
+
+"""Timings and counts of an export.
+
+Phases accumulate wall clock time over the whole export, items record the
+timings and counts of a single mesh, light or material. The peak memory is
+the peak resident set size of the process, read when the export finishes.
+"""
+
+import contextlib
+import json
+import sys
+import time
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+PROFILE_EXT = ".profile.json"
+
+
+class ExportProfile :
+
+    def __init__(self) :
+        self.start = time.perf_counter()
+        self.duration = None
+        self.peakMemory = None
+        # Phase name -> seconds, in order of first use
+        self.phases = {}
+        # (kind, name) -> dict of timings and counts, in order of first use
+        self.items = {}
+        self.totals = {}
+
+    @contextlib.contextmanager
+    def phase(self, name) :
+        start = time.perf_counter()
+        try :
+            yield
+        finally :
+            self.addTime(name, time.perf_counter() - start)
+
+    @contextlib.contextmanager
+    def measure(self, phaseName, kind, name) :
+        "Like phase, also adds the time to <phaseName>Time of an item"
+        start = time.perf_counter()
+        try :
+            yield
+        finally :
+            seconds = time.perf_counter() - start
+            self.addTime(phaseName, seconds)
+            item = self.item(kind, name)
+            key = phaseName + "Time"
+            item[key] = item.get(key, 0.0) + seconds
+
+    def addTime(self, name, seconds) :
+        self.phases[name] = self.phases.get(name, 0.0) + seconds
+
+    def item(self, kind, name) :
+        key = (kind, name)
+        if key not in self.items :
+            self.items[key] = {"type" : kind, "name" : name}
+        return self.items[key]
+
+    def count(self, kind, name, **counts) :
+        "Sets counts of an item and adds them to the totals"
+        self.item(kind, name).update(counts)
+        for key, value in counts.items() :
+            if isinstance(value, (int, float)) and not isinstance(value, bool) :
+                self.totals[key] = self.totals.get(key, 0) + value
+
+    def setTime(self, kind, name, **seconds) :
+        "Sets times measured elsewhere (e.g. in a worker process) of an item"
+        item = self.item(kind, name)
+        for key, value in seconds.items() :
+            item[key] = value
+            self.totals[key] = self.totals.get(key, 0.0) + value
+
+    def finish(self) :
+        self.duration = time.perf_counter() - self.start
+        self.peakMemory = peakMemory()
+
+    def report(self) :
+        if self.duration is None :
+            self.finish()
+        return {
+            "duration" : self.duration,
+            "peakMemory" : self.peakMemory,
+            "phases" : self.phases,
+            "totals" : self.totals,
+            "items" : list(self.items.values()),
+        }
+
+    def writeJSON(self, filepath) :
+        with open(filepath, 'w') as out :
+            json.dump(self.report(), out, indent = 1)
+
+    def table(self, slowest = 10) :
+        "Console table of the phases and the slowest items"
+        lines = ["%-24s %10s %6s" % ("Phase", "Seconds", "%")]
+        total = self.duration or sum(self.phases.values()) or 1.0
+        for name, seconds in sorted(self.phases.items(), key = lambda p : -p[1]) :
+            lines.append("%-24s %10.3f %6.1f" % (name, seconds, 100.0 * seconds / total))
+        lines.append("%-24s %10.3f" % ("Total", total))
+
+        def itemTime(item) :
+            return sum(v for k, v in item.items() if k.endswith("Time"))
+        items = sorted(self.items.values(), key = itemTime, reverse = True)[:slowest]
+        if items :
+            lines.append("")
+            lines.append("%-8s %-32s %10s %10s %10s %12s  %s" % ("Type", "Name", "Seconds", "Faces", "Vertices", "Bytes",
+                                                                 "Details"))
+            for item in items :
+                lines.append("%-8s %-32s %10.3f %10s %10s %12s  %s" % (item["type"], item["name"][:32], itemTime(item),
+                             item.get("faces", ""), item.get("vertices", ""), item.get("bytes", ""), itemDetails(item)))
+        for key in sorted(self.totals) :
+            value = self.totals[key]
+            lines.append(("%s: %.3f" if isinstance(value, float) else "%s: %d") % (key, value))
+        if self.peakMemory :
+            lines.append("peakMemory: %.1f MB" % (self.peakMemory / 1048576.0))
+        return "\n".join(lines)
+
+
+def itemDetails(item) :
+    "Levels of detail and vertex cache optimization of a mesh item, for the table"
+    details = []
+    if item.get("lodTriangles") :
+        details.append("LOD triangles " + "/".join(map(str, item["lodTriangles"])))
+    if "acmrAfter" in item :
+        details.append("ACMR %.3f -> %.3f" % (item["acmrBefore"], item["acmrAfter"]))
+    return ", ".join(details)
+
+
+def encodedSize(value) :
+    "Size in bytes of encoded text or payload arrays, nested in lists, tuples and dicts"
+    if isinstance(value, (str, bytes)) :
+        return len(value)
+    if isinstance(value, dict) :
+        return sum(encodedSize(v) for v in value.values())
+    if isinstance(value, (list, tuple)) :
+        return sum(encodedSize(v) for v in value)
+    return 0
+
+
+def peakMemory() :
+    "Peak resident memory of the process in bytes, None where it cannot be read"
+    if resource is not None :
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # Bytes on macOS, kilobytes elsewhere
+        return peak if sys.platform == "darwin" else peak * 1024
+    if sys.platform == "win32" :
+        import ctypes
+        from ctypes import wintypes
+        
+        class ProcessMemoryCounters(ctypes.Structure) :
+            _fields_ = [("cb", wintypes.DWORD), ("PageFaultCount", wintypes.DWORD)] + [
+                (name, ctypes.c_size_t) for name in ("PeakWorkingSetSize", "WorkingSetSize",
+                "QuotaPeakPagedPoolUsage", "QuotaPagedPoolUsage", "QuotaPeakNonPagedPoolUsage",
+                "QuotaNonPagedPoolUsage", "PagefileUsage", "PeakPagefileUsage")]
+        
+        counters = ProcessMemoryCounters()
+        counters.cb = ctypes.sizeof(counters)
+        getInfo = ctypes.windll.psapi.GetProcessMemoryInfo
+        getInfo.argtypes = [wintypes.HANDLE, ctypes.POINTER(ProcessMemoryCounters), wintypes.DWORD]
+        if getInfo(ctypes.windll.kernel32.GetCurrentProcess(), ctypes.byref(counters), counters.cb) :
+            return counters.PeakWorkingSetSize
+    return None
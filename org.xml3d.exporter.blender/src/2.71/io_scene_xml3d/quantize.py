@@ -0,0 +1,135 @@
+# ##### BEGIN GPL LICENSE BLOCK #####
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 2
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software Foundation,
+#  Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA.
+#
+# ##### END GPL LICENSE BLOCK #####
+
+"""Quantization of vertex attributes (needs NumPy).
+
+Positions and texcoords are stored as unsigned 16 bit integers relative to
+their bounding box, normals as two signed 16 bit integers in octahedral
+encoding. The document decodes them with the Xflow operators in
+XFLOW_OPERATORS.
+"""
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+UINT16_MAX = 65535
+INT16_MAX = 32767
+
+POSITION_COMPUTE = "position = xml3d.dequantize3(qPosition, positionScale, positionOffset)"
+NORMAL_COMPUTE = "normal = xml3d.decodeOctahedral(qNormal)"
+TEXCOORD_COMPUTE = "texcoord = xml3d.dequantize2(qTexcoord, texcoordScale, texcoordOffset)"
+
+XFLOW_OPERATORS = """
+(function() {
+    function dequantize(components) {
+        return function(result, value, scale, offset) {
+            var count = value.length / components;
+            for (var i = 0; i < count; i++) {
+                for (var c = 0; c < components; c++) {
+                    result[i * components + c] = value[i * components + c] * scale[c] + offset[c];
+                }
+            }
+            return true;
+        };
+    }
+    Xflow.registerOperator("xml3d.dequantize3", {
+        outputs: [{type: 'float3', name: 'result', customAlloc: true}],
+        params:  [{type: 'int', source: 'value', array: true},
+                  {type: 'float3', source: 'scale', array: true},
+                  {type: 'float3', source: 'offset', array: true}],
+        alloc: function(sizes, value) { sizes['result'] = value.length / 3; },
+        evaluate: dequantize(3)
+    });
+    Xflow.registerOperator("xml3d.dequantize2", {
+        outputs: [{type: 'float2', name: 'result', customAlloc: true}],
+        params:  [{type: 'int', source: 'value', array: true},
+                  {type: 'float2', source: 'scale', array: true},
+                  {type: 'float2', source: 'offset', array: true}],
+        alloc: function(sizes, value) { sizes['result'] = value.length / 2; },
+        evaluate: dequantize(2)
+    });
+    Xflow.registerOperator("xml3d.decodeOctahedral", {
+        outputs: [{type: 'float3', name: 'result', customAlloc: true}],
+        params:  [{type: 'int', source: 'value', array: true}],
+        alloc: function(sizes, value) { sizes['result'] = value.length / 2; },
+        evaluate: function(result, value) {
+            var count = value.length / 2;
+            for (var i = 0; i < count; i++) {
+                var x = value[2 * i] / 32767, y = value[2 * i + 1] / 32767;
+                var z = 1 - Math.abs(x) - Math.abs(y);
+                if (z < 0) {
+                    var ox = x;
+                    x = (1 - Math.abs(y)) * (ox >= 0 ? 1 : -1);
+                    y = (1 - Math.abs(ox)) * (y >= 0 ? 1 : -1);
+                }
+                var l = Math.sqrt(x * x + y * y + z * z) || 1;
+                result[3 * i] = x / l;
+                result[3 * i + 1] = y / l;
+                result[3 * i + 2] = z / l;
+            }
+            return true;
+        }
+    });
+})();
+"""
+
+
+def quantizeRange(values, components) :
+    """Quantizes values to 0..65535 relative to their bounding box.
+    Returns the integers and the decode scale and offset per component."""
+    values = numpy.asarray(values, numpy.float64).reshape(-1, components)
+    if len(values) == 0 :
+        return numpy.zeros(0, numpy.uint16), numpy.ones(components), numpy.zeros(components)
+    offset = values.min(axis = 0)
+    extent = values.max(axis = 0) - offset
+    scale = numpy.where(extent > 0, extent / UINT16_MAX, 1.0)
+    q = numpy.rint((values - offset) / scale)
+    q = numpy.clip(q, 0, UINT16_MAX).astype(numpy.uint16)
+    return q.ravel(), scale, offset
+
+
+def encodeOctahedral(normals) :
+    "Octahedral encoding of unit normals as pairs of int16"
+    n = numpy.asarray(normals, numpy.float64).reshape(-1, 3)
+    length = numpy.abs(n).sum(axis = 1)
+    length[length == 0] = 1.0
+    n = n / length[:, None]
+    x, y, z = n[:, 0], n[:, 1], n[:, 2]
+    signX = numpy.where(x >= 0, 1.0, -1.0)
+    signY = numpy.where(y >= 0, 1.0, -1.0)
+    octX = numpy.where(z >= 0, x, (1.0 - numpy.abs(y)) * signX)
+    octY = numpy.where(z >= 0, y, (1.0 - numpy.abs(x)) * signY)
+    q = numpy.rint(numpy.stack((octX, octY), axis = 1) * INT16_MAX)
+    return numpy.clip(q, -INT16_MAX, INT16_MAX).astype(numpy.int16).ravel()
+
+
+def decodeOctahedral(q) :
+    "Inverse of encodeOctahedral, mirrors the xml3d.decodeOctahedral operator"
+    q = numpy.asarray(q, numpy.float64).reshape(-1, 2) / INT16_MAX
+    x, y = q[:, 0].copy(), q[:, 1].copy()
+    z = 1.0 - numpy.abs(x) - numpy.abs(y)
+    folded = z < 0
+    ox = x.copy()
+    x[folded] = ((1.0 - numpy.abs(y)) * numpy.where(ox >= 0, 1.0, -1.0))[folded]
+    y[folded] = ((1.0 - numpy.abs(ox)) * numpy.where(y >= 0, 1.0, -1.0))[folded]
+    n = numpy.stack((x, y, z), axis = 1)
+    length = numpy.sqrt((n * n).sum(axis = 1))
+    length[length == 0] = 1.0
+    return n / length[:, None]
@@ -0,0 +1,100 @@
+# ##### BEGIN GPL LICENSE BLOCK #####
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 2
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software Foundation,
+#  Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA.
+#
+# ##### END GPL LICENSE BLOCK #####
+
+"""Spatial partitioning of the scene into tiles for progressive loading.
+
+An octree is built over the centers of the world space bounding boxes of
+the exported meshes. Every leaf with content becomes a tile, numbered in
+depth first order so neighbouring tiles get close numbers. The bounds of a
+tile are the union of the bounding boxes in it, they may overlap the
+bounds of neighbouring tiles.
+"""
+
+import json
+
+TILE_INDEX_EXT = ".tiles.json"
+MAX_DEPTH = 8
+
+
+def worldBounds(corners, matrix) :
+    "Axis aligned bounds of local corner points transformed by a 4x4 matrix"
+    points = []
+    for c in corners :
+        points.append([matrix[i][0] * c[0] + matrix[i][1] * c[1] + matrix[i][2] * c[2] + matrix[i][3]
+                       for i in range(3)])
+    return ([min(p[k] for p in points) for k in range(3)],
+            [max(p[k] for p in points) for k in range(3)])
+
+
+def unionBounds(bounds) :
+    return ([min(b[0][k] for b in bounds) for k in range(3)],
+            [max(b[1][k] for b in bounds) for k in range(3)])
+
+
+def center(bounds) :
+    return [(bounds[0][k] + bounds[1][k]) * 0.5 for k in range(3)]
+
+
+def buildTiles(items, maxItems) :
+    """Partitions items, a list of (name, bounds), into tiles of at most
+    maxItems each (unless MAX_DEPTH is reached). Returns a list of dicts
+    with the names, the content bounds and the octree cell of each tile."""
+    if not items :
+        return []
+    low, high = unionBounds([bounds for name, bounds in items])
+    # Cubic root cell, so cells keep their proportions
+    size = max(high[k] - low[k] for k in range(3)) or 1.0
+    tiles = []
+    split(items, low, size, maxItems, 0, tiles)
+    return tiles
+
+
+def split(items, low, size, maxItems, depth, tiles) :
+    if len(items) <= maxItems or depth == MAX_DEPTH :
+        tiles.append({
+            "names" : [name for name, bounds in items],
+            "bounds" : unionBounds([bounds for name, bounds in items]),
+            "cell" : (low, [low[k] + size for k in range(3)]),
+        })
+        return
+    half = size * 0.5
+    octants = [[] for i in range(8)]
+    for name, bounds in items :
+        c = center(bounds)
+        octant = sum((1 << k) for k in range(3) if c[k] >= low[k] + half)
+        octants[octant].append((name, bounds))
+    for octant, octantItems in enumerate(octants) :
+        if octantItems :
+            octantLow = [low[k] + (half if octant & (1 << k) else 0.0) for k in range(3)]
+            split(octantItems, octantLow, half, maxItems, depth + 1, tiles)
+
+
+def writeIndex(filepath, tiles, document) :
+    "Index of the tile files with their bounds, for clients to load nearby tiles first"
+    index = {
+        "document" : document,
+        "bounds" : unionBounds([tile["bounds"] for tile in tiles]) if tiles else None,
+        "tiles" : [{
+            "file" : tile["file"],
+            "bounds" : tile["bounds"],
+            "cell" : tile["cell"],
+            "meshes" : tile["names"],
+        } for tile in tiles],
+    }
+    with open(filepath, 'w') as out :
+        json.dump(index, out, indent = 1)
@@ -0,0 +1,140 @@
+# ##### BEGIN GPL LICENSE BLOCK #####
+#
+#  This program is free software; you can redistribute it and/or
+#  modify it under the terms of the GNU General Public License
+#  as published by the Free Software Foundation; either version 2
+#  of the License, or (at your option) any later version.
+#
+#  This program is distributed in the hope that it will be useful,
+#  but WITHOUT ANY WARRANTY; without even the implied warranty of
+#  MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#  GNU General Public License for more details.
+#
+#  You should have received a copy of the GNU General Public License
+#  along with this program; if not, write to the Free Software Foundation,
+#  Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA.
+#
+# ##### END GPL LICENSE BLOCK #####
+
+"""Triangulation of the faces read by mesh_extract.
+
+Triangles are given as the face they belong to and three corner offsets
+into that face, in face order. Triangles and quads are split as (0, 1, 2)
+and (2, 3, 0) and larger polygons are ear clipped, which always yields
+cornerCount - 2 triangles, so every face keeps a fixed slot in the result.
+Blender 2.71 meshes have no loop_triangles, this is the only triangulation.
+"""
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+def fanTriangles(cornerCount) :
+    """Corner offsets of the triangles of a face: (0, 1, 2) followed by
+    (k, k + 1, 0), so a quad is split into (0, 1, 2) and (2, 3, 0)"""
+    offsets = [0, 1, 2]
+    for k in range(2, cornerCount - 1) :
+        offsets.extend((k, k + 1, 0))
+    return offsets if cornerCount >= 3 else []
+
+
+def projectPolygon(points) :
+    """Drops the dominant axis of the Newell normal, returns 2D points and the
+    winding sign. The remaining axes follow the dominant one cyclically (y z,
+    z x or x y), the order the Newell normal measures the winding in."""
+    normal = [0.0, 0.0, 0.0]
+    for i in range(len(points)) :
+        a, b = points[i - 1], points[i]
+        normal[0] += (a[1] - b[1]) * (a[2] + b[2])
+        normal[1] += (a[2] - b[2]) * (a[0] + b[0])
+        normal[2] += (a[0] - b[0]) * (a[1] + b[1])
+    axis = max(range(3), key = lambda k : abs(normal[k]))
+    u, v = (axis + 1) % 3, (axis + 2) % 3
+    sign = 1.0 if normal[axis] >= 0 else -1.0
+    return [(p[u], p[v]) for p in points], sign
+
+
+def cross(a, b, c) :
+    return (b[0] - a[0]) * (c[1] - a[1]) - (b[1] - a[1]) * (c[0] - a[0])
+
+
+def insideTriangle(p, a, b, c, sign) :
+    return cross(a, b, p) * sign >= 0 and cross(b, c, p) * sign >= 0 and cross(c, a, p) * sign >= 0
+
+
+def earClip(points) :
+    """Corner offsets of the triangles of a simple polygon given by its 3D
+    points. Degenerate rests (self intersections) are closed with a fan."""
+    points2d, sign = projectPolygon(points)
+    remaining = list(range(len(points)))
+    offsets = []
+    while len(remaining) > 3 :
+        count = len(remaining)
+        for i in range(count) :
+            a, b, c = remaining[i - 1], remaining[i], remaining[(i + 1) % count]
+            pa, pb, pc = points2d[a], points2d[b], points2d[c]
+            if cross(pa, pb, pc) * sign <= 0 :
+                # Reflex or collinear corner
+                continue
+            if any(insideTriangle(points2d[k], pa, pb, pc, sign) for k in remaining if k not in (a, b, c)) :
+                continue
+            offsets.extend((a, b, c))
+            del remaining[i]
+            break
+        else :
+            break
+    for k in range(1, len(remaining) - 1) :
+        offsets.extend((remaining[0], remaining[k], remaining[k + 1]))
+    return offsets
+
+
+def faceTriangles(co, loopVertices, loopStart, loopTotal) :
+    "Corner offsets of the triangles of one face, co is a flat coordinate buffer"
+    if loopTotal <= 4 :
+        return fanTriangles(loopTotal)
+    points = []
+    for loop in range(loopStart, loopStart + loopTotal) :
+        vertex = loopVertices[loop]
+        points.append(tuple(co[3 * vertex:3 * vertex + 3]))
+    return earClip(points)
+
+
+def triangulateBuffers(arrays) :
+    """Triangles of the flat array.array buffers read without NumPy, as a
+    list of corner offsets per face"""
+    loopStart = arrays["loopStart"]
+    loopTotal = arrays["loopTotal"]
+    co, loopVertices = arrays["co"], arrays["loopVertices"]
+    return [faceTriangles(co, loopVertices, loopStart[face], loopTotal[face]) for face in range(len(loopTotal))]
+
+
+def triangulateArrays(arrays) :
+    """Triangles of the NumPy arrays read by mesh_extract.
+
+    Returns the face of every triangle and an array with the three corner
+    offsets of every triangle, ordered by face. Only polygons with more
+    than four corners are handled one by one.
+    """
+    loopStart = arrays["loopStart"]
+    loopTotal = arrays["loopTotal"]
+    triangleCount = numpy.maximum(loopTotal - 2, 0)
+    firstTriangle = numpy.cumsum(triangleCount) - triangleCount
+    faces = numpy.repeat(numpy.arange(len(loopTotal)), triangleCount)
+    triangle = numpy.arange(len(faces)) - firstTriangle[faces]
+    offsets = numpy.empty((len(faces), 3), numpy.int32)
+    offsets[:, 0] = numpy.where(triangle == 0, 0, triangle + 1)
+    offsets[:, 1] = triangle + 1 + (triangle > 0)
+    offsets[:, 2] = numpy.where(triangle == 0, 2, 0)
+
+    polygons = numpy.nonzero(loopTotal > 4)[0]
+    if len(polygons) :
+        # Python floats, so the result matches triangulateBuffers exactly
+        co = arrays["co"].ravel().tolist()
+        loopVertices = arrays["loopVertices"].tolist()
+    for face in polygons :
+        first, count = firstTriangle[face], triangleCount[face]
+        offsets[first:first + count] = numpy.reshape(
+            faceTriangles(co, loopVertices, loopStart[face], loopTotal[face]), (-1, 3))
+    return faces, offsets
@@ -16,13 +16,161 @@
 #
 # ##### END GPL LICENSE BLOCK #####
 
-try:
-	from xml.dom.minidom import Document, Element
-except:
-	print("Error! Could not find XML modules!")
-
-class XML3DDocument( Document ):
-	""" An XML3D Document ( xml3d.org ) """
+import re
+import sys
+
+_SPECIAL = re.compile( '[&<>"]' )
+# minidom writes attributes sorted by name before Python 3.8 ( Blender 2.71
+# bundles 3.4 ) and in the order they were set since
+_SORTED_ATTRIBUTES = sys.version_info < ( 3, 8 )
+
+def _escape( data ):
+	""" Escapes text and attribute values like minidom does """
+	if _SPECIAL.search( data ) is None:
+		return data
+	return data.replace( "&", "&amp;" ).replace( "<", "&lt;" ).replace( "\"", "&quot;" ).replace( ">", "&gt;" )
+
+class _Node( object ):
+	""" A node of an XML3DDocument
+
+	The nodes are a small subset of the DOM: elements and text nodes, which
+	only keep what is needed to build and serialize the document.
+	"""
+	__slots__ = ( "parentNode", )
+
+class _ParentNode( _Node ):
+	""" A node with children """
+	__slots__ = ( "childNodes", )
+
+	def appendChild( self, node ):
+		if node.parentNode is not None:
+			node.parentNode.removeChild( node )
+		self.childNodes.append( node )
+		node.parentNode = self
+		return node
+
+	def removeChild( self, node ):
+		self.childNodes.remove( node )
+		node.parentNode = None
+		return node
+
+class _Text( _Node ):
+	""" A text node """
+	__slots__ = ( "data", )
+
+	def __init__( self, data ):
+		self.parentNode = None
+		self.data = data
+
+	def serialize( self, out, indent = "", addindent = "", newl = "" ):
+		out.write( _escape( "%s%s%s" % ( indent, self.data, newl ) ) )
+
+	writexml = serialize
+
+class _Element( _ParentNode ):
+	""" An element, its attributes are a list of ( name, value ) tuples in
+	the order they were first set, written in the order minidom uses on the
+	running Python """
+	__slots__ = ( "tagName", "_attributes" )
+
+	# Text of elements with numeric content is written without escaping
+	_numeric = False
+
+	def __init__( self, tagName ):
+		self.parentNode = None
+		self.childNodes = []
+		self.tagName = tagName
+		self._attributes = []
+
+	def setAttribute( self, name, value ):
+		attributes = self._attributes
+		for i in range( len( attributes ) ):
+			if attributes[i][0] == name:
+				attributes[i] = ( name, value )
+				return
+		attributes.append( ( name, value ) )
+
+	def getAttribute( self, name ):
+		for attribute in self._attributes:
+			if attribute[0] == name:
+				return attribute[1]
+		return ""
+
+	def hasAttribute( self, name ):
+		return any( attribute[0] == name for attribute in self._attributes )
+
+	def setIdAttribute( self, name ):
+		""" Nothing to do, elements are not looked up by id """
+		pass
+
+	def startTag( self, indent ):
+		""" The start tag up to the closing bracket """
+		parts = [ indent, "<", self.tagName ]
+		attributes = self._attributes
+		if _SORTED_ATTRIBUTES:
+			attributes = sorted( attributes, key = lambda attribute: attribute[0] )
+		for name, value in attributes:
+			parts.append( " %s=\"%s\"" % ( name, _escape( value ) ) )
+		return "".join( parts )
+
+	def serialize( self, out, indent = "", addindent = "", newl = "" ):
+		""" Writes the element and its children, formatted like minidom.
+		Elements with text only are written with a single write """
+		childNodes = self.childNodes
+		if not childNodes:
+			out.write( self.startTag( indent ) + "/>" + newl )
+		elif len( childNodes ) == 1 and isinstance( childNodes[0], _Text ):
+			text = childNodes[0].data
+			if not self._numeric:
+				text = _escape( text )
+			out.write( "".join( ( self.startTag( indent ), ">", text, "</", self.tagName, ">", newl ) ) )
+		else:
+			out.write( self.startTag( indent ) + ">" + newl )
+			for node in childNodes:
+				node.serialize( out, indent + addindent, addindent, newl )
+			out.write( "%s</%s>%s" % ( indent, self.tagName, newl ) )
+
+	writexml = serialize
+
+class XML3DDocument( _ParentNode ):
+	""" An XML3D Document ( xml3d.org )
+
+	A lightweight element tree instead of minidom: elements use __slots__
+	and keep their attributes in a list, as scenes can have millions of
+	them. The output is the same as minidom's writexml on the same Python,
+	including the attribute order.
+	"""
+	__slots__ = ()
+
+	def __init__( self ):
+		self.parentNode = None
+		self.childNodes = []
+
+	def createElement( self, tagName ):
+		return _Element( tagName )
+
+	def createElementNS( self, namespaceURI, qualifiedName ):
+		return _Element( qualifiedName )
+
+	def createTextNode( self, data ):
+		return _Text( data )
+
+	def serialize( self, out, indent = "", addindent = "", newl = "", encoding = None ):
+		out.write( self.declaration( encoding, newl ) )
+		for node in self.childNodes:
+			node.serialize( out, indent, addindent, newl )
+
+	writexml = serialize
+
+	def declaration( self, encoding, newl ):
+		if encoding is None:
+			return '<?xml version="1.0" ?>' + newl
+		return '<?xml version="1.0" encoding="%s"?>%s' % ( encoding, newl )
+
+	def flush( self, element ):
+		""" Called when the current children of element are complete.
+		Nothing to do here, see XML3DStreamDocument """
+		pass
 
 	def createXml3dElement( self, id_ = None, height_ = None, width_ = None, activeView_ = None ):
 		#print 'Creating element  xml3d'
@@ -150,665 +298,551 @@ class XML3DDocument( Document ):
 		#e.ownerDocument = self
 		return e
 		
-class _XML3DElement( Element ):
+class XML3DStreamDocument( XML3DDocument ):
+	""" An XML3D Document that is written while it is built
+
+	flush() writes the children of an element to the output and drops them,
+	opening the element and its ancestors as needed. writexml() writes the
+	rest. The output is the same as writexml() on the complete tree.
+	"""
+
+	def __init__( self, writer, indent = "", addindent = "", newl = "", encoding = None ):
+		XML3DDocument.__init__( self )
+		self._writer = writer
+		self._indent = indent
+		self._addindent = addindent
+		self._newl = newl
+		self._encoding = encoding
+		# Elements whose start tag is written, mapped to their indent
+		self._opened = {}
+
+	def flush( self, element ):
+		if not element.childNodes:
+			return
+		indent = self._open( element ) + self._addindent
+		for node in element.childNodes:
+			self._writeNode( node, indent )
+			node.parentNode = None
+		del element.childNodes[:]
+
+	def serialize( self, out, indent = "", addindent = "", newl = "", encoding = None ):
+		if not self._opened:
+			XML3DDocument.serialize( self, out, indent, addindent, newl, encoding )
+			return
+		for node in self.childNodes:
+			self._writeNode( node, self._indent )
+
+	writexml = serialize
+
+	def _open( self, element ):
+		if element in self._opened:
+			return self._opened[element]
+		parent = element.parentNode
+		if parent is self:
+			self._writer.write( self.declaration( self._encoding, self._newl ) )
+			indent = self._indent
+		else:
+			indent = self._open( parent ) + self._addindent
+			# Everything in front of element is complete
+			index = parent.childNodes.index( element )
+			for node in parent.childNodes[:index]:
+				self._writeNode( node, indent )
+				node.parentNode = None
+			del parent.childNodes[:index]
+		self._writer.write( element.startTag( indent ) + ">" + self._newl )
+		self._opened[element] = indent
+		return indent
+
+	def _writeNode( self, node, indent ):
+		if node not in self._opened:
+			node.serialize( self._writer, indent, self._addindent, self._newl )
+			return
+		for child in node.childNodes:
+			self._writeNode( child, indent + self._addindent )
+		self._writer.write( "%s</%s>%s" % ( indent, node.tagName, self._newl ) )
+
+class _XML3DElement( _Element ):
 	""" A XML3DBaseType Element """
-
-	_id = None
+	__slots__ = ()
 
 	def __init__( self, doc_, name, id_ = None, class_ = None, style_ = None):
-		Element.__init__( self, name )
-		self.ownerDocument = doc_
-		self._id = id_
-		if not (self._id == None):
-			self.setAttribute( "id", self._id )
-
+		_Element.__init__( self, name )
+		if not (id_ == None):
+			self.setAttribute( "id", id_ )
 
 class _Xml3dElement( _XML3DElement ):
 	""" A xml3d Element """
-	_height = None	 
-	_width = None	 
-	_activeView = None	 
+	__slots__ = ()
 
 	def __init__( self, doc_, id_, height_, width_, activeView_ ):
 		_XML3DElement.__init__( self, doc_, "xml3d", id_ )
-		#print ("Setting height: " + str(height_))
-		self._height = height_
-		#print ("Setting width: " + str(width_))
-		self._width = width_
-		#print ("Setting activeView: " + str(activeView_))
-		self._activeView = activeView_
-		if not (self._height == None):
-			self.setAttribute( "height", self._height )
-		if not (self._width == None):
-			self.setAttribute( "width", self._width )
-		if not (self._activeView == None):
-			self.setAttribute( "activeView", self._activeView )
+		if not (height_ == None):
+			self.setAttribute( "height", height_ )
+		if not (width_ == None):
+			self.setAttribute( "width", width_ )
+		if not (activeView_ == None):
+			self.setAttribute( "activeView", activeView_ )
 		
 	def setHeight( self, value ):
-		self._height = value
-		self.setAttribute( "height", self._height )
+		self.setAttribute( "height", value )
 		return
 		
 	def setWidth( self, value ):
-		self._width = value
-		self.setAttribute( "width", self._width )
+		self.setAttribute( "width", value )
 		return
 		
 	def setActiveView( self, value ):
-		self._activeView = value
-		self.setAttribute( "activeView", self._activeView )
+		self.setAttribute( "activeView", value )
 		return
 
 class _DataElement( _XML3DElement ):
 	""" A data Element """
-	_map = None	 
-	_expose = None	 
-	_src = None	 
-	_script = None	 
+	__slots__ = ()
 
 	def __init__( self, doc_, id_, map_, expose_, src_, script_ ):
 		_XML3DElement.__init__( self, doc_, "data", id_ )
-		#print ("Setting map: " + str(map_))
-		self._map = map_
-		#print ("Setting expose: " + str(expose_))
-		self._expose = expose_
-		#print ("Setting src: " + str(src_))
-		self._src = src_
-		#print ("Setting script: " + str(script_))
-		self._script = script_
-		if not (self._map == None):
-			self.setAttribute( "map", self._map )
-		if not (self._expose == None):
-			self.setAttribute( "expose", self._expose )
-		if not (self._src == None):
-			self.setAttribute( "src", self._src )
-		if not (self._script == None):
-			self.setAttribute( "script", self._script )
+		if not (map_ == None):
+			self.setAttribute( "map", map_ )
+		if not (expose_ == None):
+			self.setAttribute( "expose", expose_ )
+		if not (src_ == None):
+			self.setAttribute( "src", src_ )
+		if not (script_ == None):
+			self.setAttribute( "script", script_ )
 		
 	def setMap( self, value ):
-		self._map = value
-		self.setAttribute( "map", self._map )
+		self.setAttribute( "map", value )
 		return
 		
 	def setExpose( self, value ):
-		self._expose = value
-		self.setAttribute( "expose", self._expose )
+		self.setAttribute( "expose", value )
 		return
 		
 	def setSrc( self, value ):
-		self._src = value
-		self.setAttribute( "src", self._src )
+		self.setAttribute( "src", value )
 		return
 		
 	def setScript( self, value ):
-		self._script = value
-		self.setAttribute( "script", self._script )
+		self.setAttribute( "script", value )
 		return
 
 class _DefsElement( _XML3DElement ):
 	""" A defs Element """
+	__slots__ = ()
 
 	def __init__( self, doc_, id_ ):
 		_XML3DElement.__init__( self, doc_, "defs", id_ )
 
 class _GroupElement( _XML3DElement ):
 	""" A group Element """
-	_visible = None	 
-	_transform = None	 
-	_shader = None	 
+	__slots__ = ()
 
 	def __init__( self, doc_, id_, visible_, transform_, shader_ ):
 		_XML3DElement.__init__( self, doc_, "group", id_ )
-		#print ("Setting visible: " + str(visible_))
-		self._visible = visible_
-		#print ("Setting transform: " + str(transform_))
-		self._transform = transform_
-		#print ("Setting shader: " + str(shader_))
-		self._shader = shader_
-		if not (self._visible == None):
-			self.setAttribute( "visible", self._visible )
-		if not (self._transform == None):
-			self.setAttribute( "transform", self._transform )
-		if not (self._shader == None):
-			self.setAttribute( "shader", self._shader )
+		if not (visible_ == None):
+			self.setAttribute( "visible", visible_ )
+		if not (transform_ == None):
+			self.setAttribute( "transform", transform_ )
+		if not (shader_ == None):
+			self.setAttribute( "shader", shader_ )
 		
 	def setVisible( self, value ):
-		self._visible = value
-		self.setAttribute( "visible", self._visible )
+		self.setAttribute( "visible", value )
 		return
 		
 	def setTransform( self, value ):
-		self._transform = value
-		self.setAttribute( "transform", self._transform )
+		self.setAttribute( "transform", value )
 		return
 		
 	def setShader( self, value ):
-		self._shader = value
-		self.setAttribute( "shader", self._shader )
+		self.setAttribute( "shader", value )
 		return
 
 class _MeshElement( _XML3DElement ):
 	""" A mesh Element """
-	_visible = None	 
-	_type = None	 
-	_src = None	 
+	__slots__ = ()
 
 	def __init__( self, doc_, id_, visible_, type_, src_ ):
 		_XML3DElement.__init__( self, doc_, "mesh", id_ )
-		#print ("Setting visible: " + str(visible_))
-		self._visible = visible_
-		#print ("Setting type: " + str(type_))
-		self._type = type_
-		#print ("Setting src: " + str(src_))
-		self._src = src_
-		if not (self._visible == None):
-			self.setAttribute( "visible", self._visible )
-		if not (self._type == None):
-			self.setAttribute( "type", self._type )
-		if not (self._src == None):
-			self.setAttribute( "src", self._src )
+		if not (visible_ == None):
+			self.setAttribute( "visible", visible_ )
+		if not (type_ == None):
+			self.setAttribute( "type", type_ )
+		if not (src_ == None):
+			self.setAttribute( "src", src_ )
 		
 	def setVisible( self, value ):
-		self._visible = value
-		self.setAttribute( "visible", self._visible )
+		self.setAttribute( "visible", value )
 		return
 		
 	def setType( self, value ):
-		self._type = value
-		self.setAttribute( "type", self._type )
+		self.setAttribute( "type", value )
 		return
 		
 	def setSrc( self, value ):
-		self._src = value
-		self.setAttribute( "src", self._src )
+		self.setAttribute( "src", value )
 		return
 
 class _TransformElement( _XML3DElement ):
 	""" A transform Element """
-	_translation = None	 
-	_scale = None	 
-	_rotation = None	 
-	_center = None	 
-	_scaleOrientation = None	 
+	__slots__ = ()
 
 	def __init__( self, doc_, id_, translation_, scale_, rotation_, center_, scaleOrientation_ ):
 		_XML3DElement.__init__( self, doc_, "transform", id_ )
-		#print ("Setting translation: " + str(translation_))
-		self._translation = translation_
-		#print ("Setting scale: " + str(scale_))
-		self._scale = scale_
-		#print ("Setting rotation: " + str(rotation_))
-		self._rotation = rotation_
-		#print ("Setting center: " + str(center_))
-		self._center = center_
-		#print ("Setting scaleOrientation: " + str(scaleOrientation_))
-		self._scaleOrientation = scaleOrientation_
-		if not (self._translation == None):
-			self.setAttribute( "translation", self._translation )
-		if not (self._scale == None):
-			self.setAttribute( "scale", self._scale )
-		if not (self._rotation == None):
-			self.setAttribute( "rotation", self._rotation )
-		if not (self._center == None):
-			self.setAttribute( "center", self._center )
-		if not (self._scaleOrientation == None):
-			self.setAttribute( "scaleOrientation", self._scaleOrientation )
+		if not (translation_ == None):
+			self.setAttribute( "translation", translation_ )
+		if not (scale_ == None):
+			self.setAttribute( "scale", scale_ )
+		if not (rotation_ == None):
+			self.setAttribute( "rotation", rotation_ )
+		if not (center_ == None):
+			self.setAttribute( "center", center_ )
+		if not (scaleOrientation_ == None):
+			self.setAttribute( "scaleOrientation", scaleOrientation_ )
 		
 	def setTranslation( self, value ):
-		self._translation = value
-		self.setAttribute( "translation", self._translation )
+		self.setAttribute( "translation", value )
 		return
 		
 	def setScale( self, value ):
-		self._scale = value
-		self.setAttribute( "scale", self._scale )
+		self.setAttribute( "scale", value )
 		return
 		
 	def setRotation( self, value ):
-		self._rotation = value
-		self.setAttribute( "rotation", self._rotation )
+		self.setAttribute( "rotation", value )
 		return
 		
 	def setCenter( self, value ):
-		self._center = value
-		self.setAttribute( "center", self._center )
+		self.setAttribute( "center", value )
 		return
 		
 	def setScaleOrientation( self, value ):
-		self._scaleOrientation = value
-		self.setAttribute( "scaleOrientation", self._scaleOrientation )
+		self.setAttribute( "scaleOrientation", value )
 		return
 
 class _ShaderElement( _XML3DElement ):
 	""" A shader Element """
-	_script = None	 
-	_src = None	 
+	__slots__ = ()
 
 	def __init__( self, doc_, id_, script_, src_ ):
 		_XML3DElement.__init__( self, doc_, "shader", id_ )
-		#print ("Setting script: " + str(script_))
-		self._script = script_
-		#print ("Setting src: " + str(src_))
-		self._src = src_
-		if not (self._script == None):
-			self.setAttribute( "script", self._script )
-		if not (self._src == None):
-			self.setAttribute( "src", self._src )
+		if not (script_ == None):
+			self.setAttribute( "script", script_ )
+		if not (src_ == None):
+			self.setAttribute( "src", src_ )
 		
 	def setScript( self, value ):
-		self._script = value
-		self.setAttribute( "script", self._script )
+		self.setAttribute( "script", value )
 		return
 		
 	def setSrc( self, value ):
-		self._src = value
-		self.setAttribute( "src", self._src )
+		self.setAttribute( "src", value )
 		return
 
 class _LightElement( _XML3DElement ):
 	""" A light Element """
-	_visible = None	 
-	_shader = None	 
-	_global = None	 
-	_intensity = None	 
+	__slots__ = ()
 
 	def __init__( self, doc_, id_, visible_, shader_, global_, intensity_ ):
 		_XML3DElement.__init__( self, doc_, "light", id_ )
-		#print ("Setting visible: " + str(visible_))
-		self._visible = visible_
-		#print ("Setting shader: " + str(shader_))
-		self._shader = shader_
-		#print ("Setting global: " + str(global_))
-		self._global = global_
-		#print ("Setting intensity: " + str(intensity_))
-		self._intensity = intensity_
-		if not (self._visible == None):
-			self.setAttribute( "visible", self._visible )
-		if not (self._shader == None):
-			self.setAttribute( "shader", self._shader )
-		if not (self._global == None):
-			self.setAttribute( "global", self._global )
-		if not (self._intensity == None):
-			self.setAttribute( "intensity", self._intensity )
+		if not (visible_ == None):
+			self.setAttribute( "visible", visible_ )
+		if not (shader_ == None):
+			self.setAttribute( "shader", shader_ )
+		if not (global_ == None):
+			self.setAttribute( "global", global_ )
+		if not (intensity_ == None):
+			self.setAttribute( "intensity", intensity_ )
 		
 	def setVisible( self, value ):
-		self._visible = value
-		self.setAttribute( "visible", self._visible )
+		self.setAttribute( "visible", value )
 		return
 		
 	def setShader( self, value ):
-		self._shader = value
-		self.setAttribute( "shader", self._shader )
+		self.setAttribute( "shader", value )
 		return
 		
 	def setGlobal( self, value ):
-		self._global = value
-		self.setAttribute( "global", self._global )
+		self.setAttribute( "global", value )
 		return
 		
 	def setIntensity( self, value ):
-		self._intensity = value
-		self.setAttribute( "intensity", self._intensity )
+		self.setAttribute( "intensity", value )
 		return
 
 class _LightshaderElement( _XML3DElement ):
 	""" A lightshader Element """
-	_script = None	 
-	_src = None	 
+	__slots__ = ()
 
 	def __init__( self, doc_, id_, script_, src_ ):
 		_XML3DElement.__init__( self, doc_, "lightshader", id_ )
-		#print ("Setting script: " + str(script_))
-		self._script = script_
-		#print ("Setting src: " + str(src_))
-		self._src = src_
-		if not (self._script == None):
-			self.setAttribute( "script", self._script )
-		if not (self._src == None):
-			self.setAttribute( "src", self._src )
+		if not (script_ == None):
+			self.setAttribute( "script", script_ )
+		if not (src_ == None):
+			self.setAttribute( "src", src_ )
 		
 	def setScript( self, value ):
-		self._script = value
-		self.setAttribute( "script", self._script )
+		self.setAttribute( "script", value )
 		return
 		
 	def setSrc( self, value ):
-		self._src = value
-		self.setAttribute( "src", self._src )
+		self.setAttribute( "src", value )
 		return
 
 class _ScriptElement( _XML3DElement ):
 	""" A script Element """
-	_src = None	 
-	_type = None	 
+	__slots__ = ()
 
 	def __init__( self, doc_, id_, src_, type_ ):
 		_XML3DElement.__init__( self, doc_, "script", id_ )
-		#print ("Setting src: " + str(src_))
-		self._src = src_
-		#print ("Setting type: " + str(type_))
-		self._type = type_
-		if not (self._src == None):
-			self.setAttribute( "src", self._src )
-		if not (self._type == None):
-			self.setAttribute( "type", self._type )
+		if not (src_ == None):
+			self.setAttribute( "src", src_ )
+		if not (type_ == None):
+			self.setAttribute( "type", type_ )
 		
 	def setSrc( self, value ):
-		self._src = value
-		self.setAttribute( "src", self._src )
+		self.setAttribute( "src", value )
 		return
 		
 	def setType( self, value ):
-		self._type = value
-		self.setAttribute( "type", self._type )
+		self.setAttribute( "type", value )
 		return
 	
 	def setValue( self, value ):
-		self.appendChild(self.ownerDocument.createTextNode(value))
+		self.appendChild( _Text( value ) )
 
 class _FloatElement( _XML3DElement ):
 	""" A float Element """
-	_name = None	 
+	__slots__ = ()
+	_numeric = True
 
 	def __init__( self, doc_, id_, name_ ):
 		_XML3DElement.__init__( self, doc_, "float", id_ )
-		#print ("Setting name: " + str(name_))
-		self._name = name_
-		if not (self._name == None):
-			self.setAttribute( "name", self._name )
+		if not (name_ == None):
+			self.setAttribute( "name", name_ )
 		
 	def setName( self, value ):
-		self._name = value
-		self.setAttribute( "name", self._name )
+		self.setAttribute( "name", value )
 		return
 	
 	def setValue( self, value ):
-		self.appendChild(self.ownerDocument.createTextNode(value))
+		self.appendChild( _Text( value ) )
 
 class _Float2Element( _XML3DElement ):
 	""" A float2 Element """
-	_name = None	 
+	__slots__ = ()
+	_numeric = True
 
 	def __init__( self, doc_, id_, name_ ):
 		_XML3DElement.__init__( self, doc_, "float2", id_ )
-		#print ("Setting name: " + str(name_))
-		self._name = name_
-		if not (self._name == None):
-			self.setAttribute( "name", self._name )
+		if not (name_ == None):
+			self.setAttribute( "name", name_ )
 		
 	def setName( self, value ):
-		self._name = value
-		self.setAttribute( "name", self._name )
+		self.setAttribute( "name", value )
 		return
 	
 	def setValue( self, value ):
-		self.appendChild(self.ownerDocument.createTextNode(value))
+		self.appendChild( _Text( value ) )
 
 class _Float3Element( _XML3DElement ):
 	""" A float3 Element """
-	_name = None	 
+	__slots__ = ()
+	_numeric = True
 
 	def __init__( self, doc_, id_, name_ ):
 		_XML3DElement.__init__( self, doc_, "float3", id_ )
-		#print ("Setting name: " + str(name_))
-		self._name = name_
-		if not (self._name == None):
-			self.setAttribute( "name", self._name )
+		if not (name_ == None):
+			self.setAttribute( "name", name_ )
 		
 	def setName( self, value ):
-		self._name = value
-		self.setAttribute( "name", self._name )
+		self.setAttribute( "name", value )
 		return
 	
 	def setValue( self, value ):
-		self.appendChild(self.ownerDocument.createTextNode(value))
+		self.appendChild( _Text( value ) )
 
 class _Float4Element( _XML3DElement ):
 	""" A float4 Element """
-	_name = None	 
+	__slots__ = ()
+	_numeric = True
 
 	def __init__( self, doc_, id_, name_ ):
 		_XML3DElement.__init__( self, doc_, "float4", id_ )
-		#print ("Setting name: " + str(name_))
-		self._name = name_
-		if not (self._name == None):
-			self.setAttribute( "name", self._name )
+		if not (name_ == None):
+			self.setAttribute( "name", name_ )
 		
 	def setName( self, value ):
-		self._name = value
-		self.setAttribute( "name", self._name )
+		self.setAttribute( "name", value )
 		return
 	
 	def setValue( self, value ):
-		self.appendChild(self.ownerDocument.createTextNode(value))
+		self.appendChild( _Text( value ) )
 
 class _Float4x4Element( _XML3DElement ):
 	""" A float4x4 Element """
-	_name = None	 
+	__slots__ = ()
+	_numeric = True
 
 	def __init__( self, doc_, id_, name_ ):
 		_XML3DElement.__init__( self, doc_, "float4x4", id_ )
-		#print ("Setting name: " + str(name_))
-		self._name = name_
-		if not (self._name == None):
-			self.setAttribute( "name", self._name )
+		if not (name_ == None):
+			self.setAttribute( "name", name_ )
 		
 	def setName( self, value ):
-		self._name = value
-		self.setAttribute( "name", self._name )
+		self.setAttribute( "name", value )
 		return
 	
 	def setValue( self, value ):
-		self.appendChild(self.ownerDocument.createTextNode(value))
+		self.appendChild( _Text( value ) )
 
 class _IntElement( _XML3DElement ):
 	""" A int Element """
-	_name = None	 
+	__slots__ = ()
+	_numeric = True
 
 	def __init__( self, doc_, id_, name_ ):
 		_XML3DElement.__init__( self, doc_, "int", id_ )
-		#print ("Setting name: " + str(name_))
-		self._name = name_
-		if not (self._name == None):
-			self.setAttribute( "name", self._name )
+		if not (name_ == None):
+			self.setAttribute( "name", name_ )
 		
 	def setName( self, value ):
-		self._name = value
-		self.setAttribute( "name", self._name )
+		self.setAttribute( "name", value )
 		return
 	
 	def setValue( self, value ):
-		self.appendChild(self.ownerDocument.createTextNode(value))
+		self.appendChild( _Text( value ) )
 
 class _BoolElement( _XML3DElement ):
 	""" A bool Element """
-	_name = None	 
+	__slots__ = ()
 
 	def __init__( self, doc_, id_, name_ ):
 		_XML3DElement.__init__( self, doc_, "bool", id_ )
-		#print ("Setting name: " + str(name_))
-		self._name = name_
-		if not (self._name == None):
-			self.setAttribute( "name", self._name )
+		if not (name_ == None):
+			self.setAttribute( "name", name_ )
 		
 	def setName( self, value ):
-		self._name = value
-		self.setAttribute( "name", self._name )
+		self.setAttribute( "name", value )
 		return
 	
 	def setValue( self, value ):
-		self.appendChild(self.ownerDocument.createTextNode(value))
+		self.appendChild( _Text( value ) )
 
 class _TextureElement( _XML3DElement ):
 	""" A texture Element """
-	_name = None	 
-	_type = None	 
-	_filterMin = None	 
-	_filterMag = None	 
-	_filterMip = None	 
-	_wrapS = None	 
-	_wrapT = None	 
-	_wrapU = None	 
-	_borderColor = None	 
+	__slots__ = ()
 
 	def __init__( self, doc_, id_, name_, type_, filterMin_, filterMag_, filterMip_, wrapS_, wrapT_, wrapU_, borderColor_ ):
 		_XML3DElement.__init__( self, doc_, "texture", id_ )
-		#print ("Setting name: " + str(name_))
-		self._name = name_
-		#print ("Setting type: " + str(type_))
-		self._type = type_
-		#print ("Setting filterMin: " + str(filterMin_))
-		self._filterMin = filterMin_
-		#print ("Setting filterMag: " + str(filterMag_))
-		self._filterMag = filterMag_
-		#print ("Setting filterMip: " + str(filterMip_))
-		self._filterMip = filterMip_
-		#print ("Setting wrapS: " + str(wrapS_))
-		self._wrapS = wrapS_
-		#print ("Setting wrapT: " + str(wrapT_))
-		self._wrapT = wrapT_
-		#print ("Setting wrapU: " + str(wrapU_))
-		self._wrapU = wrapU_
-		#print ("Setting borderColor: " + str(borderColor_))
-		self._borderColor = borderColor_
-		if not (self._name == None):
-			self.setAttribute( "name", self._name )
-		if not (self._type == None):
-			self.setAttribute( "type", self._type )
-		if not (self._filterMin == None):
-			self.setAttribute( "filterMin", self._filterMin )
-		if not (self._filterMag == None):
-			self.setAttribute( "filterMag", self._filterMag )
-		if not (self._filterMip == None):
-			self.setAttribute( "filterMip", self._filterMip )
-		if not (self._wrapS == None):
-			self.setAttribute( "wrapS", self._wrapS )
-		if not (self._wrapT == None):
-			self.setAttribute( "wrapT", self._wrapT )
-		if not (self._wrapU == None):
-			self.setAttribute( "wrapU", self._wrapU )
-		if not (self._borderColor == None):
-			self.setAttribute( "borderColor", self._borderColor )
+		if not (name_ == None):
+			self.setAttribute( "name", name_ )
+		if not (type_ == None):
+			self.setAttribute( "type", type_ )
+		if not (filterMin_ == None):
+			self.setAttribute( "filterMin", filterMin_ )
+		if not (filterMag_ == None):
+			self.setAttribute( "filterMag", filterMag_ )
+		if not (filterMip_ == None):
+			self.setAttribute( "filterMip", filterMip_ )
+		if not (wrapS_ == None):
+			self.setAttribute( "wrapS", wrapS_ )
+		if not (wrapT_ == None):
+			self.setAttribute( "wrapT", wrapT_ )
+		if not (wrapU_ == None):
+			self.setAttribute( "wrapU", wrapU_ )
+		if not (borderColor_ == None):
+			self.setAttribute( "borderColor", borderColor_ )
 		
 	def setName( self, value ):
-		self._name = value
-		self.setAttribute( "name", self._name )
+		self.setAttribute( "name", value )
 		return
 		
 	def setType( self, value ):
-		self._type = value
-		self.setAttribute( "type", self._type )
+		self.setAttribute( "type", value )
 		return
 		
 	def setFilterMin( self, value ):
-		self._filterMin = value
-		self.setAttribute( "filterMin", self._filterMin )
+		self.setAttribute( "filterMin", value )
 		return
 		
 	def setFilterMag( self, value ):
-		self._filterMag = value
-		self.setAttribute( "filterMag", self._filterMag )
+		self.setAttribute( "filterMag", value )
 		return
 		
 	def setFilterMip( self, value ):
-		self._filterMip = value
-		self.setAttribute( "filterMip", self._filterMip )
+		self.setAttribute( "filterMip", value )
 		return
 		
 	def setWrapS( self, value ):
-		self._wrapS = value
-		self.setAttribute( "wrapS", self._wrapS )
+		self.setAttribute( "wrapS", value )
 		return
 		
 	def setWrapT( self, value ):
-		self._wrapT = value
-		self.setAttribute( "wrapT", self._wrapT )
+		self.setAttribute( "wrapT", value )
 		return
 		
 	def setWrapU( self, value ):
-		self._wrapU = value
-		self.setAttribute( "wrapU", self._wrapU )
+		self.setAttribute( "wrapU", value )
 		return
 		
 	def setBorderColor( self, value ):
-		self._borderColor = value
-		self.setAttribute( "borderColor", self._borderColor )
+		self.setAttribute( "borderColor", value )
 		return
 
 class _ImgElement( _XML3DElement ):
 	""" A img Element """
-	_src = None	 
+	__slots__ = ()
 
 	def __init__( self, doc_, id_, src_ ):
 		_XML3DElement.__init__( self, doc_, "img", id_ )
-		#print ("Setting src: " + str(src_))
-		self._src = src_
-		if not (self._src == None):
-			self.setAttribute( "src", self._src )
+		if not (src_ == None):
+			self.setAttribute( "src", src_ )
 		
 	def setSrc( self, value ):
-		self._src = value
-		self.setAttribute( "src", self._src )
+		self.setAttribute( "src", value )
 		return
 
 class _VideoElement( _XML3DElement ):
 	""" A video Element """
-	_src = None	 
+	__slots__ = ()
 
 	def __init__( self, doc_, id_, src_ ):
 		_XML3DElement.__init__( self, doc_, "video", id_ )
-		#print ("Setting src: " + str(src_))
-		self._src = src_
-		if not (self._src == None):
-			self.setAttribute( "src", self._src )
+		if not (src_ == None):
+			self.setAttribute( "src", src_ )
 		
 	def setSrc( self, value ):
-		self._src = value
-		self.setAttribute( "src", self._src )
+		self.setAttribute( "src", value )
 		return
 
 class _ViewElement( _XML3DElement ):
 	""" A view Element """
-	_visible = None	 
-	_position = None	 
-	_orientation = None	 
-	_fieldOfView = None	 
+	__slots__ = ()
 
 	def __init__( self, doc_, id_, visible_, position_, orientation_, fieldOfView_ ):
 		_XML3DElement.__init__( self, doc_, "view", id_ )
-		#print ("Setting visible: " + str(visible_))
-		self._visible = visible_
-		#print ("Setting position: " + str(position_))
-		self._position = position_
-		#print ("Setting orientation: " + str(orientation_))
-		self._orientation = orientation_
-		#print ("Setting fieldOfView: " + str(fieldOfView_))
-		self._fieldOfView = fieldOfView_
-		if not (self._visible == None):
-			self.setAttribute( "visible", self._visible )
-		if not (self._position == None):
-			self.setAttribute( "position", self._position )
-		if not (self._orientation == None):
-			self.setAttribute( "orientation", self._orientation )
-		if not (self._fieldOfView == None):
-			self.setAttribute( "fieldOfView", self._fieldOfView )
+		if not (visible_ == None):
+			self.setAttribute( "visible", visible_ )
+		if not (position_ == None):
+			self.setAttribute( "position", position_ )
+		if not (orientation_ == None):
+			self.setAttribute( "orientation", orientation_ )
+		if not (fieldOfView_ == None):
+			self.setAttribute( "fieldOfView", fieldOfView_ )
 		
 	def setVisible( self, value ):
-		self._visible = value
-		self.setAttribute( "visible", self._visible )
+		self.setAttribute( "visible", value )
 		return
 		
 	def setPosition( self, value ):
-		self._position = value
-		self.setAttribute( "position", self._position )
+		self.setAttribute( "position", value )
 		return
 		
 	def setOrientation( self, value ):
-		self._orientation = value
-		self.setAttribute( "orientation", self._orientation )
+		self.setAttribute( "orientation", value )
 		return
 		
 	def setFieldOfView( self, value ):
-		self._fieldOfView = value
-		self.setAttribute( "fieldOfView", self._fieldOfView )
+		self.setAttribute( "fieldOfView", value )
 		return